@@ -0,0 +1,361 @@
+"""Analysis of the trace of a finished run, so old traces can be mined
+without running the simulation again.
+
+The trace is memory mapped and parsed a line at a time, keeping only the
+packets in flight and the current interval of the time series, so a trace
+of gigabytes takes no more memory than one of kilobytes. It reads the text
+format at any level, including the old traces with unquoted payloads, as
+well as --trace-format jsonl.
+
+What it can tell depends on the level the trace was written at. From level
+2 on every event dispatched is there, with the losses and corruptions of
+the channel. From level 3 on every packet handed to layer 3 is too, and as
+a channel delivers in order each one can be followed from the send to its
+arrival, loss, corruption or drop:
+
+    python analyze.py output.txt
+    python analyze.py trace.txt --series series.csv --interval 50 \\
+        --timeline packets.csv
+"""
+
+import argparse
+import csv
+import json
+import mmap
+import re
+import sys
+from collections import deque
+
+from metrics import Histogram
+
+PACKET = rb"Packet\(acknum=(-?\d+), seqnum=(-?\d+), checksum=-?\d+, payload=(.*)\)"
+# events as the run loop dispatched them, flush left
+LAYER3 = re.compile(rb"FromLayer3\(([^,]+), ([^,]+), " + PACKET + rb"\)")
+LAYER5 = re.compile(rb"FromLayer5\(([^,]+), ([^,)]+)\)")
+TIMER = re.compile(rb"TimerEvent\(([^,]+), ([^,)]+)(?:, [^)]*)?\)")
+SEND = re.compile(rb" +TOLAYER3: " + PACKET)
+# payloads of pure ACKs, as written now and by the old tracer
+EMPTY = (b"b''", b'b""', b"")
+
+# the simple records of the text format, by how their line starts
+LINES = {
+    b"          TOLAYER3: packet being lost": "lost",
+    b"          TOLAYER3: packet being corrupted": "corrupt",
+    b"          TOLAYER3: packet dropped": "drop",
+    b"          TOLAYER5:": "tolayer5",
+    b"Warning:": "warning",
+}
+
+# furthest a data seqnum is taken to be ahead of the highest one delivered
+# before, more than any window the simulator is run with in practice
+JUMP = 64
+
+# lines parsed between releases of the mapped pages behind them
+RELEASE = 1 << 16
+
+SERIES = [
+    "start", "layer5", "data", "acks", "timeouts", "lost", "corrupted", "dropped",
+]
+TIMELINE = [
+    "sender", "seqnum", "acknum", "kind", "sent", "outcome", "arrived", "latency",
+]
+
+
+def lines(path):
+    """Every line of the file, without its end of line"""
+    with open(path, "rb") as source:
+        if not source.seek(0, 2):
+            return
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as trace:
+            for count, line in enumerate(iter(trace.readline, b""), 1):
+                yield line.rstrip(b"\r\n")
+                # hand back the pages already parsed, or they add up to the
+                # size of the file in the resident memory of the process
+                if not count % RELEASE and hasattr(mmap, "MADV_DONTNEED"):
+                    done = trace.tell() // mmap.PAGESIZE * mmap.PAGESIZE
+                    trace.madvise(mmap.MADV_DONTNEED, 0, done)
+
+
+def textrecords(path):
+    """The records of a text trace as tuples of (kind, time, entity,
+    packet), packet being (acknum, seqnum, isdata). Only events carry a
+    time and an entity, everything else happens at the last event"""
+    inlist = first = False
+    for line in lines(path):
+        if inlist:
+            # the whole event list, dumped at level 4, between two rules
+            if line.startswith(b"-----") and not first:
+                inlist = False
+            first = False
+            continue
+        if line == b"eventlist":
+            inlist = True
+            first = True
+            continue
+
+        start = line[:1]
+        if start == b"F":
+            match = LAYER3.fullmatch(line)
+            if match is not None:
+                time, entity, acknum, seqnum, payload = match.groups()
+                packet = (int(acknum), int(seqnum), payload not in EMPTY)
+                yield "layer3", float(time), entity.decode(), packet
+                continue
+            match = LAYER5.fullmatch(line)
+            if match is not None:
+                yield "layer5", float(match[1]), match[2].decode(), None
+            continue
+        if start == b"T":
+            match = TIMER.fullmatch(line)
+            if match is not None:
+                yield "timer", float(match[1]), match[2].decode(), None
+            continue
+        if start == b" ":
+            match = SEND.fullmatch(line)
+            if match is not None:
+                acknum, seqnum, payload = match.groups()
+                packet = (int(acknum), int(seqnum), payload not in EMPTY)
+                yield "send", None, None, packet
+                continue
+        for prefix, kind in LINES.items():
+            if line.startswith(prefix):
+                yield kind, None, None, None
+                break
+
+
+def jsonrecords(path):
+    """The records of a JSONL trace, like textrecords"""
+    events = {"layer3", "layer5", "timer"}
+    for line in lines(path):
+        if not line:
+            continue
+        record = json.loads(line)
+        kind = record["kind"]
+        if kind == "event":
+            event = record["event"]
+            packet = event.get("packet")
+            if packet is not None:
+                packet = (packet["acknum"], packet["seqnum"], bool(packet["payload"]))
+            if event["type"] in events:
+                yield event["type"], event["time"], event["entity"], packet
+        elif kind == "send":
+            packet = record["packet"]
+            packet = (packet["acknum"], packet["seqnum"], bool(packet["payload"]))
+            yield "send", None, None, packet
+        elif kind in ("lost", "corrupt", "drop", "tolayer5", "warning"):
+            yield kind, None, None, None
+
+
+def records(path):
+    """The records of a trace in whichever format it is"""
+    with open(path, "rb") as source:
+        first = source.read(1)
+    return jsonrecords(path) if first == b"{" else textrecords(path)
+
+
+def peer(entity):
+    """The other end of the flow of entity"""
+    if entity.startswith("EntityA"):
+        return "EntityB" + entity[7:]
+    return "EntityA" + entity[7:]
+
+
+class Analysis:
+    """Summary statistics of a trace, with an optional time series of
+    fixed intervals and timeline of every packet written as they complete"""
+
+    def __init__(self, interval=None, series=None, timeline=None):
+        self.interval = interval
+        self.series = series
+        self.timeline = timeline
+        self.bucket = None
+
+        self.time = 0.0
+        self.current = None  # the entity handling the last event
+        self.events = {"layer5": 0, "layer3": 0, "timer": 0}
+        self.counts = {
+            "data": 0,
+            "acks": 0,
+            "repeats": 0,
+            "carried": 0,  # sent and not lost, seen from level 3 on
+            "lost": 0,
+            "corrupted": 0,
+            "dropped": 0,
+            "tolayer5": 0,
+            "warnings": 0,
+        }
+        self.timeouts = {}
+        self.highest = {}  # highest data seqnum delivered to each entity
+        # packets sent and not arrived yet, by receiver, oldest first
+        self.inflight = {}
+        self.latency = Histogram()
+
+    def feed(self, kind, time, entity, packet):
+        if time is not None:
+            self.time = time
+            self.current = entity
+            self.events[kind] += 1
+            if self.interval:
+                self.advance(time)
+
+        if kind == "layer3":
+            self.delivered(entity, packet)
+        elif kind == "timer":
+            self.timeouts[entity] = self.timeouts.get(entity, 0) + 1
+            self.tally("timeouts")
+        elif kind == "layer5":
+            self.tally("layer5")
+        elif kind == "send":
+            self.counts["carried"] += 1
+            queue = self.inflight.setdefault(peer(self.current), deque())
+            queue.append([self.current, packet, self.time, "delivered"])
+        elif kind == "lost":
+            self.counts["lost"] += 1
+            self.tally("lost")
+            self.row(self.current, None, self.time, "lost")
+        elif kind == "corrupt":
+            self.counts["corrupted"] += 1
+            self.tally("corrupted")
+            queue = self.inflight.get(peer(self.current))
+            if queue:
+                queue[-1][3] = "corrupted"
+        elif kind == "drop":
+            self.counts["dropped"] += 1
+            self.tally("dropped")
+            queue = self.inflight.get(peer(self.current))
+            if queue:
+                sender, sent, when, _ = queue.pop()
+                self.row(sender, sent, when, "dropped")
+        elif kind == "tolayer5":
+            self.counts["tolayer5"] += 1
+        elif kind == "warning":
+            self.counts["warnings"] += 1
+
+    def delivered(self, entity, packet):
+        acknum, seqnum, isdata = packet
+        outcome = None
+        queue = self.inflight.get(entity)
+        if queue:
+            sender, sent, when, outcome = queue.popleft()
+            self.latency.add(self.time - when)
+            self.row(sender, sent, when, outcome, self.time)
+
+        if not isdata:
+            self.counts["acks"] += 1
+            self.tally("acks")
+            return
+        self.counts["data"] += 1
+        self.tally("data")
+        if outcome == "corrupted":
+            return  # Its seqnum may be anything.
+        # seqnums go up, the same one or a lower one again is a resend or
+        # out of order. Without the sends in the trace a corrupted seqnum
+        # can't be told apart, but a flipped bit mostly makes it jump
+        # further ahead than a window.
+        highest = self.highest.get(entity)
+        if highest is None or highest < seqnum <= highest + JUMP:
+            self.highest[entity] = seqnum
+        elif seqnum <= highest:
+            self.counts["repeats"] += 1
+
+    def row(self, sender, packet, sent, outcome, arrived=None):
+        if self.timeline is None:
+            return
+        acknum, seqnum, isdata = packet if packet is not None else (None, None, None)
+        kind = None if packet is None else "data" if isdata else "ack"
+        latency = arrived - sent if arrived is not None else None
+        self.timeline.writerow(
+            [sender, seqnum, acknum, kind, sent, outcome, arrived, latency]
+        )
+
+    def advance(self, time):
+        """Write out the intervals that ended before time"""
+        if self.bucket is None:
+            self.bucket = self.newbucket(0.0)
+        while time >= self.bucket["start"] + self.interval:
+            self.flush()
+            self.bucket = self.newbucket(self.bucket["start"] + self.interval)
+
+    def newbucket(self, start):
+        bucket = dict.fromkeys(SERIES, 0)
+        bucket["start"] = start
+        return bucket
+
+    def tally(self, name):
+        if self.bucket is not None:
+            self.bucket[name] += 1
+
+    def flush(self):
+        if self.series is not None and self.bucket is not None:
+            self.series.writerow([self.bucket[name] for name in SERIES])
+
+    def summary(self):
+        # whatever is still in flight at the end never arrived
+        inflight = sum(len(queue) for queue in self.inflight.values())
+        return {
+            "time": self.time,
+            "events": dict(self.events),
+            **self.counts,
+            "inflight": inflight,
+            "timeouts": dict(self.timeouts),
+            "latency": self.latency.asdict() if self.latency.count else None,
+        }
+
+
+def analyze(path, interval=None, series=None, timeline=None):
+    """Stream the trace at path through an Analysis, writing the rows of
+    the time series and timeline to the given csv writers. Returns the
+    summary"""
+    if series is not None:
+        series.writerow(SERIES)
+    if timeline is not None:
+        timeline.writerow(TIMELINE)
+    analysis = Analysis(interval, series, timeline)
+    for record in records(path):
+        analysis.feed(*record)
+    analysis.flush()
+    return analysis.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analyze a simulator trace")
+    parser.add_argument("trace", help="trace file, text or jsonl")
+    parser.add_argument(
+        "--interval",
+        default=100.0,
+        type=float,
+        help="length of the intervals of the time series",
+    )
+    parser.add_argument(
+        "--series",
+        default=None,
+        help="write the time series of events per interval to this CSV file",
+    )
+    parser.add_argument(
+        "--timeline",
+        default=None,
+        help="write the send and arrival of every packet to this CSV file",
+    )
+    args = parser.parse_args()
+    assert args.interval > 0.0
+
+    outputs = []
+    writers = []
+    for path in (args.series, args.timeline):
+        if path is None:
+            writers.append(None)
+            continue
+        output = open(path, "w", newline="")
+        outputs.append(output)
+        writers.append(csv.writer(output))
+    try:
+        summary = analyze(args.trace, args.interval if args.series else None, *writers)
+    finally:
+        for output in outputs:
+            output.close()
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Benchmarks of the simulator itself: how fast Simulator + EntityA/EntityB
+get through runs of 10^3 to 10^6 messages under several channel settings.
+
+Every case runs in a fresh worker process with a fixed seed so its peak
+memory is its own and reruns are comparable. Results can be saved as a
+baseline and later runs compared against it:
+
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+
+from simulator import Simulator
+
+# channel settings, name -> (lossprob, corruptprob)
+SETTINGS = {
+    "clean": (0.0, 0.0),
+    "lossy": (0.1, 0.1),
+    "harsh": (0.2, 0.2),
+}
+
+SIZES = [1000, 10000]
+
+
+def peakmemory():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def case(messages, setting, lambdat, seed):
+    """Run one benchmark case, meant to run in its own process"""
+    lossprob, corruptprob = SETTINGS[setting]
+    sim = Simulator(False, 0, seed, messages, corruptprob, lossprob, lambdat)
+    start = time.perf_counter()
+    sim.run()
+    wall = time.perf_counter() - start
+    return {
+        "name": f"{messages}-{setting}",
+        "messages": messages,
+        "setting": setting,
+        "events": sim.nevents,
+        "wall": wall,
+        "events_per_second": sim.nevents / wall if wall > 0.0 else 0.0,
+        "peak_memory_mb": peakmemory(),
+        "max_evlist": sim.maxevlist,
+        "ntolayer3": sim.ntolayer3,
+    }
+
+
+def benchmark(sizes, settings, lambdat, seed):
+    """Run every case one after the other, each in a fresh process"""
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for messages in sizes:
+        for setting in settings:
+            with context.Pool(1) as pool:
+                result = pool.apply(case, (messages, setting, lambdat, seed))
+            print(
+                f"{result['name']:>16} {result['events']:>10} events "
+                f"{result['wall']:>9.3f} s {result['events_per_second']:>10.0f} ev/s "
+                f"{result['peak_memory_mb']:>8.1f} MB "
+                f"queue {result['max_evlist']:>6}",
+                flush=True,
+            )
+            results.append(result)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every case that got slower or used more
+    memory than its baseline by more than tolerance (a fraction)"""
+    previous = {i["name"]: i for i in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        if result["events_per_second"] < old["events_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result['name']}: {result['events_per_second']:.0f} ev/s, "
+                f"baseline {old['events_per_second']:.0f} ev/s"
+            )
+        if result["peak_memory_mb"] > old["peak_memory_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{result['name']}: {result['peak_memory_mb']:.1f} MB, "
+                f"baseline {old['peak_memory_mb']:.1f} MB"
+            )
+        if result["max_evlist"] > old["max_evlist"] * (1 + tolerance):
+            regressions.append(
+                f"{result['name']}: event queue {result['max_evlist']}, "
+                f"baseline {old['max_evlist']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="network simulator benchmarks")
+    parser.add_argument(
+        "--sizes",
+        default=SIZES,
+        type=lambda text: [int(i) for i in text.split(",")],
+        help="comma separated message counts, e.g. 1000,10000,100000,1000000",
+    )
+    parser.add_argument(
+        "--settings",
+        default=list(SETTINGS),
+        type=lambda text: text.split(","),
+        help=f"comma separated channel settings out of {', '.join(SETTINGS)}",
+    )
+    parser.add_argument(
+        "--lambda",
+        default=20.0,
+        type=float,
+        help="packet arrival rate, above the mean channel delay",
+    )
+    parser.add_argument("--seed", default=0, type=int, help="set random seed")
+    parser.add_argument("--save", default=None, help="write the results here")
+    parser.add_argument(
+        "--compare", default=None, help="baseline file to check the results against"
+    )
+    parser.add_argument(
+        "--tolerance",
+        default=0.2,
+        type=float,
+        help="allowed slowdown before a case is flagged (fraction)",
+    )
+    args = parser.parse_args()
+    assert all(i in SETTINGS for i in args.settings)
+
+    results = benchmark(args.sizes, args.settings, args.__dict__["lambda"], args.seed)
+
+    if args.save is not None:
+        with open(args.save, "w") as output:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "lambda": args.__dict__["lambda"],
+                    "seed": args.seed,
+                    "results": results,
+                },
+                output,
+                indent=2,
+            )
+
+    if args.compare is not None:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""This defines the medium between the two entities. A Channel carries
+packets in one direction only (A to B or B to A) and decides whether each
+packet is lost, corrupted, and when it arrives at the other side. With
+several flows the channels going the same way can share a Bottleneck"""
+
+from collections import deque
+
+# bytes of header (seqnum, acknum, checksum) counted on top of the payload
+# when computing the serialization delay of a packet
+HEADERLEN = 12
+FIELDBITS = 32
+HEADERFIELDS = ("seqnum", "acknum", "checksum")
+# packets a Bottleneck holds, the one being sent included, before it drops
+BUFFER = 64
+
+
+def flipbit(packet, bit):
+    """Return the packet with one bit flipped. Bits are numbered through the
+    32 bit seqnum, acknum and checksum fields and then the payload"""
+    field, offset = divmod(bit, FIELDBITS)
+    if field < len(HEADERFIELDS):
+        name = HEADERFIELDS[field]
+        return packet.replace(**{name: getattr(packet, name) ^ (1 << offset)})
+    index, offset = divmod(bit - HEADERLEN * 8, 8)
+    payload = bytearray(packet.payload)
+    payload[index] ^= 1 << offset
+    return packet.replace(payload=bytes(payload))
+
+
+# A delay distribution is a callable draw(rng) returning the one way delay
+# of a packet. The factories below tag it with how it was made, so a
+# checkpoint can pickle the recipe instead of the closure.
+
+
+def uniform_delay(low=1.0, high=10.0):
+    """Delay uniform on [low, high), the classic 1 + 9*U of the emulator"""
+
+    def draw(rng):
+        return low + (high - low) * rng.random()
+
+    draw.recipe = (uniform_delay, (low, high))
+    return draw
+
+
+def exponential_delay(mean=5.0, minimum=0.0):
+    """Delay of minimum plus an exponential with the given mean"""
+
+    def draw(rng):
+        return minimum + rng.expovariate(1.0 / mean)
+
+    draw.recipe = (exponential_delay, (mean, minimum))
+    return draw
+
+
+def constant_delay(value=5.0):
+    """Fixed delay, mostly useful for debugging a protocol"""
+
+    def draw(rng):
+        return value
+
+    draw.recipe = (constant_delay, (value,))
+    return draw
+
+
+DELAYS = {
+    "uniform": uniform_delay,
+    "exponential": exponential_delay,
+    "constant": constant_delay,
+}
+
+
+def parse_delay(spec, delays=DELAYS):
+    """Build a delay distribution from a spec such as uniform:1,10,
+    exponential:5 or constant:5, out of the given table of distributions"""
+    name, _, args = spec.partition(":")
+    if name not in delays:
+        raise ValueError(f"unknown delay distribution {name!r}")
+    params = [float(i) for i in args.split(",") if i]
+    return delays[name](*params)
+
+
+class Bottleneck:
+    """A link shared by the channels of every flow going the same way. It
+    sends one packet at a time at capacity bytes per time unit, queues up
+    to buffer packets and drops whatever arrives at a full queue"""
+
+    def __init__(self, sim, capacity, buffer=BUFFER):
+        self.sim = sim
+        self.capacity = capacity
+        self.buffer = buffer
+        # when each packet in the link leaves it, oldest first
+        self.departures = deque()
+        self.busyuntil = 0.0
+        self.busytime = 0.0
+
+        self.nsent = 0
+        self.ndropped = 0
+        self.maxqueue = 0
+        self.queuearea = 0.0
+        self.queuesince = 0.0
+        self.queueingdelay = 0.0
+
+    def advance(self, now):
+        """Let go of the packets that left by now, integrating the queue
+        length up to it"""
+        now = max(now, self.queuesince)
+        departures = self.departures
+        while departures and departures[0] <= now:
+            left = departures.popleft()
+            self.queuearea += (len(departures) + 1) * (left - self.queuesince)
+            self.queuesince = left
+        self.queuearea += len(departures) * (now - self.queuesince)
+        self.queuesince = now
+
+    def enqueue(self, now, size):
+        """Queue a packet of size bytes at time now, returns when it leaves
+        the link or None when the queue is full"""
+        self.advance(now)
+        if len(self.departures) >= self.buffer:
+            self.ndropped += 1
+            return None
+        txtime = size / self.capacity
+        start = max(now, self.busyuntil)
+        self.queueingdelay += start - now
+        self.busyuntil = start + txtime
+        self.busytime += txtime
+        self.departures.append(self.busyuntil)
+        if len(self.departures) > self.maxqueue:
+            self.maxqueue = len(self.departures)
+        self.nsent += 1
+        return self.busyuntil
+
+    def asdict(self, time):
+        """What the link went through up to time"""
+        self.advance(time)
+        return {
+            "capacity": self.capacity,
+            "buffer": self.buffer,
+            "sent": self.nsent,
+            "dropped": self.ndropped,
+            "utilization": min(self.busytime, time) / time if time > 0.0 else 0.0,
+            "queue_mean": self.queuearea / time if time > 0.0 else 0.0,
+            "queue_max": self.maxqueue,
+            "queueing_delay_mean": (
+                self.queueingdelay / self.nsent if self.nsent else 0.0
+            ),
+        }
+
+
+class Channel:
+    """One direction of the medium. The medium can not reorder, so every
+    packet arrives after the latest arrival already scheduled on this
+    channel; keeping that time here makes a send O(1)"""
+
+    def __init__(
+        self,
+        sim,
+        dest,
+        lossprob,
+        corruptprob,
+        delay=None,
+        bandwidth=None,
+        streams=None,
+        link=None,
+        queueloss=None,
+        loss=None,
+    ):
+        self.sim = sim
+        self.dest = dest
+        self.lossprob = lossprob
+        self.corruptprob = corruptprob
+        self.delay = delay if delay is not None else uniform_delay()
+        self.bandwidth = bandwidth
+        self.link = link
+        # with queueloss every packet already in the channel makes losing
+        # one more likely, reaching certain loss at queueloss packets
+        self.queueloss = queueloss
+        # every decision draws from a stream of its own, per direction
+        streams = streams if streams is not None else sim.streams
+        self.lossrng = streams[f"loss to {dest}"]
+        self.delayrng = streams[f"delay to {dest}"]
+        self.corruptrng = streams[f"corrupt to {dest}"]
+        # a model of bursty loss and corruption, see loss.py
+        self.setloss(loss, streams)
+
+        self.lasttime = 0.0
+        self.busyuntil = 0.0
+        self.busytime = 0.0
+        self.inflight = 0
+        self.inflightarea = 0.0
+        self.inflightsince = 0.0
+
+        self.nsent = 0
+        self.nlost = 0
+        # runs of consecutive packets lost
+        self.nbursts = 0
+        self.lastlost = False
+        self.ndropped = 0
+        self.ncorrupt = 0
+
+        # optional recording of every decision and a recording to replay
+        # instead of drawing them, see replay.py
+        self.record = None
+        self.replay = None
+
+    def send(self, packet):
+        """Push a packet into the channel, returns the arrival time and the
+        packet that will arrive, or None if the packet was lost"""
+        sim = self.sim
+        self.nsent += 1
+
+        decision = None
+        if self.replay is not None:
+            decision = next(self.replay, None)
+            if decision is None:
+                # the recording ran out, carry on drawing
+                self.replay = None
+                if sim.trace > 0:
+                    sim.tracer.record(
+                        "warning", sim.time, message="end of the channel replay"
+                    )
+        if decision is None:
+            decision = self.decide()
+        if self.record is not None:
+            self.record(decision)
+        lost, delay, corrupt = decision
+
+        # simulate losses:
+        if lost:
+            self.nlost += 1
+            if not self.lastlost:
+                self.nbursts += 1
+            self.lastlost = True
+            if sim.trace > 0:
+                sim.tracer.record("lost", sim.time)
+            return None
+        self.lastlost = False
+
+        # packets are immutable, so the student can't change the packet once
+        # it's in the medium and there is no need to copy it
+        mypkt = packet
+        if sim.trace > 2:
+            sim.tracer.record("send", sim.time, packet=mypkt)
+
+        # the packet leaves once the link has finished serializing the
+        # packets ahead of it, then it arrives after the latest packet
+        # already in the medium plus the propagation delay
+        start = sim.time
+        if self.bandwidth:
+            start = max(start, self.busyuntil)
+            txtime = self.serialization(mypkt)
+            self.busytime += txtime
+            self.busyuntil = start + txtime
+            start = self.busyuntil
+        if self.link is not None:
+            # then it waits its turn on the shared link, if there is room
+            start = self.link.enqueue(start, HEADERLEN + len(mypkt.payload))
+            if start is None:
+                self.ndropped += 1
+                if sim.trace > 0:
+                    sim.tracer.record("drop", sim.time)
+                return None
+        arrival = max(start, self.lasttime) + delay
+        self.lasttime = arrival
+
+        if corrupt is not None:
+            # simulate corruption: flip one bit anywhere in the packet
+            self.ncorrupt += 1
+            nbits = (HEADERLEN + len(mypkt.payload)) * 8
+            mypkt = flipbit(mypkt, int(corrupt * nbits))
+
+            if sim.trace > 0:
+                sim.tracer.record("corrupt", sim.time)
+
+        self.changeinflight(1)
+        return arrival, mypkt
+
+    def decide(self):
+        """Draw the fate of a packet: whether it is lost, its delay, and
+        where in the packet a bit gets flipped as a fraction of its length,
+        None when it arrives intact"""
+        lossprob = self.lossprob
+        corruptprob = self.corruptprob
+        if self.loss is not None:
+            lossprob, corruptprob = self.loss.step(
+                self.staterng, lossprob, corruptprob
+            )
+        if self.queueloss:
+            lossprob += (1.0 - lossprob) * min(self.inflight / self.queueloss, 1.0)
+        if self.lossrng.random() < lossprob:
+            return True, 0.0, None
+        delay = self.delay(self.delayrng)
+        if self.corruptrng.random() < corruptprob:
+            return False, delay, self.corruptrng.random()
+        return False, delay, None
+
+    def setloss(self, loss, streams=None):
+        """Decide losses and corruptions with the loss model from now on,
+        None for independent ones"""
+        self.loss = loss
+        if loss is not None:
+            streams = streams if streams is not None else self.sim.streams
+            self.staterng = streams[f"state to {self.dest}"]
+
+    def delivered(self):
+        """Called by the simulator when a packet of this channel arrives"""
+        self.changeinflight(-1)
+
+    def changeinflight(self, change):
+        now = self.sim.time
+        self.inflightarea += self.inflight * (now - self.inflightsince)
+        self.inflightsince = now
+        self.inflight += change
+
+    def meaninflight(self, time):
+        """Time average of the number of packets in the medium"""
+        if time <= 0.0:
+            return float(self.inflight)
+        area = self.inflightarea + self.inflight * (time - self.inflightsince)
+        return area / time
+
+    def lossburst(self):
+        """Mean length of the runs of consecutive packets lost"""
+        return self.nlost / self.nbursts if self.nbursts else 0.0
+
+    def utilization(self, time):
+        """Fraction of the time the link spent serializing packets, None
+        when the link has no bandwidth limit"""
+        if not self.bandwidth or time <= 0.0:
+            return None
+        return min(self.busytime, time) / time
+
+    def serialization(self, packet):
+        """Time needed to put the packet on the wire"""
+        return (HEADERLEN + len(packet.payload)) / self.bandwidth
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        recipe = getattr(self.delay, "recipe", None)
+        if recipe is not None:
+            state["delay"] = recipe
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self.delay, tuple):
+            factory, params = self.delay
+            self.delay = factory(*params)
+
+    def __str__(self):
+        return f"Channel(to {self.dest})"
+
+    def __repr__(self):
+        return self.__str__()
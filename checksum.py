@@ -0,0 +1,53 @@
+"""Checksums over the contents of a packet: seqnum, acknum and payload.
+
+Both work on bytes-like payloads without copying them: the Internet
+checksum sums the payload as 16 bit words through a memoryview, CRC32 is a
+single zlib call, so either one is a C level pass over the payload"""
+
+import struct
+import sys
+import zlib
+
+# seqnum and acknum as they are covered by the checksum
+HEADER = struct.Struct("!II")
+
+
+def fold(total):
+    """Fold the carries of a one's complement sum back into 16 bits"""
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+
+def wordsum(data):
+    """Sum of data taken as native order 16 bit words, odd lengths are
+    padded with a zero byte"""
+    view = memoryview(data).cast("B")
+    total = 0
+    if len(view) % 2:
+        total = view[-1] << 8 if sys.byteorder == "big" else view[-1]
+        view = view[:-1]
+    return total + sum(view.cast("H"))
+
+
+def internet_checksum(seqnum, acknum, payload):
+    """RFC 1071 Internet checksum"""
+    total = fold(wordsum(HEADER.pack(seqnum, acknum)) + wordsum(payload))
+    # the one's complement sum is byte order independent, so summing native
+    # words only needs the result swapped back to network order
+    if sys.byteorder == "little":
+        total = ((total & 0xFF) << 8) | (total >> 8)
+    return ~total & 0xFFFF
+
+
+def crc32(seqnum, acknum, payload):
+    """CRC32 as used by Ethernet and zlib"""
+    return zlib.crc32(payload, zlib.crc32(HEADER.pack(seqnum, acknum)))
+
+
+CHECKSUMS = {
+    "internet": internet_checksum,
+    "crc32": crc32,
+}
+
+DEFAULT_CHECKSUM = "internet"
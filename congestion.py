@@ -0,0 +1,61 @@
+"""Congestion control for the sending entities. Aimd adapts how many packets
+may be in flight to the losses the way TCP Reno does; FixedWindow always
+allows the whole flow window. Either way window is the current limit"""
+
+
+class FixedWindow:
+    """No congestion control, the flow window is the only limit"""
+
+    def __init__(self, limit):
+        self.window = limit
+
+    def acked(self, count):
+        pass
+
+    def fastretransmit(self, flight):
+        pass
+
+    def timeout(self, flight):
+        pass
+
+
+class Aimd:
+    """Additive increase, multiplicative decrease of a congestion window of
+    cwnd packets, never more than the flow window:
+
+    - slow start: one more packet per packet ACKed until ssthresh
+    - congestion avoidance: one more packet per window ACKed
+    - fast retransmit: ssthresh and cwnd drop to half of what was in flight
+    - timeout: ssthresh drops to half of what was in flight and cwnd to one
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.cwnd = 1.0
+        self.ssthresh = float(limit)
+        self.window = 1
+
+    def acked(self, count):
+        """count packets got ACKed for the first time"""
+        if self.cwnd < self.ssthresh:
+            # slow start only up to ssthresh, what is left of count is
+            # already congestion avoidance
+            grow = min(count, self.ssthresh - self.cwnd)
+            self.cwnd += grow
+            count -= grow
+        if count:
+            self.cwnd += count / self.cwnd
+        self.cwnd = min(self.cwnd, float(self.limit))
+        self.window = int(self.cwnd)
+
+    def fastretransmit(self, flight):
+        """Duplicate ACKs: a packet is lost but later ones get through"""
+        self.ssthresh = max(flight / 2.0, 2.0)
+        self.cwnd = self.ssthresh
+        self.window = int(self.cwnd)
+
+    def timeout(self, flight):
+        """Nothing got through for a whole RTO, start over"""
+        self.ssthresh = max(flight / 2.0, 2.0)
+        self.cwnd = 1.0
+        self.window = 1
@@ -3,16 +3,38 @@ an Entity where EntityA and EntityB are concrete classes that must be modified
 for this assignment"""
 
 from abc import ABC, abstractmethod
-import inspect
+from collections import deque
 import packet as pk
+from congestion import Aimd, FixedWindow
+from rtt import FixedTimeout, RttEstimator
+from workload import LAST, fragment
+
+# Go-Back-N send window size, the most packets EntityA has waiting for an ACK
+WINDOW = 8
+# How long EntityA waits for an ACK before resending its window, this is
+# where the adaptive timeout starts before it has measured any RTT
+TIMEOUT = 10
+# Sequence numbers wrap modulo this, the size of the 32 bit header field.
+# Go-Back-N needs it larger than the window, Selective Repeat at least twice
+# the window, so a wrapped seqnum is never mistaken for an old one
+SEQSPACE = 2**32
+# With --bidirectional the receiver holds an ACK back this long in the hope
+# of piggybacking it on a data packet going the other way
+ACKDELAY = 5
+# Duplicate ACKs that make EntityA resend its window before the timeout,
+# fewer are usually just the receiver seeing packets we already resent
+DUPACKS = 3
+# Timer key of the delayed ACK, the retransmission timer has no key
+ACKTIMER = "ack"
 
 
 # noinspection PyShadowingNames
 class Entity(ABC):
     """Abstract concept of an Entity"""
 
-    def __init__(self, sim):
+    def __init__(self, sim, flow=0):
         self.sim = sim
+        self.flow = flow  # Which sender/receiver pair this entity is part of
 
     @abstractmethod
     def output(self, message):
@@ -23,15 +45,17 @@ class Entity(ABC):
         """called from layer 3, when a packet arrives for layer 4"""
 
     @abstractmethod
-    def timerinterrupt(self):
-        """called when timer goes off"""
+    def timerinterrupt(self, key=None):
+        """called when timer goes off, with the timer's key if it was
+        started with one"""
 
     @abstractmethod
-    def starttimer(self, increment):
-        """Provided: call this function to start your timer"""
+    def starttimer(self, increment, key=None):
+        """Provided: call this function to start your timer, give each
+        timer a different key to run several at once"""
 
     @abstractmethod
-    def stoptimer(self):
+    def stoptimer(self, key=None):
         """Provided: call this function to stop your timer"""
 
     def tolayer5(self, data):
@@ -40,128 +64,293 @@ class Entity(ABC):
     def tolayer3(self, packet):
         """Provided: call this function to send a layer3 packet"""
 
+    def windowsize(self):
+        """Number of packets sent and waiting to be acknowledged"""
+        return 0
+
+    def makepacket(self, seqnum, acknum, payload):
+        """Provided: build a packet carrying the checksum of its contents"""
+        return pk.Packet(
+            acknum=acknum,
+            seqnum=seqnum,
+            payload=payload,
+            checksum=self.sim.checksum(seqnum, acknum, payload),
+        )
+
+    def iscorrupted(self, packet):
+        """Provided: check a packet against its checksum"""
+        return packet.checksum != self.sim.checksum(
+            packet.seqnum, packet.acknum, packet.payload
+        )
+
+    def tracecall(self, name):
+        """Provided: trace that one of the callbacks was called"""
+        self.sim.tracer.record("callback", self.sim.time, entity=self, name=name)
+
 
 # noinspection PyShadowingNames
 class EntityA(Entity):
     """Concrete implementation of EntityA. This entity will receive messages
-    from layer5 and must ensure they make it to layer3 reliably"""
-
-    def __init__(self, sim):
-        super().__init__(sim)
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
+    from layer5 and must ensure they make it to layer3 reliably.
+
+    It sends with Go-Back-N and receives in order, so with --bidirectional
+    the same class works at both ends and each end ACKs in the acknum of its
+    own data packets"""
+
+    def __init__(
+        self,
+        sim,
+        window=WINDOW,
+        timeout=TIMEOUT,
+        adaptive=True,
+        seqspace=SEQSPACE,
+        ackdelay=ACKDELAY,
+        flow=0,
+        congestion=False,
+        mss=None,
+    ):
+        super().__init__(sim, flow)
+        if self.sim.trace >= 2:
+            self.tracecall("__init__")
         # Initialize anything you need here
-        self.sent_packet_window = []
-        self.ack_received_window = []
-        self.to_send_window = []
+        self.window = window  # N, the most packets waiting for an ACK at once
+        self.seqspace = seqspace
+        self.rtt = RttEstimator(timeout) if adaptive else FixedTimeout(timeout)
+        # How many of the N packets the network can take right now
+        self.congestion = Aimd(window) if congestion else FixedWindow(window)
+        self.sendtimes = {}  # When packets sent only once went out, by seqnum
+        self.sent_packet_window = deque()  # Sent but not ACKed yet, at most N
+        self.to_send_window = deque()  # Waiting for room in the window
+        self.requeued = 0  # Packets at its start already sent once
         self.inc_seqnum = 0
-        self.inc_acknum = 0
+        self.dupacks = 0  # Duplicate ACKs for the current base
+        # The seqnum after the last packet sent when we last went back N on
+        # duplicate ACKs, until the receiver ACKs past it
+        self.recover = None
+
+        # Receiving side
+        self.expected = 0  # The next seqnum to deliver
+        self.receiving = False  # Whether any data arrived yet
+        # A pure ACK for expected, resent on anything out of order. Before
+        # the first packet it asks for seqnum 0.
+        self.last_ack = self.makepacket(0, 0, b"")
+        # Only hold ACKs back when there may be data to carry them
+        self.ackdelay = ackdelay if self.sim.bidirectional else 0
+        self.ackdue = 0  # In order packets not ACKed yet
+
+        # Messages longer than this go out in several packets
+        self.mss = mss
+        self.fragments = []  # What arrived so far of the next message
 
     def output(self, message):# This is the application layer actually giving me the message that it wants to have sent out.
         """Called when layer5 wants to introduce new data into the stream"""
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        # TODO add some code
-        # Creating the packet
-        pkt = pk.Packet()
-        pkt.payload = message
-        pkt.checksum = 0
-        pkt.seqnum = self.inc_seqnum
-        pkt.acknum = self.inc_acknum
-        self.to_send_window.append(pkt)
-
-
-        # Appending the seqnum into the set_packet_window.
-        self.tolayer3(pkt)  # Layer 3 is the medium which the packets are send through.
-
-        #Starting the timer
-        if pkt.seqnum == 0:
-            if len(self.sent_packet_window) == 0:
-                self.starttimer(10)
+        if self.sim.trace >= 2:
+            self.tracecall("output")
+        # an empty payload is what marks a pure ACK, an empty message would
+        # be taken for one and never delivered
+        if not message:
+            raise ValueError("layer 5 can't send an empty message")
+        payloads = fragment(message, self.mss) if self.mss else (message,)
+        for payload in payloads:
+            # Creating the packet, the acknum is filled in when it goes out
+            pkt = self.makepacket(self.inc_seqnum, self.expected, payload)
+            # Incrementing the sequence number for the next packet
+            self.inc_seqnum = (self.inc_seqnum + 1) % self.seqspace
+
+            # Queue the packet, it goes out as soon as the window has room for it.
+            self.to_send_window.append(pkt)
+        self.fill_window()
+
+    def fill_window(self):
+        """Send queued packets while fewer than N, and no more than the
+        congestion window, are waiting for an ACK"""
+        while (
+            self.to_send_window
+            and len(self.sent_packet_window) < self.congestion.window
+        ):
+            pkt = self.to_send_window.popleft()
+            self.senddata(pkt)  # Layer 3 is the medium which the packets are send through.
+            if self.requeued:
+                self.requeued -= 1  # A resend, Karn's rule
+            else:
+                self.sendtimes[pkt.seqnum] = self.sim.time
 
-        # Adding the packet to the sent_packet_window
-        self.sent_packet_window.append(pkt)
-        # Incrementing the sequence number for the next packet
-        self.inc_seqnum += 1
-        # Incrementing the ACK num so the receiver knows which ACK number to send back.
-        self.inc_acknum += 1
+            # The timer runs whenever there is something in the window.
+            if len(self.sent_packet_window) == 0:
+                self.starttimer(self.rtt.rto)
+            self.sent_packet_window.append(pkt)
+
+    def retransmit(self):
+        """Go back N: resend every packet in the window, or as many as the
+        congestion window allows and the rest once there is room again"""
+        while len(self.sent_packet_window) > self.congestion.window:
+            pkt = self.sent_packet_window.pop()
+            self.sendtimes.pop(pkt.seqnum, None)
+            self.to_send_window.appendleft(pkt)
+            self.requeued += 1
+        for packets in self.sent_packet_window:
+            # Karn's rule: an ACK for a resent packet says nothing about the RTT.
+            self.sendtimes.pop(packets.seqnum, None)
+            self.senddata(packets)
+
+    def senddata(self, pkt):
+        """Send a data packet carrying our latest ACK, which makes any
+        delayed ACK unnecessary"""
+        if pkt.acknum != self.expected:
+            pkt = self.makepacket(pkt.seqnum, self.expected, pkt.payload)
+        if self.ackdue:
+            self.ackdue = 0
+            if self.ackdelay:
+                self.stoptimer(ACKTIMER)
+        self.tolayer3(pkt)
+
+    def sendack(self):
+        """Send a pure ACK for everything delivered so far"""
+        if self.last_ack.acknum != self.expected:
+            self.last_ack = self.makepacket(0, self.expected, b"")
+        if self.ackdue:
+            self.ackdue = 0
+            if self.ackdelay:
+                self.stoptimer(ACKTIMER)
+        self.tolayer3(self.last_ack)
 
     def input(self, packet):
         """Called when the network has a packet for this entity"""
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        # TODO add some code
-        #print(f"\n\nGOT ACK PACKET: {packet}\n")
-
-        # Sending the packet to the corresponding ACK.
-        # Checks to make sure the list isn't empty and also checks to see if we get duplicate ACKs
-        # If a duplicate ACK is received, sends the next needed packet again.
-        if packet.acknum < 999999:
-            if packet.acknum == 0:
-                # Resending from the first packet.
-                for packets in self.sent_packet_window:
-                    #print(f"RESENDING PACKETS: {packets}")
-                    self.tolayer3(packets)
-
-
-            #elif (len(self.ack_received_window) > 0) and (packet.acknum == self.ack_received_window[-1].acknum):
-            elif any(packet.acknum == packets.acknum for packets in self.ack_received_window):
-                # Determining the needed packet
-                # print(f"RECEIVED ACK FOR THIS PACKET AGAIN: {self.ack_received_window[-1]}")
-                # Resending first 4 packets that have not been ACKed yet.
-                # Start index for resending
-                #start_index = self.ack_received_window[-1].seqnum
-
-                # End index, ensuring not to exceed the list length
-                #end_index = min(start_index + 4, len(self.sent_packet_window))
-
-                # Resend up to 4 packets starting from start_index
-                for packet in self.sent_packet_window:
-                    #print(f"RESENDING PACKETS: {packet}")
-                    self.tolayer3(packet)
-
-            # If the ACK is the correct ACK needed.
-            elif packet.acknum == self.sent_packet_window[0].acknum + 1:
-                #print(f"POPPING PACKET: {self.sent_packet_window[0]}")
-                # self.stoptimer()
-                self.sent_packet_window.pop(0)# Removing the packet out of the window
-                self.ack_received_window.append(packet)# just want to watch all the ACks come in
-
-                if len(self.sent_packet_window) > 0:# If there is still a packet in the window being waited on.
-                            self.starttimer(10)
-
-        # print("\n\n")
-        # self.window_print()
-        # print("\n\n")
-
-
-        # packet coming in from the medium?
-        #print(f"!!!!!\n\nInput Packet:\n{packet}\n\n!!!!!")
+        if self.sim.trace >= 2:
+            self.tracecall("input")
+
+        if self.iscorrupted(packet):
+            # None of it can be trusted. If we are receiving, a duplicate ACK
+            # gets the sender to resend without waiting for its timer.
+            if self.receiving:
+                self.sendack()
+            return
+
+        self.ackinput(packet)
+        if packet.payload:
+            self.datainput(packet)
+
+    def ackinput(self, packet):
+        """The acknum of any packet, pure ACK or data, ACKs our data"""
+        # ACKs are cumulative: acknum is the next seqnum the receiver expects.
+        if len(self.sent_packet_window) == 0:
+            return  # An old ACK for a window we already finished.
+
+        base = self.sent_packet_window[0].seqnum
+        # How many packets this ACK covers, counted from the base so it still
+        # works once the seqnums wrap around.
+        acked = (packet.acknum - base) % self.seqspace
+        # It may cover packets put back in the queue, the receiver had them
+        # all along and only the ACKs got lost.
+        if 0 < acked <= len(self.sent_packet_window) + self.requeued:
+            # Time the newest packet this ACK covers, if it was only sent once.
+            sent = self.sendtimes.get((packet.acknum - 1) % self.seqspace)
+            if sent is not None:
+                self.rtt.sample(self.sim.time - sent)
+
+            # Slide the window past everything the receiver has.
+            for _ in range(acked):
+                if self.sent_packet_window:
+                    self.sendtimes.pop(self.sent_packet_window.popleft().seqnum, None)
+                else:
+                    self.to_send_window.popleft()
+                    self.requeued -= 1
+            if self.recover is not None and acked > (self.recover - base) % self.seqspace:
+                self.recover = None
+            self.dupacks = 0
+            self.congestion.acked(acked)
+
+            self.stoptimer()
+            if len(self.sent_packet_window) > 0:# If there is still a packet in the window being waited on.
+                self.starttimer(self.rtt.rto)
+            self.fill_window()
+
+        elif acked == 0 and not packet.payload:
+            # Duplicate ACK: the receiver is still waiting on the base. Resend
+            # the window once, and only after a few of them, since every
+            # resent packet the receiver already has comes back as one too.
+            # Data packets repeat the acknum whenever there's nothing new to
+            # ACK, so only pure ACKs count. Once the resent window is in,
+            # the ones asking for the packet after it are echoes of resends
+            # the receiver already had, not a loss (NewReno's recovery point).
+            if base == self.recover:
+                return
+            self.dupacks += 1
+            if self.dupacks == DUPACKS:
+                self.recover = (self.sent_packet_window[-1].seqnum + 1) % self.seqspace
+                self.congestion.fastretransmit(len(self.sent_packet_window))
+                self.retransmit()
+
+    def datainput(self, packet):
+        """Deliver data packets in order, ACKing each one"""
+        self.receiving = True
+        if packet.seqnum != self.expected:
+            # Out of order or already delivered (our ACK must have been
+            # lost): ACK the last packet we have right away so the sender
+            # resends.
+            self.sendack()
+            return
+
+        # Sending the payload to layer 5
+        self.deliver(packet.payload)
+        self.expected = (self.expected + 1) % self.seqspace
+
+        # Hold the ACK back for outgoing data to carry it, but like TCP never
+        # leave more than one packet unacknowledged.
+        self.ackdue += 1
+        if not self.ackdelay or self.ackdue > 1:
+            self.sendack()
+        else:
+            self.starttimer(self.ackdelay, ACKTIMER)
+
+    def deliver(self, payload):
+        """Pass an in order payload up to layer 5, once all of its message
+        is there when messages are fragmented"""
+        if not self.mss:
+            self.tolayer5(payload)
+            return
+        self.fragments.append(payload[1:])
+        if payload[:1] == LAST:
+            self.tolayer5(b"".join(self.fragments))
+            self.fragments = []
+
+    def windowsize(self):
+        return len(self.sent_packet_window)
+
     def window_print(self):
         print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
         for packets in self.sent_packet_window:
-            print(f"A sent_packet_window: {packets}")
-        print("\n")
-        for packets in self.ack_received_window:
-            print(f"ack_received_window: {packets}")
+            print(f"{self} sent_packet_window: {packets}")
+        print(f"{self} expected: {self.expected}")
         print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
 
 
-    def timerinterrupt(self):
+    def timerinterrupt(self, key=None):
         """called when your timer has expired"""
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        #print("RIGHT NOW THE TIMERINTERRUPT CODE WOULD RUN")
-        for packets in self.sent_packet_window:
-            self.tolayer3(packets)
+        if self.sim.trace >= 2:
+            self.tracecall("timerinterrupt")
+        if key == ACKTIMER:
+            # No data came along to carry the ACK
+            self.ackdue = 0
+            self.sendack()
+            return
+        self.rtt.backoff()
+        self.congestion.timeout(len(self.sent_packet_window))
+        self.retransmit()
+        if len(self.sent_packet_window) > 0:
+            self.starttimer(self.rtt.rto)
 
 
     # From here down are functions you may call that interact with the simulator.
     # You should not need to modify these functions.
 
-    def starttimer(self, increment):
+    def starttimer(self, increment, key=None):
         """Provided: call this function to start your timer"""
-        self.sim.starttimer(self, increment)
+        self.sim.starttimer(self, increment, key)
 
-    def stoptimer(self):
+    def stoptimer(self, key=None):
         """Provided: call this function to stop your timer"""
-        self.sim.stoptimer(self)
+        self.sim.stoptimer(self, key)
 
     def tolayer5(self, data):
         """Provided: call this function when you have data ready for layer5"""
@@ -172,184 +361,16 @@ class EntityA(Entity):
         self.sim.tolayer3(self, packet)
 
     def __str__(self):
-        return "EntityA"
+        return f"EntityA[{self.flow}]" if self.flow else "EntityA"
 
     def __repr__(self):
         return self.__str__()
 
 
 # noinspection PyShadowingNames
-class EntityB(Entity):
-    def __init__(self, sim):
-        super().__init__(sim)
-
-        # Initialize anything you need here
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        self.receiver_packet_window = []
-        self.sent_ack_window = []
-        self.sent_layer_five = []
-
-    # Called when layer5 wants to introduce new data into the stream
-    # For EntityB, this function does not need to be filled in unless
-    # you're doing the extra credit, bidirectional part of the assignment
-    def output(self, message):
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        # TODO add some code
-        pass
-
-    # Called when the network has a packet for this entity
-    def input(self, packet):
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-
-
-        #print(f"RECEIVED PACKET: {packet}")# Debugging: DELETE!!!
-        # TODO add some code
-
-        # Filtering out the packets that Entity has already received and sent to layer 5.
-        # for packets in self.sent_layer_five:
-        #     if packet.seqnum == packets.seqnum or packet.acknum == packets.acknum:
-        #         print(f"IGNORING DUPLICATE PACKET: {packet}")
-        #         break
-
-        #if any(packet.seqnum == received_packet.seqnum for received_packet in self.sent_layer_five):
-
-
-        if (packet.seqnum == 999999 or packet.acknum == 999999) or packet.payload[:1] == 'Z':# Check for corruption
-            if len(self.receiver_packet_window) > 0:# Check it see if there has already been an ACK sent
-                # Sending the last ACK to the sender
-                self.tolayer3(self.sent_ack_window[-1])
-
-                #print(f"SENDING LAST ACK: {self.receiver_packet_window[-1].acknum + 1}")
-
-            elif len(self.receiver_packet_window) < 0:# If no ACK has been sent, then we still need the first packet.
-                ack_pkt = pk.Packet()
-                ack_pkt.payload = ""  # Just putting the payload here instead of "" just for debugging
-                ack_pkt.checksum = 0
-                ack_pkt.seqnum = 0
-                ack_pkt.acknum = 0
-
-                # Sending the new ACK to the sender
-                self.tolayer3(ack_pkt)
-                # Adding that packet to the sent_packet_window.
-                self.sent_ack_window.append(ack_pkt)
-
-        # elif (len(self.sent_layer_five) > 0) and (packet.acknum == self.sent_layer_five[-1].acknum):
-        #     # Do nothing
-        #     print(f"IGNORING DUPLICATE PACKET: {packet}")
-
-        elif any(packet.seqnum == packets.seqnum or packet.acknum == packets.acknum for packets in self.sent_layer_five):
-            pass
-
-            # print(f"IGNORING DUPLICATE PACKET: {packet}")
-
-            # Adding to the receiving window.
-        elif packet.seqnum == 0:# Not corrupted but checking to see if it's the first packet.
-            self.receiver_packet_window.append(packet)
-
-            # Creating the packet for the ACK
-            ack_pkt = pk.Packet()
-            ack_pkt.payload = "" # packet.payload  # Just putting the payload here instead of "" just for debugging
-            ack_pkt.checksum = 0
-            ack_pkt.seqnum = 0
-            ack_pkt.acknum = packet.acknum + 1
-
-            # Sending the payload to layer 5
-            self.tolayer5(packet.payload)
-            self.sent_layer_five.append(packet)
-
-            # Adding that packet to the sent_packet_window.
-            self.sent_ack_window.append(ack_pkt)
-            # Sending the new ACK to the sender
-            self.tolayer3(ack_pkt)
-
-        # Making sure there is something is the list to check also making sure we have the packets in the correct order
-        elif (len(self.receiver_packet_window) > 0) and (packet.seqnum == self.receiver_packet_window[-1].seqnum + 1):# Seqnum + 1 because we want to see if it's the packet after the last.
-            self.receiver_packet_window.append(packet)# Why am I adding them to this list? How am I using it to move the window?
-
-            # Creating the packet for the ACK
-            ack_pkt = pk.Packet()
-            ack_pkt.payload = ""  # Just putting the payload here instead of "" just for debugging
-            ack_pkt.checksum = 0
-            ack_pkt.seqnum = 0
-            ack_pkt.acknum = packet.acknum + 1
-
-            # Sending the payload to layer 5
-            self.tolayer5(packet.payload)
-            # Adding that packet to the sent_packet_window.
-            self.sent_layer_five.append(packet)
-
-            # Sending the new ACK to the sender
-            self.tolayer3(ack_pkt)
-            # Adding that packet to the sent_packet_window.
-            self.sent_ack_window.append(ack_pkt)
-
-        elif len(self.receiver_packet_window) > 0:# If we get a non-corrupted packet, but it's out of order.
-                # Sending the last ACK to the sender
-                self.tolayer3(self.sent_ack_window[-1])
-
-                #print(f"SENDING LAST ACK: {self.receiver_packet_window[-1].acknum + 1}")
-
-        else:# Trying to see if the first packet gets corrupted. If so, we never send out ACK 1 which causes us to never get the first packet sent again.
-            # Creating the packet for the first missing ACK
-            ack_pkt = pk.Packet()
-            ack_pkt.payload = "" # packet.payload  # Just putting the payload here instead of "" just for debugging
-            ack_pkt.checksum = 0
-            ack_pkt.seqnum = 0
-            ack_pkt.acknum = 0
-
-            # Sending the new ACK to the sender
-            self.tolayer3(ack_pkt)
-            # Adding that packet to the sent_packet_window.
-            self.sent_ack_window.append(ack_pkt)
-
-        # # print("\n\n")
-        # self.window_print()
-        # # print("\n\n")
-
-
-
-    def window_print(self):
-        print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
-        for packets in self.receiver_packet_window:
-            print(f"B receiver_packet_window: {packets}")
-        print("\n")
-        for packets in self.sent_ack_window:
-            print(f"sent_ack_window: {packets}")
-        print("\n")
-        for packets in self.sent_layer_five:
-            print(f"B sent_layer_five: {packets}")
-        print("+++++++++++++++++++++++++++++++++++++++++++++++++++++++++++")
-
-    # called when your timer has expired
-    def timerinterrupt(self):
-        print(f"{self.__class__.__name__}.{inspect.currentframe().f_code.co_name} called.")
-        pass
-
-
-    def starttimer(self, increment):
-        """Provided: call this function to start your timer"""
-        self.sim.starttimer(self, increment)
-
-    def stoptimer(self):
-        """Provided: call this function to stop your timer"""
-        self.sim.stoptimer(self)
-
-        def factorial(n):
-            if n == 1:
-                return 1
-            else:
-                return n * factorial(n - 1)
-
-    def tolayer5(self, data):
-        """Provided: call this function when you have data ready for layer5"""
-        self.sim.tolayer5(self, data)
-
-    def tolayer3(self, packet):
-        """Provided: call this function to send a layer3 packet"""
-        self.sim.tolayer3(self, packet)
+class EntityB(EntityA):
+    """Concrete implementation of EntityB. It receives what EntityA sends,
+    and with --bidirectional sends data back the same way"""
 
     def __str__(self):
-        return "EntityB"
-
-    def __repr__(self):
-        return self.__str__()
+        return f"EntityB[{self.flow}]" if self.flow else "EntityB"
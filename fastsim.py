@@ -0,0 +1,287 @@
+"""A fast approximate model of the simulator for narrowing down large
+sweeps before spending full simulation time on them.
+
+Instead of stepping through events it runs thousands of independent
+replications at once as NumPy arrays, one message at a time across all of
+them. Arrivals follow generate_next_arrival and every try sees the loss,
+corruption and delay of a Channel, but Go-Back-N with a window of N is
+reduced to a recursion over the messages:
+
+    send_i    = max(arrival_i, acked_{i-N})               room in the window
+    attempt_i = send_i + the time lost to failed tries
+    deliver_i = max(attempt_i, deliver_{i-1}) + fwd_i     FIFO channel to B
+    acked_i   = max(deliver_i, acked_{i-1}) + back_i      FIFO channel to A
+
+The number of tries is geometric. A failed try costs a timeout, or for the
+first one about a round trip when enough packets follow it to trigger a
+fast retransmit, and it also resends the packets sent after it in the
+window, which hold up the channel for their mean delay. The timeout is
+fixed, so the model fits best when it is well above the RTT and the channel
+is lightly loaded; crossvalidate() runs a configuration through Simulator
+as well to see how far off it is. A window of 1 is stop-and-wait.
+
+Unlike the rest of the simulator this module needs NumPy.
+
+    python fastsim.py --replications 2000 --lossprob 0.1 --timeout 100
+    python fastsim.py --lossprob 0.1 --timeout 100 --validate 20
+"""
+
+import argparse
+
+import numpy
+
+import channel
+import entity
+from simulator import MSGLEN, Simulator
+
+# the quantities the model estimates, as named in RunResult and sweep.py
+RESULTS = ["time", "goodput", "retransmission_ratio", "delay_mean", "delay_p90"]
+
+
+# Vectorized versions of the delay distributions of channel.py, each a
+# callable draw(rng, shape) returning an array of one way delays.
+
+
+def uniform_delay(low=1.0, high=10.0):
+    def draw(rng, shape):
+        return rng.uniform(low, high, shape)
+
+    return draw
+
+
+def exponential_delay(mean=5.0, minimum=0.0):
+    def draw(rng, shape):
+        return minimum + rng.exponential(mean, shape)
+
+    return draw
+
+
+def constant_delay(value=5.0):
+    def draw(rng, shape):
+        return numpy.full(shape, value)
+
+    return draw
+
+
+DELAYS = {
+    "uniform": uniform_delay,
+    "exponential": exponential_delay,
+    "constant": constant_delay,
+}
+
+
+def model(
+    replications,
+    messages,
+    corruptprob,
+    lossprob,
+    lambdat,
+    delay="uniform:1,10",
+    window=entity.WINDOW,
+    timeout=entity.TIMEOUT,
+    seed=0,
+):
+    """Run the model, returns a dict of RESULTS, each an array with one
+    entry per replication"""
+    rng = numpy.random.default_rng(seed)
+    draw = channel.parse_delay(delay, DELAYS)
+    shape = (messages, replications)
+
+    # tries until the packet gets through intact, and for stop-and-wait the
+    # resends until an ACK makes it back, with a window the ACKs of later
+    # packets cover a lost one
+    intact = (1.0 - lossprob) * (1.0 - corruptprob)
+    if intact <= 0.0:
+        raise ValueError("no packet can ever get through the channel")
+    datafailures = rng.geometric(intact, shape) - 1
+    if window == 1:
+        # a resend only brings back an ACK if it isn't lost on the way, the
+        # receiver ACKs it even when corrupted
+        resend = (1.0 - lossprob) * intact
+        ackfailures = numpy.where(
+            rng.random(shape) < intact, 0, rng.geometric(resend, shape)
+        )
+    else:
+        ackfailures = numpy.zeros(shape, dtype=int)
+
+    # the inter arrival times of generate_next_arrival, uniform on [0, 2*lambda]
+    arrivals = numpy.cumsum(rng.uniform(0.0, 2.0 * lambdat, shape), axis=0)
+    forward = draw(rng, shape)
+    back = draw(rng, shape)
+    meandelay = float(forward.mean())
+
+    delivered = numpy.empty(shape)
+    acked = numpy.empty(shape)
+    lastdelivered = numpy.zeros(replications)
+    lastacked = numpy.zeros(replications)
+    retransmissions = numpy.zeros(replications)
+    later = entity.DUPACKS
+    for i in range(messages):
+        start = arrivals[i]
+        if i >= window:
+            start = numpy.maximum(start, acked[i - window])
+
+        # The first loss is found by the duplicate ACKs of the packets sent
+        # after it when there are enough of them in the window, which takes
+        # about their round trip instead of a timeout. When they went out
+        # only depends on ACKs we already have.
+        first = timeout
+        if window > later and i + later < messages:
+            behind = arrivals[i + later]
+            if i + later >= window:
+                behind = numpy.maximum(behind, acked[i + later - window])
+            rtt = forward[i + later] + back[i + later]
+            first = numpy.minimum(timeout, numpy.maximum(behind, start) - start + rtt)
+        failures = datafailures[i]
+        retry = (
+            start
+            + (failures > 0) * first
+            + numpy.maximum(failures - 1, 0) * timeout
+        )
+
+        # Go back N: every resend of the packet also resends whatever was
+        # sent after it in the window by then
+        resent = failures.astype(float)
+        for k in range(1, min(window, messages - i)):
+            j = i + k
+            behind = arrivals[j]
+            if j >= window:
+                behind = numpy.maximum(behind, acked[j - window])
+            resent += failures * (behind < retry)
+        retransmissions += resent + ackfailures[i]
+
+        # like Channel.send, a packet arrives after the one ahead of it,
+        # including the resends that weren't lost
+        queued = lastdelivered + resent * (1.0 - lossprob) * meandelay
+        lastdelivered = numpy.maximum(retry, queued) + forward[i]
+        lastacked = (
+            numpy.maximum(lastdelivered + ackfailures[i] * timeout, lastacked)
+            + back[i]
+        )
+        delivered[i] = lastdelivered
+        acked[i] = lastacked
+
+    time = acked[-1]
+    delays = delivered - arrivals
+    return {
+        "time": time,
+        "goodput": messages * MSGLEN / time,
+        "retransmission_ratio": retransmissions / (messages + retransmissions),
+        "delay_mean": delays.mean(axis=0),
+        "delay_p90": numpy.percentile(delays, 90, axis=0),
+    }
+
+
+def summarize(results):
+    """Mean and standard deviation over the replications of every result"""
+    return {
+        name: (float(numpy.mean(values)), float(numpy.std(values)))
+        for name, values in results.items()
+    }
+
+
+def simulate(
+    seeds,
+    messages,
+    corruptprob,
+    lossprob,
+    lambdat,
+    delay="uniform:1,10",
+    window=entity.WINDOW,
+    timeout=entity.TIMEOUT,
+):
+    """Run the same configuration through Simulator once per seed, with the
+    fixed timeout the model assumes, returns the RESULTS like model()"""
+    results = {name: [] for name in RESULTS}
+    for seed in seeds:
+        sim = Simulator(
+            False,
+            0,
+            seed,
+            messages,
+            corruptprob,
+            lossprob,
+            lambdat,
+            channel.parse_delay(delay),
+            metrics=True,
+            window=window,
+            timeout=timeout,
+            adaptive=False,
+        )
+        measured = sim.run()
+        results["time"].append(measured.time)
+        results["goodput"].append(measured.goodput)
+        results["retransmission_ratio"].append(measured.retransmission_ratio)
+        results["delay_mean"].append(measured.delay["mean"])
+        results["delay_p90"].append(measured.delay["p90"])
+    return {name: numpy.array(values) for name, values in results.items()}
+
+
+def crossvalidate(seeds, replications, *args, **kwargs):
+    """Compare the model against Simulator on one configuration, returns
+    name -> (model mean, simulator mean, relative error) for every result"""
+    fast = summarize(model(replications, *args, **kwargs))
+    slow = summarize(simulate(seeds, *args, **kwargs))
+    comparison = {}
+    for name in RESULTS:
+        estimate, measured = fast[name][0], slow[name][0]
+        error = abs(estimate - measured) / measured if measured else 0.0
+        comparison[name] = (estimate, measured, error)
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fast approximate simulator")
+    parser.add_argument(
+        "--replications",
+        default=1000,
+        type=int,
+        help="independent replications run at once",
+    )
+    parser.add_argument("--seed", default=0, type=int, help="set random seed")
+    parser.add_argument("--messages", default=1000, type=int)
+    parser.add_argument("--corruptprob", default=0.0, type=float)
+    parser.add_argument("--lossprob", default=0.0, type=float)
+    parser.add_argument("--lambda", default=20.0, type=float)
+    parser.add_argument("--delay", default="uniform:1,10")
+    parser.add_argument("--window", default=entity.WINDOW, type=int)
+    parser.add_argument(
+        "--timeout",
+        default=entity.TIMEOUT,
+        type=float,
+        help="fixed retransmission timeout, best kept above the largest RTT",
+    )
+    parser.add_argument(
+        "--validate",
+        default=0,
+        type=int,
+        help="also run this many seeds through Simulator and compare",
+    )
+    args = parser.parse_args()
+    assert args.replications > 0
+    assert args.messages > 0
+    assert args.window > 0
+    assert args.timeout > 0.0
+
+    config = (
+        args.messages,
+        args.corruptprob,
+        args.lossprob,
+        args.__dict__["lambda"],
+        args.delay,
+        args.window,
+        args.timeout,
+    )
+    if args.validate:
+        comparison = crossvalidate(range(args.validate), args.replications, *config)
+        print(f"{'':>22} {'model':>12} {'simulator':>12} {'error':>8}")
+        for name, (estimate, measured, error) in comparison.items():
+            print(f"{name:>22} {estimate:>12.4g} {measured:>12.4g} {error:>8.1%}")
+    else:
+        summary = summarize(model(args.replications, *config, seed=args.seed))
+        for name, (mean, std) in summary.items():
+            print(f"{name:>22} {mean:>12.4g} +- {std:.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Models of correlated loss and corruption for a Channel. Without one a
+channel loses and corrupts every packet independently with its lossprob and
+corruptprob, while real links lose packets in bursts, which windows and
+timeouts cope with very differently. A model steps once per packet sent and
+gives the loss and corruption probabilities of that packet; every direction
+gets a copy of its own, so the state of one doesn't follow the other.
+
+    --loss gilbert:0.01,0.25        Gilbert-Elliott, bad with probability
+                                    0.01 per packet, good again with 0.25
+    --loss gilbert:0.01,0.25,0.5,0.3
+                                    losing half the packets and corrupting
+                                    0.3 of the rest while bad
+    --loss trace:pattern.txt        the outcome of every packet from a file
+"""
+
+# outcomes of a packet in a loss trace: delivered, lost or corrupted
+DELIVERED = (0.0, 0.0)
+LOST = (1.0, 0.0)
+CORRUPTED = (0.0, 1.0)
+OUTCOMES = {
+    ord("0"): DELIVERED,
+    ord("."): DELIVERED,
+    ord("1"): LOST,
+    ord("x"): LOST,
+    ord("c"): CORRUPTED,
+}
+
+
+class GilbertElliott:
+    """Two state Markov chain stepped once per packet. The good state loses
+    and corrupts like the channel would without a model; from it the chain
+    goes bad with probability p, and from bad back to good with probability
+    r. Bad periods last 1/r packets on average and p/(p+r) of the packets
+    are sent in one. A run starts in the good state"""
+
+    def __init__(self, p, r, lossbad=1.0, corruptbad=None):
+        self.p = p
+        self.r = r
+        self.lossbad = lossbad
+        # None corrupts as in the good state, only the losses come in bursts
+        self.corruptbad = corruptbad
+        self.bad = False
+
+    def step(self, rng, lossprob, corruptprob):
+        if rng.random() < (self.r if self.bad else self.p):
+            self.bad = not self.bad
+        if not self.bad:
+            return lossprob, corruptprob
+        if self.corruptbad is None:
+            return self.lossbad, corruptprob
+        return self.lossbad, self.corruptbad
+
+
+class TraceLoss:
+    """Losses and corruptions replayed from a file of one character per
+    packet: 0 or . delivered, 1 or x lost, c corrupted; whitespace is
+    skipped. The pattern starts over when it runs out, and the delays are
+    drawn as usual. A short period can lock in step with the retransmissions,
+    0001 losing the same packet of a Go-Back-N window every time"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as source:
+            self.pattern = source.read().translate(None, b" \t\r\n")
+        if not self.pattern:
+            raise ValueError(f"empty loss trace {path!r}")
+        unknown = set(self.pattern) - set(OUTCOMES)
+        if unknown:
+            raise ValueError(
+                f"unknown outcome {chr(min(unknown))!r} in loss trace {path!r}"
+            )
+        self.position = 0
+
+    def step(self, rng, lossprob, corruptprob):
+        outcome = OUTCOMES[self.pattern[self.position]]
+        self.position += 1
+        if self.position == len(self.pattern):
+            self.position = 0
+        return outcome
+
+
+MODELS = {
+    "gilbert": GilbertElliott,
+    "trace": TraceLoss,
+}
+
+
+def parse_loss(spec):
+    """Build a loss model from a spec such as gilbert:0.01,0.25 or
+    trace:pattern.txt"""
+    name, _, args = spec.partition(":")
+    if name not in MODELS:
+        raise ValueError(f"unknown loss model {name!r}")
+    if name == "trace":
+        return MODELS[name](args)
+    params = [float(i) for i in args.split(",") if i]
+    return MODELS[name](*params)
@@ -0,0 +1,275 @@
+"""Metrics collected while a simulation runs. The simulator calls the
+Metrics hooks from tolayer3, tolayer5, the timers and around every entity
+callback; result() turns what was collected into a RunResult that can be
+inspected at any point of the run or dumped as JSON at the end"""
+
+import json
+from collections import deque
+
+
+class Histogram:
+    """Fixed bin width histogram of non-negative samples"""
+
+    def __init__(self, width=1.0):
+        self.width = width
+        self.bins = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        index = int(value // self.width)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """Upper edge of the bin holding the q-quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= target:
+                return min((index + 1) * self.width, self.max)
+        return self.max
+
+    def asdict(self):
+        return {
+            "width": self.width,
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "bins": {index * self.width: n for index, n in sorted(self.bins.items())},
+        }
+
+
+class Occupancy:
+    """Time weighted view of a quantity that changes over time, like the
+    number of packets in a send window"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.value = 0
+        self.since = 0.0
+        self.area = 0.0
+        self.max = 0
+        self.series = []
+
+    def update(self, time, value):
+        if value == self.value:
+            return
+        self.area += self.value * (time - self.since)
+        self.value = value
+        self.since = time
+        if value > self.max:
+            self.max = value
+        if not self.series or time - self.series[-1][0] >= self.interval:
+            self.series.append((time, value))
+
+    def mean(self, time):
+        if time <= 0.0:
+            return float(self.value)
+        return (self.area + self.value * (time - self.since)) / time
+
+    def asdict(self, time):
+        return {"mean": self.mean(time), "max": self.max, "series": self.series}
+
+
+class RunResult:
+    """What a run measured, as plain attributes"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def asdict(self):
+        return dict(self.__dict__)
+
+    def tojson(self, **kwargs):
+        return json.dumps(self.asdict(), **kwargs)
+
+    def __repr__(self):
+        return f"RunResult({self.asdict()})"
+
+
+class FlowMetrics:
+    """Counters of one flow, a sender/receiver pair, to compare the flows
+    sharing a bottleneck"""
+
+    def __init__(self):
+        self.datasent = 0
+        self.retransmissions = 0
+        self.delivered = 0
+        self.bytesdelivered = 0
+        self.delaytotal = 0.0
+
+    def goodput(self, time):
+        return self.bytesdelivered / time if time > 0.0 else 0.0
+
+    def asdict(self, time):
+        return {
+            "datasent": self.datasent,
+            "retransmissions": self.retransmissions,
+            "delivered": self.delivered,
+            "goodput": self.goodput(time),
+            "delay_mean": self.delaytotal / self.delivered if self.delivered else None,
+        }
+
+
+def fairness(values):
+    """Jain's fairness index, 1 when every value is the same down to 1/n
+    when one flow gets everything"""
+    values = list(values)
+    square = sum(i * i for i in values)
+    if not square:
+        return 1.0
+    return sum(values) ** 2 / (len(values) * square)
+
+
+class Metrics:
+    """Collects goodput, retransmissions, end to end delay, timer and
+    window statistics of one simulation"""
+
+    def __init__(self, sim, delaywidth=1.0, interval=1.0):
+        self.sim = sim
+        self.interval = interval
+
+        # messages handed to layer 4, waiting for delivery on the other side
+        self.pending = {}
+
+        self.ndatasent = 0
+        self.nretransmit = 0
+        self.nacksent = 0
+        self.highest = {}
+
+        self.ndelivered = 0
+        self.nbytesdelivered = 0
+        self.nmisdelivered = 0
+        self.delay = Histogram(delaywidth)
+
+        self.ntimerstarted = {}
+        self.ntimerfired = {}
+        self.windows = {}
+        self.flows = [FlowMetrics() for _ in sim.flows]
+
+    def layer5(self, entity, dest, time, message):
+        """A message was given to entity for delivery at dest"""
+        self.pending.setdefault(dest, deque()).append((time, message))
+
+    def sent(self, entity, packet):
+        """entity handed a packet to layer 3"""
+        if not packet.payload:
+            self.nacksent += 1
+            return
+        self.ndatasent += 1
+        flow = self.flows[entity.flow]
+        flow.datasent += 1
+        highest = self.highest.get(entity)
+        # seqnums wrap, so count back from the highest one sent: anything
+        # less than a window behind it is a resend
+        if (
+            highest is not None
+            and (highest - packet.seqnum) % self.sim.seqspace < self.sim.window
+        ):
+            self.nretransmit += 1
+            flow.retransmissions += 1
+        else:
+            self.highest[entity] = packet.seqnum
+
+    def delivered(self, entity, time, message):
+        """entity passed a message up to layer 5, returns its delay or None
+        when it was never sent"""
+        self.ndelivered += 1
+        self.nbytesdelivered += len(message)
+        flow = self.flows[entity.flow]
+        flow.delivered += 1
+        flow.bytesdelivered += len(message)
+        pending = self.pending.get(entity)
+        if not pending:
+            self.nmisdelivered += 1
+            return None
+        arrival, expected = pending.popleft()
+        if message != expected:
+            self.nmisdelivered += 1
+        self.delay.add(time - arrival)
+        flow.delaytotal += time - arrival
+        return time - arrival
+
+    def timerstarted(self, entity):
+        name = str(entity)
+        self.ntimerstarted[name] = self.ntimerstarted.get(name, 0) + 1
+
+    def timerfired(self, entity):
+        name = str(entity)
+        self.ntimerfired[name] = self.ntimerfired.get(name, 0) + 1
+
+    def window(self, entity, time, size):
+        """Size of entity's send window after one of its callbacks"""
+        occupancy = self.windows.get(entity)
+        if occupancy is None:
+            if not size:
+                return
+            occupancy = self.windows[entity] = Occupancy(self.interval)
+        occupancy.update(time, size)
+
+    def result(self):
+        """Everything measured up to the current simulation time"""
+        sim = self.sim
+        time = sim.time
+        channels = {}
+        for source, channel in sim.channels.items():
+            channels[f"{source}->{channel.dest}"] = {
+                "sent": channel.nsent,
+                "lost": channel.nlost,
+                "lossburst": channel.lossburst(),
+                "corrupted": channel.ncorrupt,
+                "inflight": channel.meaninflight(time),
+                "utilization": channel.utilization(time),
+            }
+        # only runs with several flows, a bottleneck or a stop report on them
+        extra = {}
+        if len(self.flows) > 1:
+            extra["flows"] = [flow.asdict(time) for flow in self.flows]
+            extra["fairness"] = fairness(flow.goodput(time) for flow in self.flows)
+        if sim.links[0] is not None:
+            extra["bottleneck"] = {
+                direction: link.asdict(time)
+                for direction, link in zip(("forward", "reverse"), sim.links)
+            }
+        if sim.stop is not None:
+            extra["stop"] = sim.stop.asdict()
+        return RunResult(
+            time=time,
+            nsim=sim.nsim,
+            ntolayer3=sim.ntolayer3,
+            nlost=sim.nlost,
+            ncorrupt=sim.ncorrupt,
+            delivered=self.ndelivered,
+            misdelivered=self.nmisdelivered,
+            goodput=self.nbytesdelivered / time if time > 0.0 else 0.0,
+            datasent=self.ndatasent,
+            acksent=self.nacksent,
+            retransmissions=self.nretransmit,
+            retransmission_ratio=(
+                self.nretransmit / self.ndatasent if self.ndatasent else 0.0
+            ),
+            delay=self.delay.asdict(),
+            timers_started=dict(self.ntimerstarted),
+            timers_fired=dict(self.ntimerfired),
+            windows={str(e): w.asdict(time) for e, w in self.windows.items()},
+            channels=channels,
+            **extra,
+        )
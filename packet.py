@@ -2,20 +2,50 @@
 # The packet class is really just a structure to hold four values:
 # acknum - acknowledgement number
 # seqnum - sequence number
-# payload - a message (string of characters)
+# payload - a message (bytes)
 # checksum - a checksum provided by the user
 #
 # This class gives no guidance on how to allocate sequence numbers
 # or compute checksums, instead the caller is expected to set these
-# fields appropriately for their implementation. The simulator
+# fields appropriately when building the packet. The simulator
 # uses the values of these fields to print information.
 
+# Packets are immutable so the simulator can hand the very same object from
+# the sender to the receiver without copying it. Use replace() to derive a
+# modified packet.
+
 class Packet:
-    def __init__(self):
-        self.acknum = None
-        self.seqnum = None
-        self.payload = None
-        self.checksum = None
+    __slots__ = ("acknum", "seqnum", "payload", "checksum")
+
+    def __init__(self, acknum=None, seqnum=None, payload=None, checksum=None):
+        object.__setattr__(self, "acknum", acknum)
+        object.__setattr__(self, "seqnum", seqnum)
+        object.__setattr__(self, "payload", payload)
+        object.__setattr__(self, "checksum", checksum)
+
+    def asdict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def replace(self, **changes):
+        """Return a copy of this packet with some fields changed"""
+        fields = self.asdict()
+        fields.update(changes)
+        return Packet(**fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Packet is immutable, use replace() to change {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Packet is immutable, can not delete {name}")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (Packet, (self.acknum, self.seqnum, self.payload, self.checksum))
 
     def __repr__(self):
         return f'Packet(acknum={self.acknum}, seqnum={self.seqnum}, checksum={self.checksum}, payload={self.payload})'
@@ -0,0 +1,218 @@
+"""Opt-in profiling of a simulation, to see where the time of a run goes.
+
+Profile times every event the run loop dispatches by event type, and wraps
+the entity callbacks and the simulator methods they call so the time spent
+in protocol code can be told apart from simulator bookkeeping. The wrappers
+are instance attributes put in place only when profiling, so a simulation
+without a Profile runs exactly the same code as before.
+
+Sampler is a statistical profiler for long runs: a SIGPROF timer notes the
+function running every interval of CPU time. cProfile is available through
+report() as well:
+
+    python simulator.py --messages 100000 --trace 0 --profile events
+    python simulator.py --messages 100000 --trace 0 --profile sample
+    python simulator.py --messages 100000 --trace 0 --profile cprofile \\
+        --profile-output run.pstats
+"""
+
+import cProfile
+import json
+import pstats
+import signal
+import sys
+from collections import Counter
+from time import perf_counter
+
+PROFILES = ("events", "sample", "cprofile")
+
+# simulator methods called from the entities or the run loop
+SIMULATOR = (
+    "generate_next_arrival",
+    "insertevent",
+    "cancelevent",
+    "starttimer",
+    "stoptimer",
+    "tolayer3",
+    "tolayer5",
+)
+# entity callbacks, everything they don't spend in SIMULATOR is protocol code
+CALLBACKS = ("output", "input", "timerinterrupt")
+
+
+class Timing:
+    """Calls of one function, with and without the functions it called"""
+
+    def __init__(self):
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+    def asdict(self):
+        return {
+            "calls": self.calls,
+            "inclusive": self.inclusive,
+            "exclusive": self.exclusive,
+        }
+
+
+class Profile:
+    """Wall time per event type and per instrumented function of one
+    simulation"""
+
+    def __init__(self, sim):
+        self.wall = 0.0
+        self.events = {}
+        self.calls = {}
+        # time spent in instrumented calls by each call still running
+        self.stack = []
+        for name in SIMULATOR:
+            setattr(sim, name, self.wrap(f"Simulator.{name}", getattr(sim, name)))
+        for pair in sim.flows:
+            for entity in pair:
+                cls = type(entity).__name__
+                for name in CALLBACKS:
+                    method = self.wrap(f"{cls}.{name}", getattr(entity, name))
+                    setattr(entity, name, method)
+
+    def wrap(self, name, method):
+        """method timed as name"""
+        timing = self.calls.setdefault(name, Timing())
+        stack = self.stack
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            started = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - started
+                timing.calls += 1
+                timing.inclusive += elapsed
+                timing.exclusive += elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+
+        return timed
+
+    def event(self, name, elapsed):
+        """The run loop dispatched an event of type name in elapsed seconds"""
+        timing = self.events.get(name)
+        if timing is None:
+            timing = self.events[name] = Timing()
+        timing.calls += 1
+        timing.inclusive += elapsed
+
+    def summary(self):
+        events = sum(i.inclusive for i in self.events.values())
+        protocol = sum(
+            timing.exclusive
+            for name, timing in self.calls.items()
+            if name.rpartition(".")[2] in CALLBACKS
+        )
+        return {
+            "wall": self.wall,
+            # popping and skipping events, outside of any event
+            "queue": self.wall - events,
+            "protocol": protocol,
+            "simulator": events - protocol,
+            "events": {
+                name: {"calls": i.calls, "inclusive": i.inclusive}
+                for name, i in self.events.items()
+            },
+            "calls": {name: i.asdict() for name, i in self.calls.items() if i.calls},
+        }
+
+    def report(self, output):
+        summary = self.summary()
+        wall = summary["wall"] or 1.0
+        print(
+            f"{'':>32} {'calls':>10} {'seconds':>10} {'self':>10} {'%':>6}",
+            file=output,
+        )
+        for name in ("queue", "simulator", "protocol"):
+            print(
+                f"{name:>32} {'':>10} {summary[name]:>10.3f} {'':>10} "
+                f"{summary[name] / wall:>6.1%}",
+                file=output,
+            )
+        for table in ("events", "calls"):
+            rows = sorted(summary[table].items(), key=lambda i: -i[1]["inclusive"])
+            for name, i in rows:
+                exclusive = f"{i['exclusive']:>10.3f}" if "exclusive" in i else ""
+                print(
+                    f"{name:>32} {i['calls']:>10} {i['inclusive']:>10.3f} "
+                    f"{exclusive:>10} {i['inclusive'] / wall:>6.1%}",
+                    file=output,
+                )
+
+
+class Sampler:
+    """Counts the function running, and every function on the stack, each
+    interval seconds of CPU time while it is entered"""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.nsamples = 0
+        self.running = Counter()
+        self.onstack = Counter()
+        self.previous = None
+
+    def sample(self, signum, frame):
+        self.nsamples += 1
+        self.running[self.where(frame)] += 1
+        seen = set()
+        while frame is not None:
+            where = self.where(frame)
+            if where not in seen:
+                seen.add(where)
+                self.onstack[where] += 1
+            frame = frame.f_back
+
+    @staticmethod
+    def where(frame):
+        code = frame.f_code
+        return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+    def __enter__(self):
+        self.previous = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_PROF, 0.0)
+        signal.signal(signal.SIGPROF, self.previous)
+
+    def summary(self, top=25):
+        return {
+            "interval": self.interval,
+            "samples": self.nsamples,
+            "running": dict(self.running.most_common(top)),
+            "onstack": dict(self.onstack.most_common(top)),
+        }
+
+    def report(self, output, top=25):
+        total = self.nsamples or 1
+        print(
+            f"{self.nsamples} samples every {self.interval} s of CPU time",
+            file=output,
+        )
+        tables = (("running", self.running), ("on the stack", self.onstack))
+        for title, counts in tables:
+            print(f"  {title}:", file=output)
+            for where, count in counts.most_common(top):
+                print(f"{count / total:>8.1%}  {where}", file=output)
+
+
+def report(profiler, path=None, output=sys.stdout):
+    """Print the summary of a Profile, Sampler or cProfile.Profile and save
+    it to path, as JSON or for cProfile in pstats format"""
+    if isinstance(profiler, cProfile.Profile):
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(25)
+        if path is not None:
+            profiler.dump_stats(path)
+        return
+    if path is not None:
+        with open(path, "w") as summary:
+            json.dump(profiler.summary(), summary, indent=2)
+    profiler.report(output)
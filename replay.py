@@ -0,0 +1,92 @@
+"""Recording and replay of channel decisions. Replaying a recording runs a
+protocol against exactly the channel another run saw, packet for packet, so
+two EntityA/EntityB implementations can be compared without the noise of
+different losses, delays and corruptions.
+
+A recording is MAGIC followed by one RECORD per packet in the order the
+packets were sent:
+
+    flags    LOST, CORRUPTED, and FROMB for the channel from EntityB
+    delay    one way delay, 0 when lost
+    corrupt  where the flipped bit lands as a fraction of the packet length,
+             0 when intact
+
+The k-th packet a channel carries gets the k-th decision recorded for it,
+whatever the packet is. A replay maps the file into memory and streams the
+records of each channel from it without copying; a run that sends more
+packets than were recorded draws the rest as usual."""
+
+import mmap
+import struct
+
+MAGIC = b"CHANREC1"
+RECORD = struct.Struct("<Bdd")
+
+LOST = 1
+CORRUPTED = 2
+FROMB = 4
+
+
+class Recorder:
+    """Writes the decisions of both channels of a run to a file"""
+
+    def __init__(self, path, bufsize=1 << 16):
+        self.output = open(path, "wb", buffering=bufsize)
+        self.output.write(MAGIC)
+
+    def writer(self, direction):
+        """Function recording a decision of one channel, direction is 0 for
+        the channel from EntityA and 1 for the one from EntityB"""
+        channel = FROMB if direction else 0
+        write = self.output.write
+        pack = RECORD.pack
+
+        def record(decision):
+            lost, delay, corrupt = decision
+            flags = channel
+            if lost:
+                flags |= LOST
+            if corrupt is None:
+                corrupt = 0.0
+            else:
+                flags |= CORRUPTED
+            write(pack(flags, delay, corrupt))
+
+        return record
+
+    def close(self):
+        self.output.close()
+
+
+class Replay:
+    """Streams the decisions of a recording back, channel by channel"""
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[: len(MAGIC)] != MAGIC:
+            self.map.close()
+            raise ValueError(f"{path} is not a channel recording")
+        if (len(self.map) - len(MAGIC)) % RECORD.size:
+            self.map.close()
+            raise ValueError(f"{path} is truncated")
+        self.readers = []
+
+    def decisions(self, direction):
+        """Iterator over the (lost, delay, corrupt) decisions of one channel,
+        direction as for Recorder.writer"""
+        reader = self.read(FROMB if direction else 0)
+        self.readers.append(reader)
+        return reader
+
+    def read(self, channel):
+        view = memoryview(self.map)[len(MAGIC) :]
+        for flags, delay, corrupt in RECORD.iter_unpack(view):
+            if flags & FROMB == channel:
+                yield bool(flags & LOST), delay, corrupt if flags & CORRUPTED else None
+
+    def close(self):
+        # the readers hold views into the map, which can't close under them
+        for reader in self.readers:
+            reader.close()
+        self.map.close()
@@ -0,0 +1,54 @@
+"""Retransmission timeouts for the sending entities. RttEstimator adapts the
+timeout to the measured round trip time the way TCP does (RFC 6298), with
+exponential backoff on timeouts; FixedTimeout always uses the same value"""
+
+# the shortest possible round trip is two minimal one way delays
+MINRTO = 2.0
+MAXRTO = 640.0
+
+
+class FixedTimeout:
+    """A constant timeout that ignores RTT samples and timeouts"""
+
+    def __init__(self, timeout):
+        self.rto = timeout
+
+    def sample(self, rtt):
+        pass
+
+    def backoff(self):
+        pass
+
+
+class RttEstimator:
+    """Smoothed RTT and RTT variance estimation. The caller is responsible
+    for Karn's rule: never sample a packet that was retransmitted, since
+    its ACK can't be matched to one particular transmission"""
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    def __init__(self, initial, minimum=MINRTO, maximum=MAXRTO):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = None
+        self.rto = min(max(initial, minimum), maximum)
+
+    def sample(self, rtt):
+        """Fold in the round trip time of a packet sent only once, this
+        also drops any backoff"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(
+                self.srtt - rtt
+            )
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = min(max(self.srtt + self.K * self.rttvar, self.minimum), self.maximum)
+
+    def backoff(self):
+        """Double the timeout after it expired"""
+        self.rto = min(self.rto * 2, self.maximum)
@@ -0,0 +1,169 @@
+"""Selective Repeat versions of EntityA and EntityB. Each packet is
+acknowledged on its own and has its own timer, so a loss only costs the
+lost packet instead of the whole window as with Go-Back-N"""
+
+import itertools
+
+from entity import DUPACKS, SEQSPACE, TIMEOUT, WINDOW, EntityA
+
+
+# noinspection PyShadowingNames
+class SelectiveRepeatA(EntityA):
+    """Sender: keeps up to N packets in flight, each with a timer keyed on
+    its sequence number, and only resends the ones that time out, or that
+    DUPACKS later packets got ACKed ahead of.
+
+    Receiver: ACKs every packet in its window, buffers the ones that arrive
+    out of order and delivers them to layer 5 in order. An ACK names a
+    single packet, so ACKs always go out on their own rather than
+    piggybacked on data"""
+
+    def __init__(
+        self,
+        sim,
+        window=WINDOW,
+        timeout=TIMEOUT,
+        adaptive=True,
+        seqspace=SEQSPACE,
+        flow=0,
+        congestion=False,
+        mss=None,
+    ):
+        super().__init__(
+            sim,
+            window,
+            timeout,
+            adaptive,
+            seqspace,
+            flow=flow,
+            congestion=congestion,
+            mss=mss,
+        )
+        self.acked = set()  # Seqnums in the window the receiver has ACKed
+        self.fastresent = set()  # Seqnums resent on the ACKs of later packets
+        # Ring buffer of the receive window, slot head holds seqnum expected
+        # and the slots after it the seqnums after that, None until they
+        # arrive
+        self.buffer = [None] * window
+        self.head = 0
+
+    def fill_window(self):
+        """Send queued packets while fewer than N, and no more than the
+        congestion window, are in the window"""
+        while (
+            self.to_send_window
+            and len(self.sent_packet_window) < self.congestion.window
+        ):
+            pkt = self.to_send_window.popleft()
+            self.tolayer3(pkt)
+            self.sendtimes[pkt.seqnum] = self.sim.time
+            self.starttimer(self.rtt.rto, pkt.seqnum)
+            self.sent_packet_window.append(pkt)
+
+    def input(self, packet):
+        if self.sim.trace >= 2:
+            self.tracecall("input")
+
+        if self.iscorrupted(packet):
+            return  # The sender's timer takes care of it.
+        if packet.payload:
+            self.datainput(packet)
+        else:
+            self.ackinput(packet)
+
+    def ackinput(self, packet):
+        """An ACK acknowledges exactly the packet with seqnum acknum"""
+        if len(self.sent_packet_window) == 0:
+            return
+        base = self.sent_packet_window[0].seqnum
+        if (packet.acknum - base) % self.seqspace >= len(self.sent_packet_window):
+            return  # A duplicate ACK for a packet already slid out of the window.
+        if packet.acknum in self.acked:
+            return
+
+        self.acked.add(packet.acknum)
+        self.stoptimer(packet.acknum)
+        sent = self.sendtimes.pop(packet.acknum, None)
+        if sent is not None:
+            # A packet sent only once, this also ends any backoff.
+            self.rtt.sample(self.sim.time - sent)
+        self.congestion.acked(1)
+
+        # Slide the window past every ACKed packet at its start.
+        while self.sent_packet_window and self.sent_packet_window[0].seqnum in self.acked:
+            seqnum = self.sent_packet_window.popleft().seqnum
+            self.acked.remove(seqnum)
+            self.fastresent.discard(seqnum)
+        self.fastretransmit()
+        self.fill_window()
+
+    def fastretransmit(self):
+        """Resend, once, every packet that DUPACKS packets sent after it
+        were ACKed ahead of, instead of waiting out its timer. The channel
+        keeps packets in order, so it is almost certainly lost"""
+        later = 0
+        lost = []
+        for pkt in reversed(self.sent_packet_window):
+            if pkt.seqnum in self.acked:
+                later += 1
+            elif later >= DUPACKS and pkt.seqnum not in self.fastresent:
+                lost.append(pkt)
+        if lost:
+            self.congestion.fastretransmit(len(self.sent_packet_window))
+        for pkt in reversed(lost):
+            self.fastresent.add(pkt.seqnum)
+            self.sendtimes.pop(pkt.seqnum, None)  # Karn's rule
+            self.tolayer3(pkt)
+
+    def datainput(self, packet):
+        """Buffer anything in the receive window, deliver what is in order"""
+        self.receiving = True
+        seqnum = packet.seqnum
+        offset = (seqnum - self.expected) % self.seqspace
+        if offset < self.window:
+            self.ack(seqnum)
+            self.buffer[(self.head + offset) % self.window] = packet
+            while self.buffer[self.head] is not None:
+                self.deliver(self.buffer[self.head].payload)
+                self.buffer[self.head] = None
+                self.head = (self.head + 1) % self.window
+                self.expected = (self.expected + 1) % self.seqspace
+        elif offset >= self.seqspace - self.window:
+            # Already delivered, our ACK must have been lost.
+            self.ack(seqnum)
+
+    def ack(self, seqnum):
+        self.tolayer3(self.makepacket(0, seqnum, b""))
+
+    def timerinterrupt(self, key=None):
+        """Resend only the packet whose timer went off"""
+        if self.sim.trace >= 2:
+            self.tracecall("timerinterrupt")
+
+        base = self.sent_packet_window[0].seqnum
+        offset = (key - base) % self.seqspace
+        pkt = self.sent_packet_window[offset]
+        # A timeout means congestion, whichever packet it is for.
+        self.congestion.timeout(len(self.sent_packet_window))
+        # A later packet ACKed means this one is lost rather than late, the
+        # RTO is long enough. Otherwise nothing came back in time: back off
+        # the shared RTO until a packet sent only once gets ACKed, and give
+        # the packets sent after this one, likely just as late, the longer
+        # timeout too, as the single timer of Go-Back-N would.
+        later = list(itertools.islice(self.sent_packet_window, offset + 1, None))
+        if not any(other.seqnum in self.acked for other in later):
+            self.rtt.backoff()
+            for other in later:
+                self.stoptimer(other.seqnum)
+                self.starttimer(self.rtt.rto, other.seqnum)
+        self.sendtimes.pop(key, None)  # Karn's rule
+        self.tolayer3(pkt)
+        self.starttimer(self.rtt.rto, key)
+
+
+# noinspection PyShadowingNames
+class SelectiveRepeatB(SelectiveRepeatA):
+    """EntityB's end of Selective Repeat, the same protocol as EntityA"""
+
+    def __str__(self):
+        return f"EntityB[{self.flow}]" if self.flow else "EntityB"
@@ -13,13 +13,36 @@
 # *********************************************************************
 
 import argparse
-import random
 import copy
+import cProfile
+import gzip
+import heapq
+import itertools
+import pickle
+from time import perf_counter
 
 import entity
+from channel import BUFFER, Bottleneck, Channel, parse_delay
+from checksum import CHECKSUMS, DEFAULT_CHECKSUM
 from entity import EntityA, EntityB
-
-MSGLEN = 20
+from loss import parse_loss
+from metrics import Metrics
+from profiler import PROFILES, Profile, Sampler, report
+from replay import Recorder, Replay
+from selective_repeat import SelectiveRepeatA, SelectiveRepeatB
+from stopping import MESSAGES, STEADY, Steady, Stop
+from streams import Streams
+from tracer import FORMATS, Tracer
+from workload import (
+    MSGLEN,
+    FileChunks,
+    Letters,
+    UniformArrivals,
+    parse_arrivals,
+    parse_size,
+)
+
+PROTOCOLS = ("gbn", "sr")
 
 
 class Event:
@@ -27,6 +50,15 @@ class Event:
         self.time = time
         self.entity = entity
         self.etype = etype
+        self.cancelled = False
+
+    def asdict(self):
+        """Structured form of the event for the trace"""
+        return {
+            "type": Event.NAMES[self.etype],
+            "time": self.time,
+            "entity": str(self.entity),
+        }
 
     @staticmethod
     def sorter(event):
@@ -37,12 +69,23 @@ class Event:
     FROM_LAYER5 = 1
     FROM_LAYER3 = 2
 
+    NAMES = {TIMER_INTERRUPT: "timer", FROM_LAYER5: "layer5", FROM_LAYER3: "layer3"}
+
 
 class TimerEvent(Event):
-    def __init__(self, entity, time):
+    def __init__(self, entity, time, key=None):
         super(TimerEvent, self).__init__(entity, time, Event.TIMER_INTERRUPT)
+        self.key = key
+
+    def asdict(self):
+        fields = super(TimerEvent, self).asdict()
+        if self.key is not None:
+            fields["key"] = self.key
+        return fields
 
     def __repr__(self):
+        if self.key is not None:
+            return f"TimerEvent({self.time}, {self.entity}, {self.key})"
         return f"TimerEvent({self.time}, {self.entity})"
 
     def __str__(self):
@@ -61,9 +104,15 @@ class FromLayer5Event(Event):
 
 
 class FromLayer3Event(Event):
-    def __init__(self, entity, time, packet):
+    def __init__(self, entity, time, packet, channel=None):
         super(FromLayer3Event, self).__init__(entity, time, Event.FROM_LAYER3)
         self.packet = packet
+        self.channel = channel
+
+    def asdict(self):
+        fields = super(FromLayer3Event, self).asdict()
+        fields["packet"] = self.packet
+        return fields
 
     def __repr__(self):
         return f"FromLayer3({self.time}, {self.entity}, {self.packet})"
@@ -74,192 +123,430 @@ class FromLayer3Event(Event):
 
 class Simulator:
     def __init__(
-        self, bidirectional, trace, seed, nmessages, corruptprob, lossprob, lambdat
+        self,
+        bidirectional,
+        trace,
+        seed,
+        nmessages,
+        corruptprob,
+        lossprob,
+        lambdat,
+        delay=None,
+        bandwidth=None,
+        tracer=None,
+        metrics=False,
+        window=entity.WINDOW,
+        timeout=entity.TIMEOUT,
+        adaptive=True,
+        protocol="gbn",
+        checksum=DEFAULT_CHECKSUM,
+        seqspace=entity.SEQSPACE,
+        ackdelay=entity.ACKDELAY,
+        record=None,
+        replay=None,
+        flows=1,
+        bottleneck=None,
+        buffer=BUFFER,
+        congestion=False,
+        queueloss=None,
+        profile=False,
+        arrivals=None,
+        source=None,
+        mss=None,
+        stop=None,
+        loss=None,
+        reverseloss=None,
     ):
         self.bidirectional = bidirectional
         self.trace = trace
-        random.seed(seed)
+        self.tracer = tracer if tracer is not None else Tracer()
+        # every simulator draws from its own streams, one per purpose, so
+        # several of them can run in one process without disturbing each
+        # other and changing one probability leaves the other draws alone
+        self.streams = Streams(seed)
+        self.arrivalrng = self.streams["arrival"]
         self.nsim = 0
         self.nsimmax = nmessages
         self.corruptprob = corruptprob
         self.lossprob = lossprob
         self.lambdat = lambdat
-
+        # message n of each flow every lambda on average, and the classic
+        # payloads unless told otherwise
+        self.arrivals = (
+            arrivals if arrivals is not None else UniformArrivals(lambdat / flows)
+        )
+        self.source = source if source is not None else Letters(MSGLEN)
+        self.checksum = CHECKSUMS[checksum]
+        self.window = window
+        self.seqspace = seqspace
+
+        # evlist is a binary heap of (time, seq, event) entries. seq is a
+        # monotonically increasing insertion counter, so events scheduled for
+        # the same time are delivered in the order they were inserted, exactly
+        # like the old append-and-stable-sort list.
         self.evlist = []
+        self.evseq = itertools.count()
+        self.ncancelled = 0
+        # running timers, keyed on (entity, key); key is None for the single
+        # timer of an entity and a caller chosen handle when it runs several
+        self.timers = {}
 
         self.ntolayer3 = 0
-        self.nlost = 0
-        self.ncorrupt = 0
+        self.nevents = 0
+        self.maxevlist = 0
         self.time = 0.0
-        self.entity_a = EntityA(self)
-        self.entity_b = EntityB(self)
-        self.generate_next_arrival()
 
-    def run(self):
-        """Run the simulation"""
+        # flows of an EntityA sending to an EntityB, entity_a and entity_b
+        # are the first one
+        self.flows = []
+        for flow in range(flows):
+            if protocol == "sr":
+                args = (
+                    self,
+                    window,
+                    timeout,
+                    adaptive,
+                    seqspace,
+                    flow,
+                    congestion,
+                    mss,
+                )
+                pair = (SelectiveRepeatA(*args), SelectiveRepeatB(*args))
+            else:
+                args = (
+                    self,
+                    window,
+                    timeout,
+                    adaptive,
+                    seqspace,
+                    ackdelay,
+                    flow,
+                    congestion,
+                    mss,
+                )
+                pair = (EntityA(*args), EntityB(*args))
+            self.flows.append(pair)
+        self.entity_a, self.entity_b = self.flows[0]
+
+        # one link per direction shared by every flow, if the flows compete
+        if bottleneck is not None:
+            self.links = (
+                Bottleneck(self, bottleneck, buffer),
+                Bottleneck(self, bottleneck, buffer),
+            )
+        else:
+            self.links = (None, None)
+
+        # one channel per direction of each flow, keyed on the sending entity;
+        # every channel gets its own copy of the loss model and its state
+        if reverseloss is None:
+            reverseloss = loss
+        self.channels = {}
+        for a, b in self.flows:
+            self.channels[a] = Channel(
+                self,
+                b,
+                lossprob,
+                corruptprob,
+                delay,
+                bandwidth,
+                self.streams,
+                self.links[0],
+                queueloss,
+                copy.deepcopy(loss),
+            )
+            self.channels[b] = Channel(
+                self,
+                a,
+                lossprob,
+                corruptprob,
+                delay,
+                bandwidth,
+                self.streams,
+                self.links[1],
+                queueloss,
+                copy.deepcopy(reverseloss),
+            )
+
+        # record the decisions of the channels to a file, or replay them
+        if flows > 1 and (record is not None or replay is not None):
+            raise ValueError("can only record or replay the channel of one flow")
+        self.recorder = Recorder(record) if record is not None else None
+        self.replay = Replay(replay) if replay is not None else None
+        for direction, channel in enumerate(self.channels.values()):
+            if self.recorder is not None:
+                channel.record = self.recorder.writer(direction)
+            if self.replay is not None:
+                channel.replay = self.replay.decisions(direction)
+        # a steady state delay is measured by the metrics
+        self.stop = stop
+        if stop is not None and stop.steady is not None:
+            metrics = True
+        self.metrics = Metrics(self) if metrics else None
+        self.generate_next_arrival()
+        # last, so it can wrap everything the entities and the loop call
+        self.profile = Profile(self) if profile else None
+
+    @property
+    def nlost(self):
+        return sum(c.nlost for c in self.channels.values())
+
+    @property
+    def ncorrupt(self):
+        return sum(c.ncorrupt for c in self.channels.values())
+
+    def run(self, until=None):
+        """Run the simulation, returns its RunResult when metrics are
+        collected. With until it stops before the first event after that
+        time, so does it at the limits of the Stop of the simulation, and a
+        later run() carries on from there"""
+        metrics = self.metrics
+        profile = self.profile
+        stop = self.stop
+        if profile is not None:
+            runstart = perf_counter()
+        if stop is not None:
+            stop.start()
+            if stop.time is not None and (until is None or stop.time < until):
+                until = stop.time
 
         while len(self.evlist) > 0:
-            e = self.evlist.pop(0)
+            if until is not None and self.evlist[0][0] > until:
+                if stop is not None and until == stop.time:
+                    stop.reason = "time"
+                break
+            _, _, e = heapq.heappop(self.evlist)
+            if e.cancelled:
+                self.ncancelled -= 1
+                continue
+            self.nevents += 1
+            if profile is not None:
+                started = perf_counter()
             if self.trace >= 2:
-                print(f"{e}")
+                self.tracer.record("event", e.time, event=e)
 
             # update time to next event time
             self.time = e.time
 
             if isinstance(e, FromLayer5Event):
-                # set up future arrival
+                # set up future arrival, unless the workload ran out
+                msg2give = None
                 if self.nsim < self.nsimmax:
+                    msg2give = next(self.source, None)
+                if msg2give is not None:
                     self.generate_next_arrival()
 
-                    # fill in msg to give with string of same letter
-                    msg2give = chr(ord("A") + (self.nsim % 26)) * MSGLEN
                     if self.trace > 2:
-                        print(f"          MAINLOOP: data given to student: {msg2give}")
+                        self.tracer.record("layer5", self.time, message=msg2give)
+                    if metrics is not None:
+                        dest = self.channels[e.entity].dest
+                        metrics.layer5(e.entity, dest, self.time, msg2give)
                     e.entity.output(msg2give)
                     self.nsim += 1
 
             elif isinstance(e, TimerEvent):
-                e.entity.timerinterrupt()
+                del self.timers[e.entity, e.key]
+                if metrics is not None:
+                    metrics.timerfired(e.entity)
+                if e.key is None:
+                    e.entity.timerinterrupt()
+                else:
+                    e.entity.timerinterrupt(e.key)
 
             elif isinstance(e, FromLayer3Event):
-                pkt2give = copy.deepcopy(e.packet)
-
-                # deliver packet to appropriate entity
-                e.entity.input(pkt2give)
+                if e.channel is not None:
+                    e.channel.delivered()
+                # deliver packet to appropriate entity, packets are immutable
+                # so the receiver gets the object the sender handed us
+                e.entity.input(e.packet)
 
             else:
                 assert False, f"invalid event {e}"
 
-        print(f" Simulator terminated at time {self.time}")
-        print(f" after sending {self.nsim} from layer5")
+            if metrics is not None:
+                metrics.window(e.entity, self.time, e.entity.windowsize())
+            if profile is not None:
+                profile.event(type(e).__name__, perf_counter() - started)
+            if stop is not None and stop.done(self):
+                break
+
+        self.tracer.flush()
+        if profile is not None:
+            profile.wall += perf_counter() - runstart
+        if metrics is not None:
+            return metrics.result()
+
+    def close(self):
+        """Finish the channel recording and release the replayed one"""
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.replay is not None:
+            self.replay.close()
+
+    def checkpoint(self, path):
+        """Save the whole simulation, entities, channels, random streams and
+        pending events included, to a compressed file"""
+        if self.recorder is not None or self.replay is not None:
+            raise ValueError("can't checkpoint while recording or replaying the channel")
+        if self.profile is not None:
+            raise ValueError("can't checkpoint while profiling")
+        self.tracer.flush()
+        with gzip.open(path, "wb") as output:
+            pickle.dump(self, output, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def restore(path, tracer=None):
+        """Load a simulation saved by checkpoint, run() carries on exactly
+        where it stopped. Every restore of a file is independent, so one
+        warmed up state can branch into several continuations"""
+        with gzip.open(path, "rb") as source:
+            sim = pickle.load(source)
+        if tracer is not None:
+            sim.tracer = tracer
+        return sim
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # the tracer holds an open output, a restored simulation gets its own
+        del state["tracer"]
+        # itertools.count can't be pickled in every Python version
+        state["evseq"] = next(self.evseq)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.evseq = itertools.count(state["evseq"])
+        self.tracer = Tracer()
 
     def generate_next_arrival(self):
-        # x is uniform on [0,2*lambda]
-        # having mean of lambda
-        time = self.time + self.lambdat * random.random() * 2.0
+        # by default x is uniform on [0,2*lambda]
+        # having mean of lambda for each flow
+        flows = self.flows
+        time = self.time + self.arrivals.interval(self.arrivalrng)
 
         if self.trace > 2:
-            print("          GENERATE NEXT ARRIVAL: creating new arrival")
+            self.tracer.record("arrival", self.time)
 
-        if self.bidirectional and random.random() >= 0.5:
-            event = FromLayer5Event(time, self.entity_b)
+        if len(flows) > 1:
+            entity_a, entity_b = flows[int(self.arrivalrng.random() * len(flows))]
+        else:
+            entity_a, entity_b = self.entity_a, self.entity_b
+        if self.bidirectional and self.arrivalrng.random() >= 0.5:
+            event = FromLayer5Event(time, entity_b)
         else:
-            event = FromLayer5Event(time, self.entity_a)
+            event = FromLayer5Event(time, entity_a)
 
         self.insertevent(event)
 
     def insertevent(self, event):
         """Insert an event into the queue of events"""
         if self.trace > 2:
-            print(f"            INSERTEVENT: future event: {repr(event)}")
-        self.evlist.append(event)
-        self.evlist.sort(key=Event.sorter)
-        self.showevlist()
+            self.tracer.record("insert", self.time, event=event)
+        heapq.heappush(self.evlist, (event.time, next(self.evseq), event))
+        if len(self.evlist) > self.maxevlist:
+            self.maxevlist = len(self.evlist)
+        if self.trace > 3:
+            self.showevlist()
+
+    def cancelevent(self, event):
+        """Lazily cancel a pending event, it is discarded when popped"""
+        if event.cancelled:
+            return
+        event.cancelled = True
+        self.ncancelled += 1
+        # compact the heap once cancelled entries dominate it
+        if self.ncancelled > 64 and self.ncancelled * 2 > len(self.evlist):
+            self.evlist = [i for i in self.evlist if not i[2].cancelled]
+            heapq.heapify(self.evlist)
+            self.ncancelled = 0
+
+    def pendingevents(self):
+        """Return the live events in the order they will be delivered"""
+        return [i[2] for i in sorted(self.evlist) if not i[2].cancelled]
 
     def showevlist(self):
-        print("eventlist")
-        print("-------------------------")
-        for i in self.evlist:
-            print(repr(i))
-        print("-------------------------")
+        self.tracer.record("evlist", self.time, events=self.pendingevents())
 
 
-    def starttimer(self, entity, increment):
-        """Called by student code to start a timer"""
+    def starttimer(self, entity, increment, key=None):
+        """Called by student code to start a timer. An entity can run
+        several timers at once by giving each a different key, it then gets
+        the key back in timerinterrupt"""
 
         if self.trace > 2:
-            print(f"          START TIMER: starting timer at {self.time}")
+            self.tracer.record("starttimer", self.time)
 
         # be nice: check to see if timer is already started, if so, then warn
-        for i in self.evlist:
-            if isinstance(i, TimerEvent) and i.entity == entity:
-                print("Warning: attempt to start a timer that is already started")
-                return
-
-        event = TimerEvent(self.time + increment, entity)
+        if (entity, key) in self.timers:
+            if self.trace > 0:
+                self.tracer.record(
+                    "warning",
+                    self.time,
+                    message="attempt to start a timer that is already started",
+                )
+            return self.timers[entity, key]
+
+        event = TimerEvent(self.time + increment, entity, key)
+        self.timers[entity, key] = event
+        if self.metrics is not None:
+            self.metrics.timerstarted(entity)
         self.insertevent(event)
+        return event
 
-    def stoptimer(self, entity):
+    def stoptimer(self, entity, key=None):
         """called by students routine to cancel a previously-started timer"""
 
         if self.trace > 2:
-            print(f"          STOP TIMER: stopping timer at {self.time}")
+            self.tracer.record("stoptimer", self.time)
 
-        for i in self.evlist:
-            if isinstance(i, TimerEvent) and i.entity == entity:
-                self.evlist.remove(i)
-                return
-        print("Warning: unable to cancel your timer. It wasn't running.")
+        event = self.timers.pop((entity, key), None)
+        if event is None:
+            if self.trace > 0:
+                self.tracer.record(
+                    "warning",
+                    self.time,
+                    message="unable to cancel your timer. It wasn't running.",
+                )
+            return
+        self.cancelevent(event)
 
     def printevlist(self):
         """display the current event list, in order"""
+        self.tracer.flush()
         print("--------------")
         print("Event List Follows:")
-        for event in self.evlist:
+        for event in self.pendingevents():
             print(f"{event}")
         print("--------------")
 
     def tolayer5(self, entity, message):
         """Receive some data for layer5"""
         if self.trace > 2:
-            print(f"          TOLAYER5: data received from {entity}: {message}")
+            self.tracer.record("tolayer5", self.time, entity=entity, message=message)
+        delay = None
+        if self.metrics is not None:
+            delay = self.metrics.delivered(entity, self.time, message)
+        if self.stop is not None:
+            self.stop.delivered(self.time, message, delay)
 
     def tolayer3(self, entity, packet):
         """Take a packet from the user and send it through our media
         where it might be lost or corrupted"""
         self.ntolayer3 += 1
+        if self.metrics is not None:
+            self.metrics.sent(entity, packet)
 
-        if entity == self.entity_a:
-            otherentity = self.entity_b
-        else:
-            otherentity = self.entity_a
-
-        # simulate losses:
-        if random.random() < self.lossprob:
-            self.nlost += 1
-            if self.trace > 0:
-                print("          TOLAYER3: packet being lost\n")
+        channel = self.channels[entity]
+        delivery = channel.send(packet)
+        if delivery is None:
             return
 
-        # make a copy of the packet student just gave me since he/she may decide
-        # to do something with the packet after we return back to him/her
-        mypkt = copy.deepcopy(packet)
-        if self.trace > 2:
-            print(f"          TOLAYER3: {repr(mypkt)}")
-
         # create future event for arrival of packet at the other side
-
-        # compute the arrival time of packet at the other end.
-        # medium can not reorder, so make sure packet arrives
-        # between 1 and 10 time units after the latest arrival time
-        # of packets currently in the medium on their way to the
-        # destination
-        lasttime = self.time
-        for i in self.evlist:
-            if isinstance(i, FromLayer3Event) and otherentity == i.entity:
-                lasttime = i.time
-
-        lasttime = lasttime + 1.0 + 9.0 * random.random()
-
-        event = FromLayer3Event(lasttime, otherentity, mypkt)
-
-        if random.random() < self.corruptprob:
-            # simulate corruption:
-            self.ncorrupt += 1
-            how = random.random()
-            if how < 0.75:
-                # corrupt payload
-                mypkt.payload = "Z" + mypkt.payload[1:]
-            elif how < 0.875:
-                mypkt.seqnum = 999999
-            else:
-                mypkt.acknum = 999999
-
-            if self.trace > 0:
-                print("          TOLAYER3: packet being corrupted")
+        lasttime, mypkt = delivery
+        event = FromLayer3Event(lasttime, channel.dest, mypkt, channel)
 
         if self.trace > 2:
-            print("          TOLAYER3: scheduling arrival on other side")
+            self.tracer.record("schedule", self.time)
 
         self.insertevent(event)
 
@@ -276,7 +563,18 @@ def main():
         "--trace",
         default=2,# Change here
         type=int,
-        help="set the trace level (0-3)"
+        help="set the trace level (0-4)"
+    )
+    parser.add_argument(
+        "--trace-format",
+        default="text",
+        choices=FORMATS,
+        help="trace output format",
+    )
+    parser.add_argument(
+        "--trace-file",
+        default=None,
+        help="write the trace to this file instead of stdout",
     )
     parser.add_argument("--seed",
                         default=0,# Change here
@@ -284,42 +582,419 @@ def main():
                         help="set random seed")
     parser.add_argument(
         "--messages",
-        default=20,
+        default=None,
         type=int,
-        help="maximum number of messages to simulate",
+        help="maximum number of messages to simulate (default: 20; with a "
+        "--until or --steady stop as many as it may deliver, no limit if it "
+        "doesn't bound them)",
     )
     parser.add_argument(
         "--corruptprob",
-        default=0.2,# Change here
+        default=None,
         type=float,
-        help="corruption probability (0.0 - 1.0)",
+        help="corruption probability (0.0 - 1.0, default: 0.2)",
     )
     parser.add_argument(
         "--lossprob",
-        default=0.2,# Change here
+        default=None,
         type=float,
-        help="packet loss probaility (0.0 - 1.0)"
+        help="packet loss probaility (0.0 - 1.0, default: 0.2)"
     )
     parser.add_argument("--lambda",
                         default=4,# Change here
                         type=float,
                         help="packet arrival rate")
+    parser.add_argument(
+        "--arrivals",
+        default="uniform",
+        help="arrival process of the messages with mean interval --lambda: "
+        "uniform, poisson or onoff:ON,OFF with the mean on and off times",
+    )
+    parser.add_argument(
+        "--message-size",
+        default=str(MSGLEN),
+        type=parse_size,
+        help="bytes per message, or LOW,HIGH for sizes uniform between them",
+    )
+    parser.add_argument(
+        "--workload-file",
+        default=None,
+        help="send the contents of this file, --message-size bytes per "
+        "message, instead of letters",
+    )
+    parser.add_argument(
+        "--mss",
+        default=None,
+        type=int,
+        help="largest payload of a packet, longer messages are fragmented; "
+        "one byte of it is the fragment header",
+    )
+    parser.add_argument(
+        "--delay",
+        default="uniform:1,10",
+        type=parse_delay,
+        help="one way delay distribution, e.g. uniform:1,10, exponential:5 "
+        "or constant:5",
+    )
+    parser.add_argument(
+        "--protocol",
+        default="gbn",
+        choices=PROTOCOLS,
+        help="Go-Back-N or Selective Repeat",
+    )
+    parser.add_argument(
+        "--checksum",
+        default=DEFAULT_CHECKSUM,
+        choices=CHECKSUMS,
+        help="checksum the entities put on their packets",
+    )
+    parser.add_argument(
+        "--window",
+        default=entity.WINDOW,
+        type=int,
+        help="send window size",
+    )
+    parser.add_argument(
+        "--seqspace",
+        default=entity.SEQSPACE,
+        type=int,
+        help="sequence numbers wrap modulo this",
+    )
+    parser.add_argument(
+        "--ackdelay",
+        default=entity.ACKDELAY,
+        type=float,
+        help="how long a bidirectional receiver waits for data to carry an "
+        "ACK, 0 to ACK right away",
+    )
+    parser.add_argument(
+        "--timeout",
+        default=entity.TIMEOUT,
+        type=float,
+        help="initial retransmission timeout of EntityA",
+    )
+    parser.add_argument(
+        "--fixed-timeout",
+        action="store_true",
+        help="keep the timeout fixed instead of adapting it to the RTT",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="print the metrics of the run as JSON at the end",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        default=None,
+        type=float,
+        help="link bandwidth in bytes per time unit (default: infinite)",
+    )
+    parser.add_argument(
+        "--congestion",
+        action="store_true",
+        help="AIMD congestion control on top of the send window",
+    )
+    parser.add_argument(
+        "--queueloss",
+        default=None,
+        type=float,
+        help="packets in a channel at which it loses everything, the loss "
+        "probability climbs linearly to it on top of --lossprob",
+    )
+    parser.add_argument(
+        "--loss",
+        default=None,
+        type=parse_loss,
+        help="bursty loss model of the channels: gilbert:P,R[,LOSS[,CORRUPT]] "
+        "for Gilbert-Elliott going bad with P and good with R per packet, "
+        "losing LOSS (1) and corrupting CORRUPT (--corruptprob) while bad, "
+        "or trace:FILE with 0 delivered, 1 lost or c corrupted per packet",
+    )
+    parser.add_argument(
+        "--reverse-loss",
+        default=None,
+        type=parse_loss,
+        help="loss model of the channels from B to A (default: --loss)",
+    )
+    parser.add_argument(
+        "--flows",
+        default=1,
+        type=int,
+        help="sender/receiver pairs, each offered messages at --lambda; "
+        "--messages is their total",
+    )
+    parser.add_argument(
+        "--bottleneck",
+        default=None,
+        type=float,
+        help="capacity in bytes per time unit of a link every flow shares "
+        "(default: none)",
+    )
+    parser.add_argument(
+        "--buffer",
+        default=BUFFER,
+        type=int,
+        help="packets the bottleneck queues before it drops",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        choices=PROFILES,
+        help="profile the run: wall time per event type and callback, a "
+        "sampling profiler, or cProfile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        help="save the profile to this file, JSON or for cprofile pstats",
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="write every loss, delay and corruption decision to this file",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="take the channel decisions from a --record file",
+    )
+    parser.add_argument(
+        "--until-time",
+        default=None,
+        type=float,
+        help="stop at this simulation time",
+    )
+    parser.add_argument(
+        "--until-delivered",
+        default=None,
+        type=int,
+        help="stop once this many messages were delivered",
+    )
+    parser.add_argument(
+        "--until-events",
+        default=None,
+        type=int,
+        help="stop after this many events",
+    )
+    parser.add_argument(
+        "--until-wall",
+        default=None,
+        type=float,
+        help="stop after this many seconds of wall time",
+    )
+    parser.add_argument(
+        "--steady",
+        default=None,
+        choices=STEADY,
+        help="stop once the batch means estimate of this metric in steady "
+        "state is within --precision, or without any --until limit after "
+        f"{MESSAGES} messages delivered",
+    )
+    parser.add_argument(
+        "--precision",
+        default=0.05,
+        type=float,
+        help="half width of the confidence interval of --steady relative to "
+        "its mean",
+    )
+    parser.add_argument(
+        "--confidence",
+        default=0.95,
+        type=float,
+        help="confidence level of the interval of --steady",
+    )
+    parser.add_argument(
+        "--batch",
+        default=100,
+        type=int,
+        help="messages delivered per batch of --steady",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help="stop at --checkpoint-at and save the simulation to this file",
+    )
+    parser.add_argument(
+        "--checkpoint-at",
+        default=None,
+        type=float,
+        help="simulation time to checkpoint at",
+    )
+    parser.add_argument(
+        "--resume",
+        default=None,
+        help="carry on a checkpointed simulation; --lossprob, --corruptprob, "
+        "--loss, --reverse-loss and --messages replace the saved values when "
+        "given, everything else comes from the checkpoint. With a --until or "
+        "--steady stop and no --messages the messages go on as for --messages. "
+        "--metrics and --steady need a checkpoint taken with --metrics",
+    )
     args = parser.parse_args()
-    assert args.messages >= 0
-    assert args.lossprob >= 0.0 and args.lossprob <= 1.0
-    assert args.corruptprob >= 0.0 and args.corruptprob <= 1.0
-    assert args.__dict__["lambda"] > 0.0
-
-    sim = Simulator(
-        args.bidirectional,
-        args.trace,
-        args.seed,
-        args.messages,
-        args.corruptprob,
-        args.lossprob,
-        args.__dict__["lambda"],
+    limits = (
+        args.until_time,
+        args.until_delivered,
+        args.until_events,
+        args.until_wall,
+        args.steady,
     )
-    sim.run()
+    stop = None
+    if any(i is not None for i in limits):
+        steady = None
+        if args.steady is not None:
+            steady = Steady(args.steady, args.precision, args.confidence, args.batch)
+        stop = Stop(*limits[:4], steady)
+    assert args.messages is None or args.messages >= 0
+    # left None so a resumed run can tell a value given from the default
+    if args.resume is None:
+        if args.corruptprob is None:
+            args.corruptprob = 0.2  # Change here
+        if args.lossprob is None:
+            args.lossprob = 0.2  # Change here
+    assert args.lossprob is None or 0.0 <= args.lossprob <= 1.0
+    assert args.corruptprob is None or 0.0 <= args.corruptprob <= 1.0
+    assert args.__dict__["lambda"] > 0.0
+    assert args.window > 0
+    # the receiver must be able to tell a new seqnum from a wrapped old one
+    if args.protocol == "sr":
+        assert args.seqspace >= 2 * args.window
+    else:
+        assert args.seqspace > args.window
+    assert args.timeout > 0.0
+    assert args.ackdelay >= 0.0
+    assert args.queueloss is None or args.queueloss > 0.0
+    assert args.flows > 0
+    assert args.message_size[0] > 0
+    assert args.message_size[1] is None or args.message_size[1] >= args.message_size[0]
+    assert args.workload_file is None or args.message_size[1] is None
+    assert args.mss is None or args.mss > 1
+    assert args.bottleneck is None or args.bottleneck > 0.0
+    assert args.buffer > 0
+    assert args.flows == 1 or (args.record is None and args.replay is None)
+    assert (args.checkpoint is None) == (args.checkpoint_at is None)
+    # a simulation that records, replays or is profiled can't be saved, and
+    # a resumed one carries on without its recording
+    assert args.profile != "events" or args.checkpoint is None
+    assert args.checkpoint is None or (args.record is None and args.replay is None)
+    assert args.resume is None or (args.record is None and args.replay is None)
+    assert args.precision > 0.0
+    assert 0.0 < args.confidence < 1.0
+    assert args.batch > 0
+
+    if args.resume is not None:
+        sim = Simulator.restore(
+            args.resume, Tracer(args.trace_format, args.trace_file)
+        )
+        sim.trace = args.trace
+        # what if: a continuation with other channel settings or a longer run
+        for name in ("lossprob", "corruptprob"):
+            value = getattr(args, name)
+            if value is not None:
+                setattr(sim, name, value)
+                for channel in sim.channels.values():
+                    setattr(channel, name, value)
+        if args.messages is not None:
+            sim.nsimmax = args.messages
+        if stop is not None:
+            sim.stop = stop
+            if args.messages is None:
+                sim.nsimmax = float("inf")
+                if stop.messages is not None:
+                    sim.nsimmax = sim.nsim + stop.messages
+        # a run that had sent all its messages has no arrival left to start
+        # the ones it may send now from
+        pending = (e for _, _, e in sim.evlist if not e.cancelled)
+        if sim.nsim < sim.nsimmax and not any(
+            isinstance(e, FromLayer5Event) for e in pending
+        ):
+            sim.generate_next_arrival()
+        # a loss model given replaces the saved one, a copy for every channel
+        if args.loss is not None or args.reverse_loss is not None:
+            reverse = args.reverse_loss if args.reverse_loss is not None else args.loss
+            for a, b in sim.flows:
+                if args.loss is not None:
+                    sim.channels[a].setloss(copy.deepcopy(args.loss))
+                sim.channels[b].setloss(copy.deepcopy(reverse))
+        # metrics started on resume couldn't tell the messages in flight at
+        # the checkpoint from misdelivered ones, take the checkpoint with them
+        assert sim.metrics is not None or not (
+            args.metrics or (stop is not None and stop.steady is not None)
+        ), "the checkpoint has no metrics to carry on"
+    else:
+        # a stop decides how long the run is, the messages don't run out
+        # before it, but none are offered past a limit on those delivered
+        if args.messages is None:
+            if stop is None:
+                args.messages = 20
+            elif stop.messages is not None:
+                args.messages = stop.messages
+            else:
+                args.messages = float("inf")
+        lambdat = args.__dict__["lambda"]
+        low, high = args.message_size
+        if args.workload_file is not None:
+            source = FileChunks(args.workload_file, low)
+        elif high is not None:
+            source = Letters(low, high, Streams(args.seed)["size"])
+        else:
+            source = Letters(low)
+        sim = Simulator(
+            args.bidirectional,
+            args.trace,
+            args.seed,
+            args.messages,
+            args.corruptprob,
+            args.lossprob,
+            args.__dict__["lambda"],
+            args.delay,
+            args.bandwidth,
+            Tracer(args.trace_format, args.trace_file),
+            args.metrics,
+            args.window,
+            args.timeout,
+            not args.fixed_timeout,
+            args.protocol,
+            args.checksum,
+            args.seqspace,
+            args.ackdelay,
+            args.record,
+            args.replay,
+            args.flows,
+            args.bottleneck,
+            args.buffer,
+            args.congestion,
+            args.queueloss,
+            args.profile == "events",
+            parse_arrivals(args.arrivals, lambdat / args.flows),
+            source,
+            args.mss,
+            stop,
+            args.loss,
+            args.reverse_loss,
+        )
+    profiler = sim.profile
+    if args.profile == "cprofile":
+        profiler = cProfile.Profile()
+        result = profiler.runcall(sim.run, args.checkpoint_at)
+    elif args.profile == "sample":
+        with Sampler() as profiler:
+            result = sim.run(args.checkpoint_at)
+    else:
+        result = sim.run(args.checkpoint_at)
+    if args.checkpoint is not None:
+        sim.checkpoint(args.checkpoint)
+    sim.tracer.close()
+    sim.close()
+
+    print(f" Simulator terminated at time {sim.time}")
+    print(f" after sending {sim.nsim} from layer5")
+    if sim.stop is not None and sim.stop.reason is not None:
+        print(f" stopped at the {sim.stop.reason} limit")
+    if args.checkpoint is not None:
+        print(f" checkpoint saved to {args.checkpoint}")
+    if result is not None:
+        print(result.tojson(indent=2))
+    if profiler is not None:
+        report(profiler, args.profile_output)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,196 @@
+"""When a simulation stops. Without a Stop a run goes on until the event
+list is empty, that is until every message was sent and every retransmission
+drained. A Stop ends it at the first of its limits to be reached: simulated
+time, messages delivered, events dispatched, seconds of wall time, or once
+a Steady estimate is precise enough.
+
+Steady estimates a metric in steady state by batch means. The deliveries
+are grouped in batches of a fixed size and the mean of each batch is one
+observation; batches long enough are close to independent, so a confidence
+interval can be put on the mean of their means. The batches of the warm-up,
+while windows and timeouts settle, are dropped by the MSER rule, and the
+run stops once the half width of the interval is within precision of the
+mean. A metric that never settles, like the delay of an overloaded sender,
+never converges and leaves the run to the other limits, MESSAGES delivered
+when there is none:
+
+    python simulator.py --trace 0 --steady delay --precision 0.05 --until-wall 60
+    python simulator.py --trace 0 --until-time 10000 --until-wall 60
+"""
+
+from math import sqrt
+from statistics import NormalDist, fmean, stdev
+from time import perf_counter
+
+# metrics Steady can estimate: the end to end delay of a message, and the
+# bytes delivered per time unit
+STEADY = ("delay", "goodput")
+# messages delivered at most by a Stop with no limit but a Steady estimate,
+# which may never converge
+MESSAGES = 100000
+
+
+def tquantile(p, dof):
+    """Quantile p of the Student t distribution with dof degrees of freedom,
+    from the normal one by the Cornish-Fisher expansion (Abramowitz and
+    Stegun 26.7.5), good to four digits from 5 degrees of freedom on"""
+    z = NormalDist().inv_cdf(p)
+    z2 = z * z
+    terms = (
+        z * (z2 + 1.0) / 4.0,
+        z * ((5.0 * z2 + 16.0) * z2 + 3.0) / 96.0,
+        z * (((3.0 * z2 + 19.0) * z2 + 17.0) * z2 - 15.0) / 384.0,
+        z * ((((79.0 * z2 + 776.0) * z2 + 1482.0) * z2 - 1920.0) * z2 - 945.0)
+        / 92160.0,
+    )
+    return z + sum(term / dof ** (i + 1) for i, term in enumerate(terms))
+
+
+def mser(values):
+    """How many of the first values to drop as warm-up: the count, at most
+    half of them, that minimizes the variance of the mean of the rest"""
+    n = len(values)
+    best, warmup = None, 0
+    total = square = 0.0
+    # sums of the values from d on, d going down from the middle
+    for value in values[n // 2 :]:
+        total += value
+        square += value * value
+    for d in range(n // 2, -1, -1):
+        if d < n // 2:
+            total += values[d]
+            square += values[d] * values[d]
+        kept = n - d
+        spread = (square - total * total / kept) / (kept * kept)
+        if best is None or spread <= best:
+            best, warmup = spread, d
+    return warmup
+
+
+class Steady:
+    """Batch means estimate of metric, converged when the confidence interval
+    of its mean is within precision, relative, of the mean"""
+
+    def __init__(
+        self, metric="delay", precision=0.05, confidence=0.95, batch=100, minbatches=10
+    ):
+        if metric not in STEADY:
+            raise ValueError(f"unknown steady state metric {metric!r}")
+        self.metric = metric
+        self.precision = precision
+        self.confidence = confidence
+        self.batch = batch
+        self.minbatches = minbatches
+
+        self.means = []
+        # the batch being filled
+        self.count = 0
+        self.total = 0.0
+        self.start = 0.0
+        # batch count at which to test the interval next, testing every few
+        # batches rather than every one keeps the tests linear in the run
+        self.nextcheck = minbatches
+        self.warmup = 0
+        self.mean = None
+        self.halfwidth = None
+
+    def add(self, time, delay, size):
+        """A message of size bytes was delivered at time after delay, True
+        when that makes the estimate converge"""
+        if self.metric == "delay":
+            if delay is None:
+                return False
+            self.total += delay
+        else:
+            self.total += size
+        self.count += 1
+        if self.count < self.batch:
+            return False
+
+        if self.metric == "delay":
+            self.means.append(self.total / self.count)
+        elif time > self.start:
+            self.means.append(self.total / (time - self.start))
+        self.count = 0
+        self.total = 0.0
+        self.start = time
+        if len(self.means) < self.nextcheck:
+            return False
+        self.nextcheck = len(self.means) + max(1, len(self.means) // 10)
+        return self.converged()
+
+    def converged(self):
+        """Estimate the mean from the batches after the warm-up"""
+        self.warmup = mser(self.means)
+        kept = self.means[self.warmup :]
+        if len(kept) < self.minbatches:
+            return False
+        self.mean = fmean(kept)
+        self.halfwidth = (
+            tquantile((1.0 + self.confidence) / 2.0, len(kept) - 1)
+            * stdev(kept)
+            / sqrt(len(kept))
+        )
+        # a warm-up as long as it may be says the metric still drifts, as
+        # the delay does when more is offered than the protocol carries
+        if self.warmup == len(self.means) // 2:
+            return False
+        return self.halfwidth <= self.precision * abs(self.mean)
+
+    def asdict(self):
+        return {
+            "metric": self.metric,
+            "mean": self.mean,
+            "halfwidth": self.halfwidth,
+            "confidence": self.confidence,
+            "batch": self.batch,
+            "batches": len(self.means),
+            "warmup": self.warmup,
+        }
+
+
+class Stop:
+    """Limits of a run, any of them None for no limit. reason says which one
+    stopped it, None while none did"""
+
+    def __init__(self, time=None, messages=None, events=None, wall=None, steady=None):
+        if steady is not None and all(
+            i is None for i in (time, messages, events, wall)
+        ):
+            messages = MESSAGES
+        self.time = time
+        self.messages = messages
+        self.events = events
+        self.wall = wall
+        self.steady = steady
+        self.reason = None
+        self.ndelivered = 0
+        self.deadline = None
+
+    def start(self):
+        """A run starts, the wall time limit counts from here"""
+        self.reason = None
+        if self.wall is not None:
+            self.deadline = perf_counter() + self.wall
+
+    def delivered(self, time, message, delay):
+        """A message was passed up to layer 5"""
+        self.ndelivered += 1
+        if self.messages is not None and self.ndelivered >= self.messages:
+            self.reason = "messages"
+        if self.steady is not None and self.steady.add(time, delay, len(message)):
+            self.reason = "steady"
+
+    def done(self, sim):
+        """After every event, whether the run should stop there"""
+        if self.events is not None and sim.nevents >= self.events:
+            self.reason = "events"
+        elif self.deadline is not None and perf_counter() >= self.deadline:
+            self.reason = "wall"
+        return self.reason is not None
+
+    def asdict(self):
+        fields = {"reason": self.reason, "delivered": self.ndelivered}
+        if self.steady is not None:
+            fields["steady"] = self.steady.asdict()
+        return fields
@@ -0,0 +1,72 @@
+"""Independent random number streams, one per purpose (arrivals, loss,
+delay, corruption), so changing one knob of a run such as lossprob doesn't
+shift the draws of everything else and two runs can be compared draw for
+draw.
+
+With NumPy installed a stream draws its numbers a block at a time and hands
+them out from a buffer. Without it every stream is a plain random.Random.
+Either way a seed reproduces a run, but the two backends give different
+numbers"""
+
+import math
+import random
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# numbers drawn at once by a NumPy backed stream
+BLOCK = 4096
+
+
+class Stream:
+    """Uniform numbers on [0, 1) from a generator of its own, with the
+    random() and expovariate() of random.Random"""
+
+    def __init__(self, seed, name, block=BLOCK):
+        self.name = name
+        self.block = block
+        if numpy is None:
+            # a string seed is hashed with sha512, so every name gets its own
+            # stream; binding the methods keeps the per draw cost of the
+            # random module
+            self.generator = random.Random(f"{seed}/{name}")
+            self.random = self.generator.random
+            self.expovariate = self.generator.expovariate
+        else:
+            self.generator = numpy.random.default_rng(
+                [seed, zlib.crc32(name.encode())]
+            )
+            self.values = iter(())
+
+    def random(self):
+        try:
+            return next(self.values)
+        except StopIteration:
+            # tolist gives Python floats, which are much faster to hand out
+            # one at a time than NumPy scalars
+            self.values = iter(self.generator.random(self.block).tolist())
+            return next(self.values)
+
+    def expovariate(self, lambd):
+        return -math.log(1.0 - self.random()) / lambd
+
+    def __repr__(self):
+        return f"Stream({self.name})"
+
+
+class Streams:
+    """The streams of one run, created on first use by name"""
+
+    def __init__(self, seed, block=BLOCK):
+        self.seed = seed
+        self.block = block
+        self.streams = {}
+
+    def __getitem__(self, name):
+        stream = self.streams.get(name)
+        if stream is None:
+            stream = self.streams[name] = Stream(self.seed, name, self.block)
+        return stream
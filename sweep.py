@@ -0,0 +1,253 @@
+"""Run the simulator over a grid of parameters. Every configuration runs in
+its own worker process with its own random generator, and the results are
+written to a CSV table as the runs finish"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from loss import parse_loss
+from simulator import Simulator
+from stopping import MESSAGES, STEADY, Steady, Stop
+
+# parameters of a run and their defaults, in the order of the table columns
+PARAMETERS = {
+    "protocol": "gbn",
+    "bidirectional": False,
+    "seed": 0,
+    "messages": 20,
+    "corruptprob": 0.2,
+    "lossprob": 0.2,
+    "lambda": 4.0,
+}
+
+RESULTS = [
+    "time",
+    "nsim",
+    "ntolayer3",
+    "nlost",
+    "ncorrupt",
+    "delivered",
+    "goodput",
+    "retransmission_ratio",
+    "delay_mean",
+    "delay_p90",
+    "wall",
+]
+# results of a sweep stopped at a steady state, with the estimate and the
+# half width of its confidence interval
+STEADY_RESULTS = ["stop", "estimate", "halfwidth", "warmup"]
+
+
+def grid(**axes):
+    """Expand lists of values into the configurations of their cartesian
+    product, e.g. grid(lossprob=[0.1, 0.2], seed=range(10))"""
+    names = list(axes)
+    for values in itertools.product(*(axes[name] for name in names)):
+        config = dict(PARAMETERS)
+        config.update(zip(names, values))
+        yield config
+
+
+def run(config, steady=None):
+    """Run one configuration without any trace and return its results. With
+    steady, a dict of the arguments of a Steady plus the wall time limit,
+    it runs until the estimate converges, the time is up or, without a wall
+    time limit, stopping.MESSAGES messages were delivered"""
+    config = {**PARAMETERS, **config}
+    loss = config.get("loss")
+    stop = None
+    if steady is not None:
+        steady = dict(steady)
+        wall = steady.pop("wall", None)
+        stop = Stop(wall=wall, steady=Steady(**steady))
+    sim = Simulator(
+        config["bidirectional"],
+        0,
+        config["seed"],
+        config["messages"],
+        config["corruptprob"],
+        config["lossprob"],
+        config["lambda"],
+        metrics=True,
+        protocol=config["protocol"],
+        stop=stop,
+        loss=parse_loss(loss) if loss is not None else None,
+    )
+    start = time.perf_counter()
+    measured = sim.run()
+    wall = time.perf_counter() - start
+    result = dict(config)
+    result.update(measured.asdict())
+    result.update(
+        delay_mean=measured.delay["mean"],
+        delay_p90=measured.delay["p90"],
+        wall=wall,
+    )
+    if stop is not None:
+        result.update(
+            stop=stop.reason,
+            estimate=stop.steady.mean,
+            halfwidth=stop.steady.halfwidth,
+            warmup=stop.steady.warmup,
+        )
+    return result
+
+
+def sweep(configs, output, workers=None, fields=RESULTS, steady=None):
+    """Run every configuration on a process pool, writing one CSV row to
+    output per finished run. Returns the number of runs"""
+    if steady is not None:
+        fields = list(fields) + STEADY_RESULTS
+    writer = csv.DictWriter(
+        output, fieldnames=list(PARAMETERS) + list(fields), extrasaction="ignore"
+    )
+    writer.writeheader()
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, config, steady) for config in configs]
+        for future in as_completed(futures):
+            writer.writerow(future.result())
+            output.flush()
+            count += 1
+    return count
+
+
+def floats(text):
+    return [float(i) for i in text.split(",")]
+
+
+def ints(text):
+    return [int(i) for i in text.split(",")]
+
+
+def main():
+    """Parse the grid from the command line and run the sweep"""
+    parser = argparse.ArgumentParser(description="network simulator sweep")
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument(
+        "--protocol",
+        default=["gbn"],
+        type=lambda text: text.split(","),
+        help="comma separated protocols out of gbn, sr",
+    )
+    parser.add_argument(
+        "--seeds",
+        default=1,
+        type=int,
+        help="number of replications (seeds 0..n-1) per grid point",
+    )
+    parser.add_argument(
+        "--messages",
+        default=None,
+        type=ints,
+        help=f"comma separated values (default: 20, {MESSAGES} with --steady, "
+        "no limit with --steady and --wall)",
+    )
+    parser.add_argument(
+        "--corruptprob", default=[0.2], type=floats, help="comma separated values"
+    )
+    parser.add_argument(
+        "--lossprob", default=[0.2], type=floats, help="comma separated values"
+    )
+    parser.add_argument(
+        "--lambda", default=[4.0], type=floats, help="comma separated values"
+    )
+    parser.add_argument(
+        "--loss",
+        default=None,
+        action="append",
+        help="loss model of the channels as for simulator.py, repeat it for "
+        "several; none for independent losses",
+    )
+    parser.add_argument(
+        "--steady",
+        default=None,
+        choices=STEADY,
+        help="run every point until the batch means estimate of this metric "
+        f"is within --precision, without --wall at most {MESSAGES} messages "
+        "delivered",
+    )
+    parser.add_argument(
+        "--precision",
+        default=0.05,
+        type=float,
+        help="half width of the confidence interval relative to the mean",
+    )
+    parser.add_argument(
+        "--batch",
+        default=100,
+        type=int,
+        help="messages delivered per batch of --steady",
+    )
+    parser.add_argument(
+        "--wall",
+        default=None,
+        type=float,
+        help="seconds of wall time a --steady point may run at most",
+    )
+    parser.add_argument(
+        "--workers",
+        default=os.cpu_count(),
+        type=int,
+        help="number of worker processes",
+    )
+    parser.add_argument(
+        "--output", default=None, help="CSV file to write (default: stdout)"
+    )
+    args = parser.parse_args()
+    if args.messages is None:
+        if args.steady is None:
+            args.messages = [20]
+        else:
+            # a steady point that never converges stops at the Stop default
+            args.messages = [MESSAGES if args.wall is None else float("inf")]
+    assert args.seeds > 0
+    assert all(i >= 0 for i in args.messages)
+    assert all(0.0 <= i <= 1.0 for i in args.lossprob)
+    assert all(0.0 <= i <= 1.0 for i in args.corruptprob)
+    assert all(i > 0.0 for i in args.__dict__["lambda"])
+    assert args.precision > 0.0
+    assert args.batch > 0
+
+    steady = None
+    if args.steady is not None:
+        steady = {
+            "metric": args.steady,
+            "precision": args.precision,
+            "batch": args.batch,
+            "wall": args.wall,
+        }
+
+    # the loss model is a column of its own, only when there is one
+    fields = RESULTS
+    losses = {}
+    if args.loss is not None:
+        fields = ["loss"] + RESULTS
+        losses["loss"] = [None if i == "none" else i for i in args.loss]
+        for spec in losses["loss"]:
+            if spec is not None:
+                parse_loss(spec)  # fail now rather than in every worker
+    configs = grid(
+        protocol=args.protocol,
+        bidirectional=[args.bidirectional],
+        messages=args.messages,
+        corruptprob=args.corruptprob,
+        lossprob=args.lossprob,
+        **{"lambda": args.__dict__["lambda"]},
+        seed=range(args.seeds),
+        **losses,
+    )
+    if args.output is None:
+        sweep(configs, sys.stdout, args.workers, fields, steady)
+    else:
+        with open(args.output, "w", newline="") as output:
+            sweep(configs, output, args.workers, fields, steady)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Shared helpers of the tests. The modules live flat at the root of the
+repository, so it goes on the path whichever way pytest is started"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from checksum import CHECKSUMS, DEFAULT_CHECKSUM
+from simulator import Simulator
+
+
+class FakeSim:
+    """Just enough of Simulator to drive entities by hand: it keeps the
+    packets they send, the messages they deliver and the timers they run,
+    and moves time only when a test sets it"""
+
+    def __init__(self, bidirectional=False):
+        self.trace = 0
+        self.time = 0.0
+        self.bidirectional = bidirectional
+        self.checksum = CHECKSUMS[DEFAULT_CHECKSUM]
+        self.sent = []
+        self.delivered = []
+        self.timers = {}
+
+    def tolayer3(self, entity, packet):
+        self.sent.append(packet)
+
+    def tolayer5(self, entity, message):
+        self.delivered.append(message)
+
+    def starttimer(self, entity, increment, key=None):
+        self.timers[key] = self.time + increment
+
+    def stoptimer(self, entity, key=None):
+        self.timers.pop(key, None)
+
+    def take(self):
+        """The packets sent since the last take"""
+        sent, self.sent = self.sent, []
+        return sent
+
+
+@pytest.fixture
+def sim():
+    return FakeSim()
+
+
+def simulate(messages=200, lossprob=0.2, corruptprob=0.2, seed=1, **kwargs):
+    """Run a whole simulation with metrics, returns the Simulator and its
+    RunResult"""
+    bidirectional = kwargs.pop("bidirectional", False)
+    lambdat = kwargs.pop("lambdat", 10.0)
+    sim = Simulator(
+        bidirectional,
+        0,
+        seed,
+        messages,
+        corruptprob,
+        lossprob,
+        lambdat,
+        metrics=True,
+        **kwargs,
+    )
+    result = sim.run()
+    sim.close()
+    return sim, result
@@ -0,0 +1,112 @@
+import csv
+import io
+
+import pytest
+
+from analyze import JUMP, SERIES, TIMELINE, Analysis, analyze, records
+from simulator import Simulator
+from tracer import FORMATS, JSONL, Tracer
+
+# a level 3 trace of the old tracer, which wrote the payloads unquoted
+OLD = """\
+FromLayer5(1.5, EntityA)
+          TOLAYER3: Packet(acknum=0, seqnum=0, checksum=123, payload=AAAA)
+FromLayer3(4.0, EntityB, Packet(acknum=0, seqnum=0, checksum=123, payload=AAAA))
+          TOLAYER5: data received from EntityB: AAAA
+          TOLAYER3: Packet(acknum=1, seqnum=0, checksum=7, payload=)
+FromLayer3(6.5, EntityA, Packet(acknum=1, seqnum=0, checksum=7, payload=))
+TimerEvent(20.0, EntityA)
+          TOLAYER3: packet being lost
+"""
+
+
+def trace(tmp_path, level, format="text", **kwargs):
+    """Run a lossy simulation traced at level, returns the path of the
+    trace, the Simulator and its RunResult"""
+    path = tmp_path / f"trace{level}.{format}"
+    tracer = Tracer(format, str(path))
+    sim = Simulator(
+        True, level, 1, 50, 0.2, 0.2, 10.0, tracer=tracer, metrics=True, **kwargs
+    )
+    result = sim.run()
+    tracer.close()
+    return str(path), sim, result
+
+
+def test_old_traces_with_unquoted_payloads(tmp_path):
+    path = tmp_path / "old.txt"
+    path.write_text(OLD)
+    assert list(records(str(path))) == [
+        ("layer5", 1.5, "EntityA", None),
+        ("send", None, None, (0, 0, True)),
+        ("layer3", 4.0, "EntityB", (0, 0, True)),
+        ("tolayer5", None, None, None),
+        ("send", None, None, (1, 0, False)),
+        ("layer3", 6.5, "EntityA", (1, 0, False)),
+        ("timer", 20.0, "EntityA", None),
+        ("lost", None, None, None),
+    ]
+    summary = analyze(str(path))
+    assert (summary["data"], summary["acks"], summary["lost"]) == (1, 1, 1)
+    assert summary["latency"]["mean"] == pytest.approx(2.5)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_summary_agrees_with_the_run(tmp_path, format):
+    path, sim, result = trace(tmp_path, 3, format)
+    summary = analyze(path)
+    assert summary["time"] == sim.time
+    assert sum(summary["events"].values()) == sim.nevents
+    assert summary["lost"] == result.nlost and summary["corrupted"] == result.ncorrupt
+    assert summary["tolayer5"] == result.delivered
+    assert summary["carried"] == result.ntolayer3 - result.nlost
+    assert summary["data"] + summary["acks"] + summary["inflight"] == summary["carried"]
+    assert sum(summary["timeouts"].values()) == sum(result.timers_fired.values())
+    assert summary["latency"]["count"] == summary["data"] + summary["acks"]
+
+
+def test_every_text_level_and_jsonl_read_alike(tmp_path):
+    level3 = analyze(trace(tmp_path, 3)[0])
+    # level 4 adds the event list after every change, which is skipped
+    assert analyze(trace(tmp_path, 4)[0]) == level3
+    assert analyze(trace(tmp_path, 3, JSONL)[0]) == level3
+    # level 2 has the events and the channel but none of the sends
+    level2 = analyze(trace(tmp_path, 2)[0])
+    for name in ("time", "events", "data", "acks", "lost", "corrupted", "timeouts"):
+        assert level2[name] == level3[name]
+    assert level2["carried"] == 0 and level2["latency"] is None
+
+
+def test_seqnums_far_ahead_are_taken_for_corruption():
+    analysis = Analysis()
+    for seqnum in (0, 1, 2, 1, 2 + JUMP + 1, 3, 3 + JUMP):
+        analysis.feed("layer3", 1.0, "EntityB", (0, seqnum, True))
+    summary = analysis.summary()
+    # the 1 again is a repeat, the seqnum past the jump is neither
+    assert summary["data"] == 7 and summary["repeats"] == 1
+    assert analysis.highest["EntityB"] == 3 + JUMP
+
+
+def test_series_and_timeline(tmp_path):
+    path = tmp_path / "old.txt"
+    path.write_text(OLD)
+    series, timeline = io.StringIO(), io.StringIO()
+    analyze(str(path), 5.0, csv.writer(series), csv.writer(timeline))
+    rows = list(csv.reader(io.StringIO(series.getvalue())))
+    assert rows[0] == SERIES
+    # every interval up to the one of the timer, empty ones included
+    assert [row[:5] for row in rows[1:]] == [
+        ["0.0", "1", "1", "0", "0"],
+        ["5.0", "0", "0", "1", "0"],
+        ["10.0", "0", "0", "0", "0"],
+        ["15.0", "0", "0", "0", "0"],
+        ["20.0", "0", "0", "0", "1"],
+    ]
+    assert rows[-1][SERIES.index("lost")] == "1"
+    rows = list(csv.reader(io.StringIO(timeline.getvalue())))
+    assert rows[0] == TIMELINE
+    assert rows[1:] == [
+        ["EntityA", "0", "0", "data", "1.5", "delivered", "4.0", "2.5"],
+        ["EntityB", "0", "1", "ack", "4.0", "delivered", "6.5", "2.5"],
+        ["EntityA", "", "", "", "20.0", "lost", "", ""],
+    ]
@@ -0,0 +1,29 @@
+from bench import case, compare
+
+
+def result(name="1000-clean", rate=1000.0, memory=50.0, queue=10):
+    return {
+        "name": name,
+        "events_per_second": rate,
+        "peak_memory_mb": memory,
+        "max_evlist": queue,
+    }
+
+
+def test_a_case_is_reproducible():
+    first = case(20, "lossy", 20.0, 3)
+    second = case(20, "lossy", 20.0, 3)
+    for key in ("events", "max_evlist", "ntolayer3"):
+        assert first[key] == second[key]
+    assert first["events"] > first["ntolayer3"] > 0
+    assert first["max_evlist"] > 0
+
+
+def test_compare_flags_only_what_got_worse_beyond_tolerance():
+    baseline = {"results": [result()]}
+    assert compare([result(rate=850.0, memory=59.0, queue=11)], baseline, 0.2) == []
+    regressions = compare([result(rate=700.0, memory=70.0, queue=13)], baseline, 0.2)
+    assert len(regressions) == 3
+    assert all(i.startswith("1000-clean:") for i in regressions)
+    # a case missing from the baseline is not compared
+    assert compare([result("1000-harsh", rate=1.0)], baseline, 0.2) == []
@@ -0,0 +1,130 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from channel import Bottleneck, Channel, constant_delay, parse_delay, uniform_delay
+from conftest import simulate
+from packet import Packet
+from simulator import Simulator
+from streams import Streams
+
+
+def packet(payload=b"A" * 20):
+    return Packet(acknum=0, seqnum=1, payload=payload, checksum=0)
+
+
+def channel(lossprob=0.0, corruptprob=0.0, **kwargs):
+    sim = SimpleNamespace(time=0.0, trace=0)
+    return Channel(sim, "B", lossprob, corruptprob, streams=Streams(1), **kwargs)
+
+
+def test_packets_never_overtake_each_other():
+    link = channel()
+    last = 0.0
+    for i in range(1000):
+        link.sim.time = i * 0.5
+        arrival, _ = link.send(packet())
+        # the classic 1 to 10 time units after the latest arrival or now
+        assert max(last, link.sim.time) + 1.0 <= arrival
+        assert arrival < max(last, link.sim.time) + 10.0
+        last = arrival
+    assert link.inflight == 1000
+
+
+def test_lost_and_corrupted_packets_are_counted():
+    link = channel(lossprob=1.0)
+    assert link.send(packet()) is None
+    assert (link.nsent, link.nlost, link.inflight) == (1, 1, 0)
+
+    link = channel(corruptprob=1.0)
+    original = packet()
+    corrupted = [link.send(original)[1] for _ in range(100)]
+    assert link.ncorrupt == 100
+    assert all(p.asdict() != original.asdict() for p in corrupted)
+    # the sender's packet is left as it was
+    assert original.asdict() == packet().asdict()
+
+
+def test_bandwidth_serializes_packets_back_to_back():
+    link = channel(delay=constant_delay(0.0), bandwidth=8.0)
+    # 12 bytes of header and 20 of payload take 4 time units each
+    assert [link.send(packet())[0] for _ in range(3)] == [4.0, 8.0, 12.0]
+    link.sim.time = 20.0
+    assert link.send(packet(b"A" * 4))[0] == 22.0
+
+
+def test_parse_delay():
+    rng = random.Random(1)
+    assert parse_delay("constant:3")(rng) == 3.0
+    draw = parse_delay("uniform:2,4")
+    assert all(2.0 <= draw(rng) < 4.0 for _ in range(100))
+    with pytest.raises(ValueError):
+        parse_delay("pareto:1")
+
+
+def test_each_direction_has_a_channel_of_its_own():
+    sim = Simulator(True, 0, 1, 20, 0.0, 0.0, 10.0, delay=uniform_delay())
+    a, b = sim.entity_a, sim.entity_b
+    assert sim.channels[a].dest is b and sim.channels[b].dest is a
+    sim.tolayer3(a, packet())
+    sim.tolayer3(a, packet())
+    sim.tolayer3(b, packet())
+    assert (sim.channels[a].inflight, sim.channels[b].inflight) == (2, 1)
+
+
+def test_bottleneck_drops_at_a_full_queue(sim):
+    link = Bottleneck(sim, capacity=10.0, buffer=4)
+    departures = [link.enqueue(0.0, 20) for _ in range(6)]
+    # packets leave one after the other, size/capacity apart
+    assert departures[:4] == [2.0, 4.0, 6.0, 8.0]
+    assert departures[4:] == [None, None]
+    assert link.ndropped == 2
+    assert link.nsent == 4
+    assert link.maxqueue == 4
+
+
+def test_bottleneck_frees_room_as_packets_leave(sim):
+    link = Bottleneck(sim, capacity=10.0, buffer=2)
+    assert link.enqueue(0.0, 20) == 2.0
+    assert link.enqueue(0.0, 20) == 4.0
+    assert link.enqueue(1.0, 20) is None
+    # the first packet is gone at 2, the next one waits for the second
+    assert link.enqueue(2.0, 10) == 5.0
+    assert link.ndropped == 1
+    # an idle link sends right away
+    assert link.enqueue(10.0, 10) == 11.0
+
+
+def test_bottleneck_statistics(sim):
+    link = Bottleneck(sim, capacity=10.0, buffer=4)
+    for _ in range(2):
+        link.enqueue(0.0, 20)
+    stats = link.asdict(10.0)
+    assert stats["sent"] == 2 and stats["dropped"] == 0
+    assert stats["utilization"] == pytest.approx(0.4)
+    # two packets queued up to 2, one up to 4
+    assert stats["queue_mean"] == pytest.approx((2 * 2.0 + 1 * 2.0) / 10.0)
+    # the second waited 2 for the first
+    assert stats["queueing_delay_mean"] == pytest.approx(1.0)
+
+
+def test_flows_share_a_small_buffer():
+    sim, result = simulate(
+        lossprob=0.0,
+        corruptprob=0.0,
+        lambdat=1.0,
+        flows=3,
+        bottleneck=10.0,
+        buffer=4,
+        window=8,
+    )
+    forward = result.bottleneck["forward"]
+    # the only losses are tail drops at the full queue
+    assert forward["dropped"] > 0 and result.nlost == 0
+    assert forward["queue_max"] == 4
+    # every flow gets its own messages through, in order
+    assert all(flow["delivered"] > 0 for flow in result.flows)
+    assert sum(flow["delivered"] for flow in result.flows) == 200
+    assert result.misdelivered == 0
+    assert 0.5 < result.fairness <= 1.0
@@ -0,0 +1,55 @@
+import pytest
+
+from channel import parse_delay
+from simulator import Simulator, main
+
+
+def simulator(**kwargs):
+    return Simulator(True, 0, 3, 200, 0.2, 0.2, 10.0, metrics=True, **kwargs)
+
+
+@pytest.mark.parametrize("protocol", ["gbn", "sr"])
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path, protocol):
+    whole = simulator(protocol=protocol).run()
+
+    sim = simulator(protocol=protocol)
+    assert sim.run(until=500.0) is not None
+    assert sim.time <= 500.0 and sim.nsim < 200
+    sim.checkpoint(tmp_path / "run.gz")
+    resumed = Simulator.restore(tmp_path / "run.gz").run()
+
+    assert resumed.time == whole.time
+    assert resumed.ntolayer3 == whole.ntolayer3
+    assert resumed.delay == whole.delay
+    assert resumed.asdict() == whole.asdict()
+
+
+def test_restores_of_one_checkpoint_are_independent(tmp_path):
+    sim = simulator()
+    sim.run(until=500.0)
+    sim.checkpoint(tmp_path / "run.gz")
+    first = Simulator.restore(tmp_path / "run.gz")
+    first.run()
+    second = Simulator.restore(tmp_path / "run.gz")
+    assert second.time <= 500.0
+    assert second.run().asdict() == first.metrics.result().asdict()
+
+
+def test_a_checkpoint_keeps_custom_delays(tmp_path):
+    sim = simulator(delay=parse_delay("exponential:3"))
+    sim.run(until=300.0)
+    sim.checkpoint(tmp_path / "run.gz")
+    resumed = Simulator.restore(tmp_path / "run.gz").run()
+    assert resumed.asdict() == simulator(delay=parse_delay("exponential:3")).run().asdict()
+
+
+def test_metrics_need_a_checkpoint_with_them(tmp_path, monkeypatch):
+    sim = Simulator(True, 0, 3, 200, 0.2, 0.2, 10.0)
+    sim.run(until=300.0)
+    sim.checkpoint(tmp_path / "run.gz")
+    # the messages in flight would only show up as misdelivered
+    monkeypatch.setattr(
+        "sys.argv", ["simulator.py", "--resume", str(tmp_path / "run.gz"), "--metrics"]
+    )
+    with pytest.raises(AssertionError):
+        main()
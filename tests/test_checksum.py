@@ -0,0 +1,71 @@
+import random
+import struct
+import zlib
+
+import pytest
+
+from channel import HEADERLEN, flipbit
+from checksum import CHECKSUMS, crc32, internet_checksum
+from packet import Packet
+from simulator import Simulator
+
+
+def reference(data):
+    """RFC 1071 the slow way: big endian 16 bit words, zero padded"""
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def test_rfc1071_example():
+    # the example of RFC 1071 section 3, whose sum is ddf2; a zero seqnum
+    # and acknum add nothing to it
+    assert internet_checksum(0, 0, bytes.fromhex("0001f203f4f5f6f7")) == 0x220D
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 20, 1001])
+def test_internet_checksum_matches_reference(length):
+    rng = random.Random(length)
+    for _ in range(20):
+        seqnum, acknum = rng.getrandbits(32), rng.getrandbits(32)
+        payload = rng.randbytes(length)
+        expected = reference(struct.pack("!II", seqnum, acknum) + payload)
+        assert internet_checksum(seqnum, acknum, payload) == expected
+
+
+@pytest.mark.parametrize("length", [0, 1, 20, 1001])
+def test_crc32_matches_zlib(length):
+    rng = random.Random(length)
+    seqnum, acknum = rng.getrandbits(32), rng.getrandbits(32)
+    payload = rng.randbytes(length)
+    expected = zlib.crc32(struct.pack("!II", seqnum, acknum) + payload)
+    assert crc32(seqnum, acknum, payload) == expected
+
+
+def test_memoryview_payload_gives_the_same_checksum():
+    payload = b"some payload bytes"
+    for checksum in CHECKSUMS.values():
+        assert checksum(1, 2, memoryview(payload)) == checksum(1, 2, payload)
+
+
+@pytest.mark.parametrize("name", sorted(CHECKSUMS))
+def test_every_single_bit_flip_is_detected(name):
+    checksum = CHECKSUMS[name]
+    payload = b"ABCDEFGHIJ"
+    packet = Packet(7, 3, payload, checksum(3, 7, payload))
+    for bit in range((HEADERLEN + len(payload)) * 8):
+        flipped = flipbit(packet, bit)
+        assert flipped.checksum != checksum(
+            flipped.seqnum, flipped.acknum, flipped.payload
+        ), f"bit {bit} went unnoticed"
+
+
+def test_corruption_is_caught_past_the_letter_z():
+    # a leading Z used to be the mark of a corrupted payload
+    sim = Simulator(False, 0, 1, 30, 0.2, 0.0, 10.0, metrics=True)
+    result = sim.run()
+    assert result.ncorrupt > 0
+    assert result.delivered == 30 and result.misdelivered == 0
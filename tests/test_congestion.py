@@ -0,0 +1,92 @@
+from channel import Channel
+from congestion import Aimd, FixedWindow
+from entity import EntityA
+from streams import Streams
+
+
+def test_slow_start_adds_a_packet_per_packet_acked():
+    aimd = Aimd(16)
+    assert aimd.window == 1
+    aimd.acked(1)
+    assert aimd.window == 2
+    aimd.acked(2)
+    assert aimd.window == 4
+
+
+def test_slow_start_stops_at_ssthresh():
+    aimd = Aimd(16)
+    aimd.cwnd, aimd.ssthresh = 3.0, 4.0
+    # one packet takes cwnd to ssthresh, the other two add 1/cwnd each
+    aimd.acked(3)
+    assert aimd.cwnd == 4.0 + 2 / 4.0 and aimd.window == 4
+
+
+def test_congestion_avoidance_adds_a_packet_per_window():
+    aimd = Aimd(16)
+    aimd.cwnd = aimd.ssthresh = 4.0
+    for _ in range(4):
+        aimd.acked(1)
+    # a little less than one packet: each ACK adds 1/cwnd of a growing cwnd
+    assert aimd.window == 4 and 4.9 < aimd.cwnd < 5.0
+    aimd.acked(1)
+    assert aimd.window == 5
+
+
+def test_fast_retransmit_halves_the_window():
+    aimd = Aimd(16)
+    aimd.cwnd = 8.0
+    aimd.fastretransmit(8)
+    assert (aimd.ssthresh, aimd.cwnd, aimd.window) == (4.0, 4.0, 4)
+    # never below two packets
+    aimd.fastretransmit(1)
+    assert aimd.window == 2
+
+
+def test_timeout_starts_over_from_one_packet():
+    aimd = Aimd(16)
+    aimd.cwnd = 8.0
+    aimd.timeout(8)
+    assert (aimd.ssthresh, aimd.window) == (4.0, 1)
+    aimd.acked(1)
+    assert aimd.window == 2
+
+
+def test_flow_window_is_the_limit():
+    aimd = Aimd(4)
+    for _ in range(20):
+        aimd.acked(4)
+    assert aimd.window == 4
+    assert FixedWindow(4).window == 4
+
+
+def test_sender_keeps_to_the_congestion_window(sim):
+    a = EntityA(sim, window=8, congestion=True)
+    for i in range(8):
+        a.output(bytes([ord("A") + i]))
+    assert [p.seqnum for p in sim.take()] == [0]
+    a.input(a.makepacket(0, 1, b""))
+    assert [p.seqnum for p in sim.take()] == [1, 2]
+
+
+def test_queueloss_loses_everything_at_a_full_channel(sim):
+    channel = Channel(sim, "B", 0.0, 0.0, streams=Streams(1), queueloss=4)
+    channel.inflight = 0
+    assert not any(channel.decide()[0] for _ in range(100))
+    channel.inflight = 4
+    assert all(channel.decide()[0] for _ in range(100))
+
+
+def test_resend_only_what_the_congestion_window_allows(sim):
+    a = EntityA(sim, window=8, congestion=True)
+    a.congestion.cwnd = 4.0
+    a.congestion.window = 4
+    for i in range(4):
+        a.output(bytes([ord("A") + i]))
+    sim.take()
+    a.timerinterrupt()
+    # cwnd is back to one, the other three wait in the queue again
+    assert [p.seqnum for p in sim.take()] == [0]
+    assert [p.seqnum for p in a.to_send_window] == [1, 2, 3]
+    # the receiver had them all, only the ACKs got lost
+    a.input(a.makepacket(0, 4, b""))
+    assert a.windowsize() == 0 and not a.to_send_window
@@ -0,0 +1,230 @@
+import pytest
+
+from entity import ACKTIMER, DUPACKS, EntityA, EntityB
+from conftest import FakeSim, simulate
+from simulator import Simulator
+
+
+def ack(entity, acknum):
+    return entity.makepacket(0, acknum, b"")
+
+
+def test_at_most_n_packets_wait_for_an_ack(sim):
+    a = EntityA(sim, window=4)
+    for i in range(10):
+        a.output(bytes([ord("A") + i]))
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2, 3]
+    assert len(a.to_send_window) == 6
+    # a cumulative ACK for 0 and 1 lets two more out
+    a.input(ack(a, 2))
+    assert [p.seqnum for p in sim.take()] == [4, 5]
+    assert a.windowsize() == 4
+
+
+def test_timeout_resends_only_the_window(sim):
+    a = EntityA(sim, window=3, timeout=10, adaptive=False)
+    for i in range(5):
+        a.output(bytes([ord("A") + i]))
+    sim.take()
+    sim.time = 10.0
+    a.timerinterrupt()
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2]
+    assert sim.timers == {None: 20.0}
+
+
+def test_duplicate_acks_resend_once_per_base(sim):
+    a = EntityA(sim, window=3)
+    for i in range(3):
+        a.output(bytes([ord("A") + i]))
+    sim.take()
+    for _ in range(DUPACKS - 1):
+        a.input(ack(a, 0))
+    assert sim.take() == []
+    a.input(ack(a, 0))
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2]
+    # the first ACK for 1 is new, it moves the base
+    for _ in range(DUPACKS + 1):
+        a.input(ack(a, 1))
+    assert [p.seqnum for p in sim.take()] == [1, 2]
+
+
+def test_resends_echoed_back_do_not_resend_again(sim):
+    a = EntityA(sim, window=3)
+    for i in range(5):
+        a.output(bytes([ord("A") + i]))
+    sim.take()
+    for _ in range(DUPACKS):
+        a.input(ack(a, 0))
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2]
+    # the receiver had them all, its ACK for them lets 3 and 4 out and the
+    # resends come back as duplicate ACKs for 3
+    a.input(ack(a, 3))
+    assert [p.seqnum for p in sim.take()] == [3, 4]
+    for _ in range(DUPACKS):
+        a.input(ack(a, 3))
+    assert sim.take() == []
+    # past the resent window duplicate ACKs mean a loss again
+    a.input(ack(a, 4))
+    for _ in range(DUPACKS):
+        a.input(ack(a, 4))
+    assert [p.seqnum for p in sim.take()] == [4]
+
+
+def test_timer_runs_exactly_while_the_window_is_not_empty(sim):
+    a = EntityA(sim, window=3, timeout=10)
+    assert sim.timers == {}
+    a.output(b"A")
+    a.output(b"B")
+    assert None in sim.timers
+    a.input(ack(a, 2))
+    assert sim.timers == {} and a.windowsize() == 0
+
+
+def test_receiver_reacks_a_packet_it_delivered_already(sim):
+    b = EntityB(sim)
+    first = b.makepacket(0, 0, b"A")
+    b.input(first)
+    b.input(first)
+    assert sim.delivered == [b"A"]
+    assert [p.acknum for p in sim.take()] == [1, 1]
+
+
+def test_window_bounds_the_packets_in_flight():
+    sim = Simulator(False, 0, 1, 20, 0.2, 0.2, 10.0, metrics=True, window=3)
+    result = sim.run()
+    assert result.windows["EntityA"]["max"] == 3
+    assert result.delivered == 20 and result.misdelivered == 0
+
+
+def test_sender_seqnums_and_cumulative_acks_wrap(sim):
+    a = EntityA(sim, window=3, seqspace=4)
+    for message in (b"a", b"b", b"c"):
+        a.output(message)
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2]
+    a.input(ack(a, 3))
+    assert a.windowsize() == 0
+
+    a.output(b"d")
+    a.output(b"e")
+    assert [p.seqnum for p in sim.take()] == [3, 0]
+    # acknum 1 comes after the wrap and covers both of them
+    a.input(ack(a, 1))
+    assert a.windowsize() == 0
+    assert sim.timers == {}
+
+
+def test_ack_from_before_the_window_is_ignored(sim):
+    a = EntityA(sim, window=3, seqspace=4)
+    for message in (b"a", b"b", b"c", b"d"):
+        a.output(message)
+    a.input(ack(a, 3))
+    assert [p.seqnum for p in a.sent_packet_window] == [3]
+    # an old ACK for 2 would cover 3 packets counted naively
+    a.input(ack(a, 2))
+    assert [p.seqnum for p in a.sent_packet_window] == [3]
+
+
+def test_receiver_expected_wraps_and_drops_duplicates(sim):
+    b = EntityB(sim, seqspace=4)
+    for seqnum in (0, 1, 2, 3, 0):
+        b.input(b.makepacket(seqnum, 0, bytes([seqnum])))
+    assert sim.delivered == [b"\0", b"\1", b"\2", b"\3", b"\0"]
+    assert b.expected == 1
+    # the second 0 again: already delivered, only re-ACKed
+    b.input(b.makepacket(0, 0, b"\0"))
+    assert len(sim.delivered) == 5
+    assert sim.take()[-1].acknum == 1
+
+
+@pytest.mark.parametrize("protocol,seqspace", [("gbn", 5), ("sr", 8)])
+def test_runs_wrap_the_seqnums_many_times_over(protocol, seqspace):
+    sim = Simulator(
+        False,
+        0,
+        1,
+        200,
+        0.2,
+        0.2,
+        10.0,
+        metrics=True,
+        protocol=protocol,
+        window=4,
+        seqspace=seqspace,
+    )
+    seqnums = []
+    channel = sim.channels[sim.entity_a]
+    send = channel.send
+    channel.send = lambda packet: seqnums.append(packet.seqnum) or send(packet)
+    result = sim.run()
+    assert set(seqnums) == set(range(seqspace))
+    # every message arrives, in order, though each seqnum was reused 25 times
+    assert result.delivered == 200 and result.misdelivered == 0
+    # the retransmissions metric still tells resends apart across the wrap
+    assert result.retransmissions == result.datasent - 200
+
+
+def test_data_carries_the_ack_instead_of_a_pure_ack():
+    sim = FakeSim(bidirectional=True)
+    b = EntityB(sim, ackdelay=5)
+    b.input(b.makepacket(0, 0, b"A"))
+    # held back for data to carry it
+    assert sim.take() == [] and sim.timers == {ACKTIMER: 5.0}
+    b.output(b"a")
+    [packet] = sim.take()
+    assert (packet.seqnum, packet.acknum, packet.payload) == (0, 1, b"a")
+    assert ACKTIMER not in sim.timers
+
+
+def test_held_ack_goes_out_alone_when_no_data_comes():
+    sim = FakeSim(bidirectional=True)
+    b = EntityB(sim, ackdelay=5)
+    b.input(b.makepacket(0, 0, b"A"))
+    sim.time = 5.0
+    b.timerinterrupt(ACKTIMER)
+    [packet] = sim.take()
+    assert (packet.acknum, packet.payload) == (1, b"")
+
+
+def test_every_second_packet_is_acked_right_away():
+    sim = FakeSim(bidirectional=True)
+    b = EntityB(sim, ackdelay=5)
+    b.input(b.makepacket(0, 0, b"A"))
+    b.input(b.makepacket(1, 0, b"B"))
+    assert [p.acknum for p in sim.take()] == [2]
+    assert ACKTIMER not in sim.timers
+
+
+def test_acks_are_not_held_back_one_way(sim):
+    b = EntityB(sim, ackdelay=5)
+    b.input(b.makepacket(0, 0, b"A"))
+    assert [p.acknum for p in sim.take()] == [1]
+
+
+def test_piggybacking_sends_fewer_packets():
+    runs = [
+        simulate(1000, 0.0, 0.0, bidirectional=True, lambdat=8.0, ackdelay=ackdelay)[1]
+        for ackdelay in (0, 5)
+    ]
+    assert runs[1].ntolayer3 < runs[0].ntolayer3
+    # the held back ACKs don't make either side time out and resend
+    assert runs[1].retransmissions <= 20
+
+
+def test_repeated_acknums_on_data_are_not_duplicate_acks():
+    sim = FakeSim(bidirectional=True)
+    a = EntityA(sim, window=3)
+    for i in range(3):
+        a.output(bytes([ord("A") + i]))
+    sim.take()
+    # the other end keeps sending data while still waiting for our 0
+    for seqnum in range(DUPACKS + 1):
+        a.input(a.makepacket(seqnum, 0, b"x"))
+    assert all(not p.payload for p in sim.take())
+
+
+def test_empty_message_is_rejected(sim):
+    a = EntityA(sim)
+    # it would go out looking like a pure ACK and never be delivered
+    with pytest.raises(ValueError):
+        a.output(b"")
+    assert sim.take() == []
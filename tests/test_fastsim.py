@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from fastsim import crossvalidate  # noqa: E402
+
+# (messages, corruptprob, lossprob, lambda), the model's fixed timeout and
+# window, and how far off its goodput and mean delay may be, relative to
+# Simulator. The model is exact but for sampling on a clean channel, and
+# approximates Go-Back-N after a loss, which shows in the delay first.
+CONFIGS = [
+    ((500, 0.0, 0.0, 20.0), {"timeout": 100.0, "window": 8}, 0.03, 0.05),
+    ((500, 0.0, 0.1, 20.0), {"timeout": 100.0, "window": 8}, 0.05, 0.3),
+    ((500, 0.05, 0.05, 20.0), {"timeout": 100.0, "window": 1}, 0.05, 0.15),
+    ((500, 0.1, 0.1, 50.0), {"timeout": 60.0, "window": 8}, 0.05, 0.2),
+]
+
+
+@pytest.mark.parametrize("config,kwargs,goodput,delay", CONFIGS)
+def test_model_agrees_with_simulator(config, kwargs, goodput, delay):
+    comparison = crossvalidate(range(10), 500, *config, **kwargs)
+    assert comparison["goodput"][2] <= goodput
+    assert comparison["delay_mean"][2] <= delay
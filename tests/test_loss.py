@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from conftest import simulate
+from loss import CORRUPTED, DELIVERED, LOST, GilbertElliott, TraceLoss, parse_loss
+from stopping import Stop
+
+
+def test_gilbert_elliott_loses_its_stationary_share():
+    p, r = 0.01, 0.25
+    model = GilbertElliott(p, r)
+    rng = random.Random(1)
+    steps = 200000
+    lost = bursts = 0
+    previous = False
+    for _ in range(steps):
+        lossprob, _ = model.step(rng, 0.0, 0.0)
+        if lossprob == 1.0:
+            lost += 1
+            bursts += not previous
+        previous = model.bad
+    assert lost / steps == pytest.approx(p / (p + r), rel=0.05)
+    # bad periods are geometric with mean 1/r
+    assert lost / bursts == pytest.approx(1.0 / r, rel=0.05)
+
+
+def test_gilbert_elliott_good_state_uses_the_channel_probabilities():
+    model = GilbertElliott(0.0, 1.0, lossbad=0.5, corruptbad=0.3)
+    rng = random.Random(1)
+    assert model.step(rng, 0.1, 0.2) == (0.1, 0.2)
+    model.bad = True
+    model.r = 0.0
+    assert model.step(rng, 0.1, 0.2) == (0.5, 0.3)
+    model.corruptbad = None
+    assert model.step(rng, 0.1, 0.2) == (0.5, 0.2)
+
+
+def test_trace_wraps_around_and_skips_whitespace(tmp_path):
+    path = tmp_path / "trace.txt"
+    path.write_text("0 1\nc.\r\nx\n")
+    model = TraceLoss(str(path))
+    rng = random.Random(1)
+    outcomes = [model.step(rng, 0.5, 0.5) for _ in range(12)]
+    pattern = [DELIVERED, LOST, CORRUPTED, DELIVERED, LOST]
+    assert outcomes == (pattern * 3)[:12]
+
+
+@pytest.mark.parametrize("content", ["", " \n\t", "01?0", "0L"])
+def test_trace_rejects_empty_and_unknown_characters(tmp_path, content):
+    path = tmp_path / "trace.txt"
+    path.write_text(content)
+    with pytest.raises(ValueError):
+        TraceLoss(str(path))
+
+
+def test_parse_loss():
+    model = parse_loss("gilbert:0.01,0.25,0.5,0.3")
+    assert (model.p, model.r, model.lossbad, model.corruptbad) == (
+        0.01,
+        0.25,
+        0.5,
+        0.3,
+    )
+    with pytest.raises(ValueError):
+        parse_loss("bernoulli:0.1")
+
+
+def test_trace_loses_and_corrupts_exactly_what_it_says(tmp_path):
+    pattern = "000000000x000c0"
+    path = tmp_path / "trace.txt"
+    path.write_text(pattern)
+    # a pattern whose period divides the Go-Back-N rounds, like 0001, can
+    # lose the same packet for ever, the events limit keeps that from hanging
+    stop = Stop(events=100000)
+    sim, _ = simulate(
+        lossprob=0.0,
+        corruptprob=0.0,
+        loss=parse_loss(f"trace:{path}"),
+        stop=stop,
+    )
+    assert stop.reason is None
+    # each direction steps a copy of its own through the pattern
+    for channel in sim.channels.values():
+        outcomes = (pattern * channel.nsent)[: channel.nsent]
+        assert channel.nlost == outcomes.count("x")
+        assert channel.ncorrupt == outcomes.count("c")
@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import FakeSim
+from entity import EntityA, EntityB
+from metrics import Histogram, Metrics, Occupancy, fairness
+from packet import Packet
+from simulator import Simulator
+
+
+def test_histogram():
+    histogram = Histogram(width=2.0)
+    for value in (0.5, 1.0, 3.0, 3.5, 9.0):
+        histogram.add(value)
+    assert histogram.mean() == pytest.approx(17.0 / 5)
+    assert (histogram.min, histogram.max) == (0.5, 9.0)
+    # the upper edge of the bin of the quantile, the maximum at most
+    assert histogram.quantile(0.4) == 2.0
+    assert histogram.quantile(0.5) == 4.0
+    assert histogram.quantile(1.0) == 9.0
+    assert histogram.asdict()["bins"] == {0.0: 2, 2.0: 2, 8.0: 1}
+    assert Histogram().quantile(0.5) is None
+
+
+def test_occupancy_is_time_weighted():
+    occupancy = Occupancy()
+    occupancy.update(2.0, 4)
+    occupancy.update(4.0, 1)
+    # 0 for 2, 4 for 2 and 1 for 6 time units
+    assert occupancy.mean(10.0) == pytest.approx((8.0 + 6.0) / 10.0)
+    assert occupancy.max == 4
+    assert occupancy.series == [(2.0, 4), (4.0, 1)]
+
+
+def test_fairness():
+    assert fairness([2.0, 2.0, 2.0]) == pytest.approx(1.0)
+    assert fairness([3.0, 0.0, 0.0]) == pytest.approx(1 / 3)
+    assert fairness([0.0, 0.0]) == 1.0
+
+
+def test_retransmissions_are_data_packets_sent_again():
+    metrics = Metrics(SimpleNamespace(seqspace=8, window=4, flows=[0]))
+    a, b = EntityA(FakeSim()), EntityB(FakeSim())
+    # a window behind the highest seqnum sent is a resend, across the wrap
+    for seqnum in (5, 6, 7, 6, 7, 0, 1, 7, 2):
+        metrics.sent(a, Packet(acknum=0, seqnum=seqnum, payload=b"x", checksum=0))
+    metrics.sent(b, Packet(acknum=1, seqnum=0, payload=b"", checksum=0))
+    assert (metrics.ndatasent, metrics.nretransmit, metrics.nacksent) == (9, 3, 1)
+
+
+def test_delay_is_measured_from_layer5_to_layer5():
+    metrics = Metrics(SimpleNamespace(flows=[0]))
+    a, b = EntityA(FakeSim()), EntityB(FakeSim())
+    metrics.layer5(a, b, 1.0, "first")
+    metrics.layer5(a, b, 2.0, "second")
+    metrics.delivered(b, 4.0, "first")
+    metrics.delivered(b, 9.0, "wrong")
+    metrics.delivered(b, 10.0, "extra")
+    assert metrics.delay.count == 2 and metrics.delay.mean() == pytest.approx(5.0)
+    assert (metrics.ndelivered, metrics.nmisdelivered) == (3, 2)
+
+
+def test_run_result_adds_up():
+    sim = Simulator(False, 0, 1, 20, 0.2, 0.2, 10.0, metrics=True)
+    result = sim.run()
+    assert result.ntolayer3 == result.datasent + result.acksent
+    channels = result.channels.values()
+    assert sum(c["sent"] for c in channels) == result.ntolayer3
+    assert sum(c["lost"] for c in channels) == result.nlost == sim.nlost
+    assert result.goodput == pytest.approx(20 * result.delivered / sim.time)
+    assert result.delay["count"] <= result.delivered
+    assert result.timers_fired["EntityA"] <= result.timers_started["EntityA"]
+    assert 0.0 < result.windows["EntityA"]["mean"] <= result.windows["EntityA"]["max"]
+    json.loads(result.tojson())
+
+
+def test_no_metrics_no_result():
+    assert Simulator(False, 0, 1, 5, 0.0, 0.0, 10.0).run() is None
@@ -0,0 +1,47 @@
+import copy
+import pickle
+
+import pytest
+
+from packet import Packet
+from simulator import Simulator
+
+
+def test_packet_is_immutable():
+    packet = Packet(acknum=1, seqnum=2, payload="hello", checksum=3)
+    with pytest.raises(AttributeError):
+        packet.seqnum = 5
+    with pytest.raises(AttributeError):
+        del packet.payload
+    with pytest.raises(AttributeError):
+        packet.extra = 1
+
+
+def test_replace_derives_a_new_packet():
+    packet = Packet(acknum=1, seqnum=2, payload="hello", checksum=3)
+    changed = packet.replace(seqnum=9)
+    assert (changed.acknum, changed.seqnum, changed.payload, changed.checksum) == (
+        1,
+        9,
+        "hello",
+        3,
+    )
+    assert packet.seqnum == 2
+
+
+def test_copies_are_the_packet_itself():
+    packet = Packet(acknum=1, seqnum=2, payload="hello", checksum=3)
+    assert copy.copy(packet) is packet
+    assert copy.deepcopy([packet])[0] is packet
+    restored = pickle.loads(pickle.dumps(packet))
+    assert (restored.seqnum, restored.payload) == (2, "hello")
+
+
+def test_receiver_gets_the_object_the_sender_sent():
+    sim = Simulator(False, 0, 1, 0, 0.0, 0.0, 10.0)
+    received = []
+    sim.entity_b.input = received.append
+    packet = Packet(acknum=0, seqnum=0, payload="A" * 20, checksum=0)
+    sim.tolayer3(sim.entity_a, packet)
+    sim.run()
+    assert len(received) == 1 and received[0] is packet
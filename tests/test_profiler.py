@@ -0,0 +1,55 @@
+import io
+import json
+import signal
+
+import pytest
+
+from conftest import simulate
+from profiler import Profile, Sampler, report
+
+
+def test_profile_counts_every_event_and_callback():
+    sim, result = simulate(messages=50, profile=True)
+    summary = sim.profile.summary()
+    assert sum(i["calls"] for i in summary["events"].values()) == sim.nevents
+    calls = summary["calls"]
+    assert calls["Simulator.tolayer3"]["calls"] == result.ntolayer3
+    assert calls["EntityA.output"]["calls"] == sim.nsim
+    # self time never exceeds the time including the calls made
+    assert all(i["exclusive"] <= i["inclusive"] for i in calls.values())
+    assert 0.0 < summary["protocol"] < summary["wall"]
+
+
+def test_profiled_run_is_the_same_run():
+    _, profiled = simulate(messages=50, profile=True)
+    _, plain = simulate(messages=50)
+    assert profiled.asdict() == plain.asdict()
+
+
+def test_no_checkpoint_while_profiling(tmp_path):
+    sim, _ = simulate(messages=5, profile=True)
+    with pytest.raises(ValueError):
+        sim.checkpoint(tmp_path / "run.gz")
+
+
+def test_report_saves_the_summary(tmp_path):
+    sim, _ = simulate(messages=20, profile=True)
+    output = io.StringIO()
+    report(sim.profile, tmp_path / "profile.json", output)
+    saved = json.loads((tmp_path / "profile.json").read_text())
+    assert saved["events"].keys() == sim.profile.summary()["events"].keys()
+    assert "FromLayer3Event" in output.getvalue()
+
+
+def test_sampler_puts_back_the_previous_handler():
+    def busy():
+        total = 0
+        for i in range(200000):
+            total += i * i
+        return total
+
+    with Sampler(interval=0.0005) as sampler:
+        while sampler.nsamples == 0:
+            busy()
+    assert any("busy" in where for where in sampler.onstack)
+    assert signal.getsignal(signal.SIGPROF) is not sampler.sample
@@ -0,0 +1,75 @@
+import pytest
+
+from conftest import simulate
+from replay import MAGIC, RECORD, Recorder, Replay
+
+DECISIONS = [
+    (0, (False, 3.5, None)),
+    (1, (True, 0.0, None)),
+    (0, (False, 7.25, 0.125)),
+    (0, (True, 0.0, None)),
+    (1, (False, 1.0, 0.5)),
+]
+
+
+def test_decisions_read_back_per_direction(tmp_path):
+    path = str(tmp_path / "run.rec")
+    recorder = Recorder(path)
+    writers = [recorder.writer(0), recorder.writer(1)]
+    for direction, decision in DECISIONS:
+        writers[direction](decision)
+    recorder.close()
+
+    replay = Replay(path)
+    for direction in (0, 1):
+        expected = [d for i, d in DECISIONS if i == direction]
+        assert list(replay.decisions(direction)) == expected
+    replay.close()
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"CHANREC0" + RECORD.pack(0, 1.0, 0.0), MAGIC + RECORD.pack(0, 1.0, 0.0)[:-1]],
+)
+def test_bad_magic_and_truncated_files_are_rejected(tmp_path, content):
+    path = tmp_path / "run.rec"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        Replay(str(path))
+
+
+@pytest.mark.parametrize("protocol", ["gbn", "sr"])
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_replay_reproduces_the_recorded_run(tmp_path, protocol, bidirectional):
+    path = str(tmp_path / "run.rec")
+    _, recorded = simulate(protocol=protocol, bidirectional=bidirectional, record=path)
+    # the channel does what the recording says, whatever its probabilities
+    _, replayed = simulate(
+        protocol=protocol,
+        bidirectional=bidirectional,
+        replay=path,
+        lossprob=0.5,
+        corruptprob=0.0,
+    )
+    assert replayed.asdict() == recorded.asdict()
+    assert recorded.nlost > 0 and recorded.ncorrupt > 0
+
+
+def test_run_goes_on_past_the_end_of_the_recording(tmp_path):
+    short, longer = str(tmp_path / "short.rec"), str(tmp_path / "long.rec")
+    simulate(messages=20, record=short)
+    simulate(messages=200, replay=short, record=longer)
+    recorded, replayed = Replay(short), Replay(longer)
+    for direction in (0, 1):
+        first = list(recorded.decisions(direction))
+        then = list(replayed.decisions(direction))
+        # the recording first, then live draws
+        assert then[: len(first)] == first and len(then) > len(first)
+    recorded.close()
+    replayed.close()
+
+
+def test_no_checkpoint_while_recording(tmp_path):
+    sim, _ = simulate(messages=20, record=str(tmp_path / "run.rec"))
+    with pytest.raises(ValueError):
+        sim.checkpoint(tmp_path / "run.gz")
@@ -0,0 +1,82 @@
+import pytest
+
+from entity import EntityA
+from rtt import MAXRTO, MINRTO, FixedTimeout, RttEstimator
+from simulator import Simulator
+
+
+def test_first_sample_sets_srtt_and_rttvar():
+    rtt = RttEstimator(10.0)
+    rtt.sample(8.0)
+    # RFC 6298 2.2: SRTT = R, RTTVAR = R/2, RTO = SRTT + 4*RTTVAR
+    assert rtt.srtt == 8.0
+    assert rtt.rttvar == 4.0
+    assert rtt.rto == 24.0
+
+
+def test_later_samples_are_smoothed():
+    rtt = RttEstimator(10.0)
+    rtt.sample(8.0)
+    rtt.sample(16.0)
+    # RFC 6298 2.3 with alpha 1/8 and beta 1/4
+    assert rtt.rttvar == pytest.approx(0.75 * 4.0 + 0.25 * 8.0)
+    assert rtt.srtt == pytest.approx(0.875 * 8.0 + 0.125 * 16.0)
+    assert rtt.rto == pytest.approx(9.0 + 4 * 5.0)
+
+
+def test_rto_is_clamped():
+    assert RttEstimator(0.1).rto == MINRTO
+    assert RttEstimator(10 * MAXRTO).rto == MAXRTO
+    rtt = RttEstimator(10.0)
+    rtt.sample(0.01)
+    assert rtt.rto == MINRTO
+
+
+def test_backoff_doubles_until_a_valid_sample():
+    rtt = RttEstimator(10.0)
+    rtt.backoff()
+    rtt.backoff()
+    assert rtt.rto == 40.0
+    for _ in range(20):
+        rtt.backoff()
+    assert rtt.rto == MAXRTO
+    rtt.sample(4.0)
+    assert rtt.rto == 12.0
+
+
+def test_fixed_timeout_ignores_everything():
+    rtt = FixedTimeout(10.0)
+    rtt.sample(1.0)
+    rtt.backoff()
+    assert rtt.rto == 10.0
+
+
+def test_karns_rule_skips_acks_of_resent_packets(sim):
+    a = EntityA(sim, window=4, timeout=10.0)
+    a.output(b"first")
+    sim.time = 10.0
+    a.timerinterrupt()
+    assert a.rtt.rto == 20.0
+
+    # the ACK can't tell which transmission it is for: no sample, and the
+    # backoff stays until there is a valid one
+    sim.time = 12.0
+    a.input(a.makepacket(0, 1, b""))
+    assert a.rtt.srtt is None
+    assert a.rtt.rto == 20.0
+    assert sim.timers == {}
+
+    a.output(b"second")
+    sim.time = 15.0
+    a.input(a.makepacket(0, 2, b""))
+    assert a.rtt.srtt == 3.0
+    assert a.rtt.rto == 9.0
+
+
+def test_timeout_grows_to_a_round_trip_longer_than_the_initial_one():
+    # a fixed timeout of 3 would resend every packet, a round trip is 2 to 20
+    sim = Simulator(False, 0, 1, 200, 0.0, 0.0, 20.0, metrics=True, timeout=3.0)
+    result = sim.run()
+    assert result.delivered == 200
+    assert result.retransmissions <= 5
+    assert sim.entity_a.rtt.srtt > 3.0
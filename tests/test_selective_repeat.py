@@ -0,0 +1,110 @@
+from conftest import simulate
+from entity import DUPACKS
+from selective_repeat import SelectiveRepeatA, SelectiveRepeatB
+
+
+def data(entity, seqnum):
+    return entity.makepacket(seqnum, 0, bytes([ord("a") + seqnum]))
+
+
+def test_receiver_buffers_out_of_order_and_delivers_in_order(sim):
+    b = SelectiveRepeatB(sim, window=4)
+    for seqnum in (2, 1):
+        b.input(data(b, seqnum))
+    assert sim.delivered == []
+    b.input(data(b, 0))
+    assert sim.delivered == [b"a", b"b", b"c"]
+    # every packet is ACKed on its own as it arrives
+    assert [p.acknum for p in sim.take()] == [2, 1, 0]
+    assert b.expected == 3 and b.buffer == [None] * 4
+
+
+def test_ring_buffer_wraps_with_the_seqnums(sim):
+    b = SelectiveRepeatB(sim, window=4, seqspace=8)
+    # five rounds of the ring, past the end of the sequence space twice, each
+    # window arriving backwards
+    for start in range(0, 20, 4):
+        for seqnum in reversed(range(start, start + 4)):
+            b.input(b.makepacket(seqnum % 8, 0, bytes([seqnum])))
+    assert sim.delivered == [bytes([i]) for i in range(20)]
+    assert b.expected == 20 % 8 and b.head == 20 % 4
+
+
+def test_receiver_ignores_beyond_window_and_reacks_old(sim):
+    b = SelectiveRepeatB(sim, window=4, seqspace=16)
+    b.input(data(b, 0))
+    sim.take()
+    # expected is 1: 5 is past the window, 0 was delivered already
+    b.input(data(b, 5))
+    assert sim.take() == []
+    b.input(data(b, 0))
+    assert [p.acknum for p in sim.take()] == [0]
+    assert sim.delivered == [b"a"]
+
+
+def test_sender_resends_only_the_packet_that_timed_out(sim):
+    a = SelectiveRepeatA(sim, window=4, seqspace=8)
+    for message in (b"x", b"y", b"z"):
+        a.output(message)
+    assert [p.seqnum for p in sim.take()] == [0, 1, 2]
+    assert set(sim.timers) == {0, 1, 2}
+
+    a.input(a.makepacket(0, 1, b""))
+    assert 1 not in sim.timers
+    assert a.windowsize() == 3  # 0 is still missing
+    a.timerinterrupt(0)
+    assert [p.seqnum for p in sim.take()] == [0]
+
+    a.input(a.makepacket(0, 0, b""))
+    assert [p.seqnum for p in a.sent_packet_window] == [2]
+
+
+def test_packet_acked_around_is_resent_once_without_waiting(sim):
+    a = SelectiveRepeatA(sim, window=8, seqspace=16)
+    for i in range(DUPACKS + 2):
+        a.output(bytes([ord("a") + i]))
+    sim.take()
+    # 0 is missing, the ACKs of the packets after it show it is lost
+    for seqnum in range(1, DUPACKS):
+        a.input(a.makepacket(0, seqnum, b""))
+    assert sim.take() == []
+    a.input(a.makepacket(0, DUPACKS, b""))
+    assert [p.seqnum for p in sim.take()] == [0]
+    a.input(a.makepacket(0, DUPACKS + 1, b""))
+    assert sim.take() == []
+
+
+def test_timeout_backs_off_only_when_nothing_came_back(sim):
+    a = SelectiveRepeatA(sim, window=4, seqspace=8, timeout=10.0)
+    for message in (b"x", b"y", b"z"):
+        a.output(message)
+    sim.take()
+    # 1 got through, so 0 is lost rather than late
+    a.input(a.makepacket(0, 1, b""))
+    rto = a.rtt.rto
+    sim.time = 10.0
+    a.timerinterrupt(0)
+    assert a.rtt.rto == rto
+    # nothing after 2 came back: the RTO is too short for the packets
+    # queued behind it as well
+    sim.time = 12.0
+    a.timerinterrupt(2)
+    assert a.rtt.rto == 2 * rto
+    assert sim.timers[2] == 12.0 + 2 * rto
+    a.input(a.makepacket(0, 0, b""))
+    assert a.rtt.rto == 2 * rto  # Karn's rule, 0 was resent
+
+
+def test_no_retransmission_chains_on_a_clean_channel():
+    # near capacity: the channel carries one packet every 5.5 on average
+    _, sr = simulate(1000, 0.0, 0.0, lambdat=8.0, protocol="sr")
+    _, gbn = simulate(1000, 0.0, 0.0, lambdat=8.0)
+    assert sr.retransmissions <= 0.02 * 1000
+    assert sr.delay["mean"] < 1.5 * gbn.delay["mean"]
+
+
+def test_a_loss_costs_less_than_with_go_back_n():
+    _, sr = simulate(1000, 0.1, 0.1, lambdat=20.0, protocol="sr")
+    _, gbn = simulate(1000, 0.1, 0.1, lambdat=20.0)
+    assert sr.retransmissions < gbn.retransmissions
+    assert sr.goodput > gbn.goodput
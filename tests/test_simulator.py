@@ -0,0 +1,40 @@
+from simulator import FromLayer5Event, Simulator
+
+
+def idle():
+    """A simulator with no messages to send, its event list empty"""
+    sim = Simulator(False, 0, 1, 0, 0.0, 0.0, 10.0)
+    sim.evlist.clear()
+    return sim
+
+
+def test_events_leave_in_time_order_and_ties_in_insertion_order():
+    sim = idle()
+    late = [FromLayer5Event(5.0, sim.entity_a) for _ in range(10)]
+    early = FromLayer5Event(1.0, sim.entity_b)
+    for event in late + [early]:
+        sim.insertevent(event)
+    assert sim.pendingevents() == [early] + late
+
+
+def test_stopped_timer_is_cancelled_lazily_and_never_fires():
+    sim = idle()
+    fired = []
+    sim.entity_a.timerinterrupt = lambda: fired.append(sim.time)
+    sim.starttimer(sim.entity_a, 10.0)
+    sim.stoptimer(sim.entity_a)
+    # still in the heap, but no longer pending
+    assert len(sim.evlist) == 1 and sim.pendingevents() == []
+    sim.starttimer(sim.entity_a, 20.0)
+    sim.run()
+    assert fired == [20.0]
+    assert sim.timers == {}
+
+
+def test_heap_is_compacted_once_mostly_cancelled():
+    sim = idle()
+    for _ in range(1000):
+        sim.starttimer(sim.entity_a, 10.0)
+        sim.stoptimer(sim.entity_a)
+    assert len(sim.evlist) <= 2 * 64 + 2
+    assert sim.pendingevents() == []
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from conftest import simulate
+import stopping
+from stopping import MESSAGES, Steady, Stop, mser, tquantile
+from sweep import run
+
+
+@pytest.mark.parametrize(
+    "p,dof,expected",
+    [
+        # from the tables of the t distribution
+        (0.975, 10, 2.228),
+        (0.975, 5, 2.571),
+        (0.95, 20, 1.725),
+        (0.995, 30, 2.750),
+        (0.975, 1000, 1.962),
+    ],
+)
+def test_tquantile_matches_the_tables(p, dof, expected):
+    assert tquantile(p, dof) == pytest.approx(expected, abs=1e-3)
+
+
+def test_mser_drops_an_obvious_warm_up():
+    rng = random.Random(1)
+    values = [100.0 - 5.0 * i for i in range(20)]
+    values += [rng.gauss(0.0, 1.0) for _ in range(180)]
+    assert mser(values) == pytest.approx(20, abs=2)
+
+
+def test_mser_keeps_a_stationary_series():
+    rng = random.Random(1)
+    values = [rng.gauss(10.0, 1.0) for _ in range(200)]
+    assert mser(values) < 20
+
+
+def test_steady_converges_on_a_stationary_delay():
+    rng = random.Random(1)
+    steady = Steady("delay", precision=0.05, batch=10)
+    for i in range(10000):
+        if steady.add(i, rng.expovariate(0.1), 1):
+            break
+    else:
+        pytest.fail("never converged")
+    assert steady.mean == pytest.approx(10.0, rel=0.1)
+    assert steady.halfwidth <= 0.05 * steady.mean
+
+
+def test_steady_never_converges_on_a_trend():
+    rng = random.Random(1)
+    steady = Steady("delay", precision=0.05, batch=10)
+    for i in range(10000):
+        assert not steady.add(i, i + rng.gauss(0.0, 1.0), 1)
+
+
+def test_unknown_steady_metric_is_rejected():
+    with pytest.raises(ValueError):
+        Steady("throughput")
+
+
+@pytest.mark.parametrize(
+    "stop,reason",
+    [
+        (Stop(messages=50), "messages"),
+        (Stop(time=500.0), "time"),
+        (Stop(events=300), "events"),
+    ],
+)
+def test_run_stops_at_the_first_limit(stop, reason):
+    sim, result = simulate(messages=10**6, stop=stop)
+    assert stop.reason == reason
+    if reason == "messages":
+        assert result.delivered == 50
+    elif reason == "time":
+        assert sim.time <= 500.0
+    else:
+        assert sim.nevents == 300
+
+
+def test_run_stops_once_the_delay_is_steady():
+    steady = Steady("delay", precision=0.1)
+    stop = Stop(messages=10**5, steady=steady)
+    sim, result = simulate(messages=10**6, lossprob=0.0, corruptprob=0.0, stop=stop)
+    assert stop.reason == "steady"
+    assert result.delivered < 10**5
+    assert steady.mean == pytest.approx(result.delay["mean"], rel=0.2)
+
+
+def test_steady_alone_is_capped():
+    assert Stop(steady=Steady()).messages == MESSAGES
+    assert Stop(wall=60.0, steady=Steady()).messages is None
+    assert Stop().messages is None
+
+
+def test_steady_run_that_never_converges_ends(monkeypatch):
+    monkeypatch.setattr(stopping, "MESSAGES", 300)
+    # offered far more than Go-Back-N carries, the delay grows for ever
+    result = run(
+        {"messages": float("inf"), "lambda": 1.0},
+        {"metric": "delay", "precision": 0.05, "batch": 10},
+    )
+    assert result["stop"] == "messages" and result["delivered"] == 300
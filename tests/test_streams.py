@@ -0,0 +1,31 @@
+from simulator import Simulator
+from streams import Streams
+
+
+def arrivals(lossprob, seed=1):
+    """The times layer 5 hands messages to EntityA in a 20 message run"""
+    sim = Simulator(False, 0, seed, 20, 0.0, lossprob, 10.0)
+    times = []
+    output = sim.entity_a.output
+    sim.entity_a.output = lambda message: times.append(sim.time) or output(message)
+    sim.run()
+    return times
+
+
+def test_a_seed_reproduces_every_stream():
+    first, second = Streams(7), Streams(7)
+    for name in ("arrival", "loss to B", "delay to A"):
+        assert [first[name].random() for _ in range(10)] == [
+            second[name].random() for _ in range(10)
+        ]
+
+
+def test_streams_of_one_run_differ_by_name():
+    streams = Streams(7)
+    assert streams["loss to B"].random() != streams["loss to A"].random()
+    assert streams["arrival"] is streams["arrival"]
+
+
+def test_loss_leaves_the_arrival_times_alone():
+    assert arrivals(0.3) == arrivals(0.0)
+    assert arrivals(0.0) != arrivals(0.0, seed=2)
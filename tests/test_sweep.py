@@ -0,0 +1,47 @@
+import csv
+import io
+
+from simulator import Simulator
+from sweep import PARAMETERS, RESULTS, grid, run, sweep
+
+
+def test_grid_is_the_cartesian_product_over_the_defaults():
+    configs = list(grid(lossprob=[0.1, 0.2], seed=range(3)))
+    assert len(configs) == 6
+    assert [(c["lossprob"], c["seed"]) for c in configs[:4]] == [
+        (0.1, 0),
+        (0.1, 1),
+        (0.1, 2),
+        (0.2, 0),
+    ]
+    assert all(c["corruptprob"] == PARAMETERS["corruptprob"] for c in configs)
+
+
+def test_simulators_in_one_process_do_not_share_their_generator():
+    first = Simulator(False, 0, 7, 20, 0.2, 0.2, 10.0)
+    second = Simulator(False, 0, 7, 20, 0.2, 0.2, 10.0)
+    # interleaving the runs with a third one changes nothing
+    Simulator(False, 0, 3, 20, 0.2, 0.2, 10.0).run()
+    second.run()
+    first.run()
+    assert (first.time, first.ntolayer3) == (second.time, second.ntolayer3)
+
+
+def test_sweep_writes_a_row_per_run_as_a_serial_run_would():
+    configs = list(grid(lossprob=[0.0, 0.3], seed=range(2)))
+    output = io.StringIO()
+    assert sweep(configs, output, workers=2) == 4
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert len(rows) == 4
+    assert list(rows[0]) == list(PARAMETERS) + RESULTS
+    for config in configs:
+        expected = run(config)
+        row = next(
+            r
+            for r in rows
+            if float(r["lossprob"]) == config["lossprob"]
+            and int(r["seed"]) == config["seed"]
+        )
+        assert float(row["time"]) == expected["time"]
+        assert int(row["ntolayer3"]) == expected["ntolayer3"]
+        assert int(row["nlost"]) == expected["nlost"]
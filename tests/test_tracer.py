@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from simulator import Simulator
+from tracer import JSONL, Tracer
+
+
+def kinds(path):
+    with open(path, encoding="utf-8") as lines:
+        return {json.loads(line)["kind"] for line in lines}
+
+
+def run(tmp_path, trace):
+    path = tmp_path / f"trace{trace}.jsonl"
+    tracer = Tracer(JSONL, str(path))
+    sim = Simulator(False, trace, 1, 20, 0.2, 0.2, 10.0, tracer=tracer)
+    sim.run()
+    tracer.close()
+    return kinds(path)
+
+
+def test_each_level_adds_its_records(tmp_path):
+    assert run(tmp_path, 0) == set()
+    assert run(tmp_path, 1) <= {"lost", "corrupt", "warning"}
+    level2 = run(tmp_path, 2)
+    assert {"event", "callback"} <= level2
+    assert not {"insert", "starttimer", "evlist"} & level2
+    level3 = run(tmp_path, 3)
+    assert {"insert", "starttimer", "layer5", "send"} <= level3
+    assert "evlist" not in level3
+    assert "evlist" in run(tmp_path, 4)
+
+
+def test_records_are_buffered_until_flushed(tmp_path):
+    path = tmp_path / "trace.txt"
+    tracer = Tracer(sink=str(path), bufsize=3)
+    tracer.record("starttimer", 1.5)
+    tracer.record("warning", 2.0, message="careful")
+    assert path.read_text() == ""
+    tracer.record("lost", 3.0)
+    assert path.read_text() == (
+        "          START TIMER: starting timer at 1.5\n"
+        "Warning: careful\n"
+        "          TOLAYER3: packet being lost\n\n"
+    )
+    tracer.record("starttimer", 4.0)
+    tracer.close()
+    assert path.read_text().endswith("starting timer at 4.0\n")
+
+
+def test_jsonl_records_are_structured(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(JSONL, str(path))
+    sim = Simulator(False, 0, 1, 0, 0.0, 0.0, 10.0, tracer=tracer)
+    event = sim.pendingevents()[0]
+    tracer.record("event", event.time, event=event)
+    tracer.close()
+    record = json.loads(path.read_text())
+    assert record == {
+        "time": event.time,
+        "kind": "event",
+        "event": {"type": "layer5", "time": event.time, "entity": "EntityA"},
+    }
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        Tracer("xml")
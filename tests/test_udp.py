@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from channel import constant_delay
+from packet import Packet
+from udp import UdpRuntime, decode, encode
+
+
+def test_packets_survive_the_wire_format():
+    packet = Packet(acknum=7, seqnum=2**32 - 1, payload=b"\0abc\xff", checksum=12345)
+    assert decode(encode(packet)).asdict() == packet.asdict()
+
+
+@pytest.mark.parametrize("protocol", ["gbn", "sr"])
+def test_messages_cross_loopback_udp(protocol):
+    runtime = UdpRuntime(
+        True,
+        0,
+        1,
+        50,
+        0.1,
+        0.1,
+        2.0,
+        constant_delay(2.0),
+        protocol=protocol,
+        unit=0.0001,
+    )
+    result = asyncio.run(runtime.run(deadline=30.0))
+    assert result.delivered == 50 and result.misdelivered == 0
+    # whatever was not lost went through a socket, but for the last few
+    # packets still in flight at the end
+    assert 0 < result.datagrams <= result.ntolayer3 - result.nlost
+    assert result.wall > 0.0
+
+
+def test_no_messages_ends_right_away():
+    runtime = UdpRuntime(False, 0, 1, 0, 0.0, 0.0, 2.0, unit=0.0001)
+    result = asyncio.run(runtime.run(deadline=30.0))
+    assert result.delivered == 0 and result.ntolayer3 == 0
+    assert result.wall < 30.0
@@ -0,0 +1,135 @@
+import random
+
+import pytest
+
+from entity import EntityA, EntityB
+from simulator import Simulator
+from workload import (
+    LAST,
+    MORE,
+    FileChunks,
+    Letters,
+    OnOffArrivals,
+    PoissonArrivals,
+    UniformArrivals,
+    fragment,
+    parse_arrivals,
+    parse_size,
+)
+
+
+@pytest.mark.parametrize("length", [1, 4, 5, 8, 9, 100])
+def test_fragments_carry_the_message_and_their_headers(length):
+    message = bytes(range(length))
+    payloads = fragment(message, 5)
+    assert all(1 < len(payload) <= 5 for payload in payloads)
+    assert len(payloads) == -(-length // 4)
+    assert [payload[:1] for payload in payloads] == [MORE] * (
+        len(payloads) - 1
+    ) + [LAST]
+    assert b"".join(payload[1:] for payload in payloads) == message
+
+
+def test_message_that_fits_goes_out_whole(sim):
+    a = EntityA(sim, mss=21)
+    a.output(b"A" * 20)
+    assert [p.payload for p in sim.take()] == [LAST + b"A" * 20]
+
+
+def test_receiver_reassembles_the_fragments(sim):
+    a = EntityA(sim, window=8, mss=4)
+    b = EntityB(sim, window=8, ackdelay=0, mss=4)
+    for message in (b"first message", b"x", b"abc"):
+        a.output(message)
+    data = sim.take()
+    assert len(data) == 5 + 1 + 1
+    for packet in data[:-1]:
+        b.input(packet)
+    # the last message is held back until its only fragment arrives
+    assert sim.delivered == [b"first message", b"x"]
+    b.input(data[-1])
+    assert sim.delivered == [b"first message", b"x", b"abc"]
+
+
+@pytest.mark.parametrize("protocol", ["gbn", "sr"])
+@pytest.mark.parametrize("bidirectional", [False, True])
+def test_fragmented_messages_survive_a_lossy_channel(protocol, bidirectional):
+    sim = Simulator(
+        bidirectional,
+        0,
+        1,
+        200,
+        0.2,
+        0.2,
+        30.0,
+        metrics=True,
+        protocol=protocol,
+        window=8,
+        mss=7,
+        source=Letters(1, 40, random.Random(1)),
+    )
+    payloads = []
+
+    def tap(send):
+        return lambda packet: payloads.append(packet.payload) or send(packet)
+
+    for channel in sim.channels.values():
+        channel.send = tap(channel.send)
+    result = sim.run()
+    data = [payload for payload in payloads if payload]
+    assert max(len(payload) for payload in data) == 7
+    # messages of up to 40 bytes take up to 7 fragments of 6
+    assert result.datasent - result.retransmissions > 3 * 200
+    # every message is put back together, the same bytes in the same order
+    assert result.delivered == 200 and result.misdelivered == 0
+
+
+def test_letters():
+    letters = Letters(3)
+    messages = [next(letters) for _ in range(27)]
+    assert (messages[0], messages[25], messages[26]) == (b"AAA", b"ZZZ", b"AAA")
+    letters = Letters(2, 5, random.Random(1))
+    sizes = {len(next(letters)) for _ in range(1000)}
+    assert sizes == {2, 3, 4, 5}
+
+
+def test_file_chunks_stream_the_file(tmp_path):
+    path = tmp_path / "workload"
+    path.write_bytes(bytes(range(250)))
+    assert list(FileChunks(str(path), 100)) == [
+        bytes(range(100)),
+        bytes(range(100, 200)),
+        bytes(range(200, 250)),
+    ]
+
+
+def test_parse_size():
+    assert parse_size("20") == (20, None)
+    assert parse_size("10,50") == (10, 50)
+
+
+def test_parse_arrivals():
+    assert type(parse_arrivals("uniform", 5.0)) is UniformArrivals
+    assert type(parse_arrivals("poisson", 5.0)) is PoissonArrivals
+    onoff = parse_arrivals("onoff:50,20", 5.0)
+    assert (onoff.mean, onoff.on, onoff.off) == (5.0, 50.0, 20.0)
+    with pytest.raises(ValueError):
+        parse_arrivals("pareto", 5.0)
+
+
+@pytest.mark.parametrize(
+    "arrivals,mean",
+    [
+        (UniformArrivals(5.0), 5.0),
+        (PoissonArrivals(5.0), 5.0),
+        # faster while on, to make up for the time off
+        (OnOffArrivals(5.0, 50.0, 20.0), 5.0),
+        (OnOffArrivals(5.0, 10.0, 90.0), 5.0),
+    ],
+)
+def test_arrivals_have_their_mean_interval(arrivals, mean):
+    rng = random.Random(1)
+    n = 100000
+    assert sum(arrivals.interval(rng) for _ in range(n)) / n == pytest.approx(
+        mean, rel=0.03
+    )
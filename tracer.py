@@ -0,0 +1,102 @@
+"""Trace output of the simulator.
+
+The trace level is checked at every call site (``if sim.trace > 2:``) before
+anything is formatted, so a disabled level costs one integer comparison.
+Records that pass are formatted by the Tracer and buffered before they are
+written out. Levels:
+
+    0 - nothing but the end of run summary
+    1 - packets lost, dropped or corrupted by the medium, protocol warnings
+    2 - every event dispatched and every entity callback
+    3 - internal simulator steps (timers, arrivals, layer 5 deliveries)
+    4 - the whole event list after every insertion
+"""
+
+import json
+import sys
+
+TEXT = "text"
+JSONL = "jsonl"
+FORMATS = (TEXT, JSONL)
+
+# how each record kind reads in the text format
+TEMPLATES = {
+    "event": "{event}",
+    "callback": "{entity}.{name} called.",
+    "warning": "Warning: {message}",
+    "layer5": "          MAINLOOP: data given to student: {message}",
+    "arrival": "          GENERATE NEXT ARRIVAL: creating new arrival",
+    "insert": "            INSERTEVENT: future event: {event!r}",
+    "starttimer": "          START TIMER: starting timer at {time}",
+    "stoptimer": "          STOP TIMER: stopping timer at {time}",
+    "tolayer5": "          TOLAYER5: data received from {entity}: {message}",
+    "lost": "          TOLAYER3: packet being lost\n",
+    "drop": "          TOLAYER3: packet dropped by the full bottleneck\n",
+    "send": "          TOLAYER3: {packet!r}",
+    "corrupt": "          TOLAYER3: packet being corrupted",
+    "schedule": "          TOLAYER3: scheduling arrival on other side",
+}
+
+
+def _evlist(fields):
+    lines = ["eventlist", "-------------------------"]
+    lines.extend(repr(i) for i in fields["events"])
+    lines.append("-------------------------")
+    return "\n".join(lines)
+
+
+FORMATTERS = {"evlist": _evlist}
+
+
+def _jsonable(obj):
+    """Turn simulator objects into something json can encode"""
+    if hasattr(obj, "asdict"):
+        return obj.asdict()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode("latin-1")
+    return str(obj)
+
+
+class Tracer:
+    """Formats trace records and writes them out in large chunks"""
+
+    def __init__(self, fmt=TEXT, sink=None, bufsize=4096):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown trace format {fmt!r}")
+        self.fmt = fmt
+        self.sink = sink
+        self.bufsize = bufsize
+        self.buffer = []
+        if sink is None:
+            self.stream = sys.stdout
+        else:
+            self.stream = open(sink, "w", encoding="utf-8")
+
+    def record(self, kind, time, **fields):
+        """Add one trace record, the caller has already checked its level"""
+        if self.fmt == JSONL:
+            line = json.dumps(
+                {"time": time, "kind": kind, **fields},
+                default=_jsonable,
+                separators=(",", ":"),
+            )
+        elif kind in FORMATTERS:
+            line = FORMATTERS[kind](fields)
+        else:
+            line = TEMPLATES[kind].format(time=time, **fields)
+        self.buffer.append(line)
+        if len(self.buffer) >= self.bufsize:
+            self.flush()
+
+    def flush(self):
+        """Write out everything buffered so far"""
+        if self.buffer:
+            self.buffer.append("")
+            self.stream.write("\n".join(self.buffer))
+            self.buffer = []
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.sink is not None:
+            self.stream.close()
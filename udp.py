@@ -0,0 +1,464 @@
+"""Runs EntityA and EntityB over real UDP sockets on localhost instead of
+inside Simulator, to measure the protocol code in wall clock time with the
+packets serialized, sent and parsed like a real transport would.
+
+UdpRuntime gives the entities the same interface as Simulator (tolayer3,
+tolayer5, starttimer, stoptimer, time, trace, checksum), so entity.py and
+selective_repeat.py run unchanged on an asyncio event loop. Every packet
+still goes through a Channel first, which loses, corrupts and delays it in
+process before it is written to the socket, and can record or replay its
+decisions like the simulator's. Times the entities see are in
+simulator time units of --unit seconds each, 1 ms by default, so timeouts,
+delays and --lambda keep their meaning:
+
+    python udp.py --messages 1000 --lambda 1 --lossprob 0.1 --unit 0.001
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+
+import entity
+from channel import Channel, parse_delay
+from checksum import CHECKSUMS, DEFAULT_CHECKSUM
+from entity import EntityA, EntityB
+from metrics import Metrics
+from packet import Packet
+from replay import Recorder, Replay
+from selective_repeat import SelectiveRepeatA, SelectiveRepeatB
+from simulator import PROTOCOLS
+from streams import Streams
+from tracer import FORMATS, Tracer
+from workload import (
+    MSGLEN,
+    FileChunks,
+    Letters,
+    UniformArrivals,
+    parse_arrivals,
+    parse_size,
+)
+
+# seqnum, acknum and checksum ahead of the payload of every datagram
+HEADER = struct.Struct("!III")
+# seconds per simulator time unit
+UNIT = 0.001
+
+
+def encode(packet):
+    return HEADER.pack(packet.seqnum, packet.acknum, packet.checksum) + packet.payload
+
+
+def decode(data):
+    seqnum, acknum, checksum = HEADER.unpack_from(data)
+    return Packet(acknum, seqnum, data[HEADER.size :], checksum)
+
+
+class Endpoint(asyncio.DatagramProtocol):
+    """The socket of one entity, hands every datagram to it"""
+
+    def __init__(self, runtime, entity):
+        self.runtime = runtime
+        self.entity = entity
+
+    def datagram_received(self, data, addr):
+        self.runtime.received(self.entity, decode(data))
+
+
+class UdpRuntime:
+    """Runs one EntityA/EntityB pair on the running asyncio event loop"""
+
+    def __init__(
+        self,
+        bidirectional,
+        trace,
+        seed,
+        nmessages,
+        corruptprob,
+        lossprob,
+        lambdat,
+        delay=None,
+        tracer=None,
+        window=entity.WINDOW,
+        timeout=entity.TIMEOUT,
+        adaptive=True,
+        protocol="gbn",
+        checksum=DEFAULT_CHECKSUM,
+        seqspace=entity.SEQSPACE,
+        ackdelay=entity.ACKDELAY,
+        congestion=False,
+        queueloss=None,
+        record=None,
+        replay=None,
+        unit=UNIT,
+        arrivals=None,
+        source=None,
+        mss=None,
+    ):
+        if seqspace > 2**32:
+            raise ValueError("sequence numbers must fit the 32 bit header fields")
+        self.bidirectional = bidirectional
+        self.trace = trace
+        self.tracer = tracer if tracer is not None else Tracer()
+        self.streams = Streams(seed)
+        self.arrivalrng = self.streams["arrival"]
+        self.nsim = 0
+        self.nsimmax = nmessages
+        self.lambdat = lambdat
+        self.arrivals = arrivals if arrivals is not None else UniformArrivals(lambdat)
+        self.source = source if source is not None else Letters(MSGLEN)
+        self.exhausted = False
+        self.checksum = CHECKSUMS[checksum]
+        self.window = window
+        self.seqspace = seqspace
+        self.unit = unit
+
+        self.loop = None
+        self.running = False
+        self.start = 0.0
+        self.end = 0.0
+        self.timers = {}
+        self.ntolayer3 = 0
+        self.nencoded = 0
+        self.done = None
+
+        if protocol == "sr":
+            args = (self, window, timeout, adaptive, seqspace, 0, congestion, mss)
+            pair = (SelectiveRepeatA(*args), SelectiveRepeatB(*args))
+        else:
+            args = (
+                self,
+                window,
+                timeout,
+                adaptive,
+                seqspace,
+                ackdelay,
+                0,
+                congestion,
+                mss,
+            )
+            pair = (EntityA(*args), EntityB(*args))
+        self.flows = [pair]
+        self.entity_a, self.entity_b = pair
+        self.links = (None, None)
+        self.stop = None
+        self.channels = {
+            self.entity_a: Channel(
+                self,
+                self.entity_b,
+                lossprob,
+                corruptprob,
+                delay,
+                None,
+                self.streams,
+                None,
+                queueloss,
+            ),
+            self.entity_b: Channel(
+                self,
+                self.entity_a,
+                lossprob,
+                corruptprob,
+                delay,
+                None,
+                self.streams,
+                None,
+                queueloss,
+            ),
+        }
+        # record the decisions of the channels to a file, or replay them
+        self.recorder = Recorder(record) if record is not None else None
+        self.replay = Replay(replay) if replay is not None else None
+        for direction, channel in enumerate(self.channels.values()):
+            if self.recorder is not None:
+                channel.record = self.recorder.writer(direction)
+            if self.replay is not None:
+                channel.replay = self.replay.decisions(direction)
+        # transport and address of the socket of every entity
+        self.transports = {}
+        self.addresses = {}
+        self.metrics = Metrics(self)
+
+    @property
+    def time(self):
+        """Time since the start of the run in simulator time units, when
+        the run is over the time it took"""
+        if not self.running:
+            return self.end
+        return (self.loop.time() - self.start) / self.unit
+
+    @property
+    def nlost(self):
+        return sum(c.nlost for c in self.channels.values())
+
+    @property
+    def ncorrupt(self):
+        return sum(c.ncorrupt for c in self.channels.values())
+
+    async def run(self, deadline=None):
+        """Send nsimmax messages, or as many as the source has, and wait
+        until all of them are delivered, or deadline seconds went by.
+        Returns the RunResult of the run with the wall clock measurements
+        added"""
+        self.loop = asyncio.get_running_loop()
+        self.done = asyncio.Event()
+        for sender in self.channels:
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda sender=sender: Endpoint(self, sender),
+                local_addr=("127.0.0.1", 0),
+            )
+            self.transports[sender] = transport
+            self.addresses[sender] = transport.get_extra_info("sockname")
+
+        self.start = self.loop.time()
+        self.running = True
+        wallstart = time.perf_counter()
+        # with no messages to send it is over before it starts
+        self.finished()
+        self.generate_next_arrival()
+        try:
+            await asyncio.wait_for(self.done.wait(), deadline)
+        except asyncio.TimeoutError:
+            if self.trace > 0:
+                self.tracer.record(
+                    "warning", self.time, message="deadline reached before the end"
+                )
+        wall = time.perf_counter() - wallstart
+        self.end = self.time
+        # whatever is still scheduled on the loop does nothing from now on
+        self.running = False
+
+        for handle in self.timers.values():
+            handle.cancel()
+        self.timers.clear()
+        for transport in self.transports.values():
+            transport.close()
+        self.tracer.flush()
+
+        result = self.metrics.result()
+        result.wall = wall
+        result.messages_per_second = result.delivered / wall if wall > 0.0 else 0.0
+        result.datagrams = self.nencoded
+        return result
+
+    def close(self):
+        """Finish the channel recording and release the replayed one"""
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.replay is not None:
+            self.replay.close()
+
+    def generate_next_arrival(self):
+        wait = self.arrivals.interval(self.arrivalrng)
+        if self.trace > 2:
+            self.tracer.record("arrival", self.time)
+        if self.bidirectional and self.arrivalrng.random() >= 0.5:
+            sender = self.entity_b
+        else:
+            sender = self.entity_a
+        self.loop.call_later(wait * self.unit, self.fromlayer5, sender)
+
+    def fromlayer5(self, sender):
+        if not self.running or self.nsim >= self.nsimmax:
+            return
+        msg2give = next(self.source, None)
+        if msg2give is None:
+            self.exhausted = True
+            self.finished()
+            return
+        self.generate_next_arrival()
+        if self.trace > 2:
+            self.tracer.record("layer5", self.time, message=msg2give)
+        dest = self.channels[sender].dest
+        self.metrics.layer5(sender, dest, self.time, msg2give)
+        self.nsim += 1
+        sender.output(msg2give)
+        self.metrics.window(sender, self.time, sender.windowsize())
+
+    def received(self, receiver, packet):
+        """A datagram for receiver came out of its socket"""
+        if not self.running:
+            return
+        if self.trace >= 2:
+            event = f"FromLayer3({self.time}, {receiver}, {packet})"
+            self.tracer.record("event", self.time, event=event)
+        receiver.input(packet)
+        self.metrics.window(receiver, self.time, receiver.windowsize())
+
+    def starttimer(self, entity, increment, key=None):
+        """Like Simulator.starttimer, on the event loop clock"""
+        if self.trace > 2:
+            self.tracer.record("starttimer", self.time)
+        if (entity, key) in self.timers:
+            if self.trace > 0:
+                self.tracer.record(
+                    "warning",
+                    self.time,
+                    message="attempt to start a timer that is already started",
+                )
+            return self.timers[entity, key]
+        handle = self.loop.call_later(increment * self.unit, self.fire, entity, key)
+        self.timers[entity, key] = handle
+        self.metrics.timerstarted(entity)
+        return handle
+
+    def stoptimer(self, entity, key=None):
+        if self.trace > 2:
+            self.tracer.record("stoptimer", self.time)
+        handle = self.timers.pop((entity, key), None)
+        if handle is None:
+            if self.trace > 0:
+                self.tracer.record(
+                    "warning",
+                    self.time,
+                    message="unable to cancel your timer. It wasn't running.",
+                )
+            return
+        handle.cancel()
+
+    def fire(self, entity, key):
+        del self.timers[entity, key]
+        self.metrics.timerfired(entity)
+        if key is None:
+            entity.timerinterrupt()
+        else:
+            entity.timerinterrupt(key)
+        self.metrics.window(entity, self.time, entity.windowsize())
+
+    def tolayer5(self, entity, message):
+        if self.trace > 2:
+            self.tracer.record("tolayer5", self.time, entity=entity, message=message)
+        self.metrics.delivered(entity, self.time, message)
+        self.finished()
+
+    def finished(self):
+        """Stop once every message there is to send was delivered"""
+        if self.nsim < self.nsimmax and not self.exhausted:
+            return
+        if self.metrics.ndelivered >= self.nsim:
+            self.done.set()
+
+    def tolayer3(self, entity, packet):
+        """Put the packet through the channel, then on the wire once its
+        delay is up"""
+        self.ntolayer3 += 1
+        self.metrics.sent(entity, packet)
+        channel = self.channels[entity]
+        delivery = channel.send(packet)
+        if delivery is None:
+            return
+        arrival, mypkt = delivery
+        self.loop.call_at(
+            self.start + arrival * self.unit, self.transmit, entity, channel, mypkt
+        )
+
+    def transmit(self, entity, channel, packet):
+        if not self.running:
+            return
+        channel.delivered()
+        transport = self.transports[entity]
+        self.nencoded += 1
+        transport.sendto(encode(packet), self.addresses[channel.dest])
+
+
+def main():
+    """Run a pair of entities over loopback UDP and print what it measured"""
+    parser = argparse.ArgumentParser(description="entities over UDP")
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument("--trace", default=0, type=int, help="set the trace level (0-4)")
+    parser.add_argument("--trace-format", default="text", choices=FORMATS)
+    parser.add_argument("--trace-file", default=None)
+    parser.add_argument("--seed", default=0, type=int, help="set random seed")
+    parser.add_argument("--messages", default=1000, type=int)
+    parser.add_argument("--corruptprob", default=0.0, type=float)
+    parser.add_argument("--lossprob", default=0.0, type=float)
+    parser.add_argument("--lambda", default=4, type=float)
+    parser.add_argument("--delay", default="uniform:1,10", type=parse_delay)
+    parser.add_argument("--protocol", default="gbn", choices=PROTOCOLS)
+    parser.add_argument("--checksum", default=DEFAULT_CHECKSUM, choices=CHECKSUMS)
+    parser.add_argument("--window", default=entity.WINDOW, type=int)
+    parser.add_argument("--timeout", default=entity.TIMEOUT, type=float)
+    parser.add_argument("--fixed-timeout", action="store_true")
+    parser.add_argument("--congestion", action="store_true")
+    parser.add_argument(
+        "--queueloss", default=None, type=float, help="as for simulator.py"
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="write every loss, delay and corruption decision to this file",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="take the channel decisions from a --record file",
+    )
+    parser.add_argument("--arrivals", default="uniform", help="as for simulator.py")
+    parser.add_argument("--message-size", default=str(MSGLEN), type=parse_size)
+    parser.add_argument("--workload-file", default=None)
+    parser.add_argument("--mss", default=None, type=int)
+    parser.add_argument(
+        "--unit",
+        default=UNIT,
+        type=float,
+        help="seconds of wall clock time per simulator time unit",
+    )
+    parser.add_argument(
+        "--deadline",
+        default=None,
+        type=float,
+        help="give up after this many seconds",
+    )
+    args = parser.parse_args()
+    assert args.messages >= 0
+    assert args.lossprob >= 0.0 and args.lossprob <= 1.0
+    assert args.corruptprob >= 0.0 and args.corruptprob <= 1.0
+    assert args.__dict__["lambda"] > 0.0
+    assert args.window > 0
+    assert args.timeout > 0.0
+    assert args.unit > 0.0
+    assert args.message_size[0] > 0
+    assert args.workload_file is None or args.message_size[1] is None
+    assert args.mss is None or args.mss > 1
+    assert args.queueloss is None or args.queueloss > 0.0
+
+    low, high = args.message_size
+    if args.workload_file is not None:
+        source = FileChunks(args.workload_file, low)
+    elif high is not None:
+        source = Letters(low, high, Streams(args.seed)["size"])
+    else:
+        source = Letters(low)
+
+    runtime = UdpRuntime(
+        args.bidirectional,
+        args.trace,
+        args.seed,
+        args.messages,
+        args.corruptprob,
+        args.lossprob,
+        args.__dict__["lambda"],
+        args.delay,
+        Tracer(args.trace_format, args.trace_file),
+        args.window,
+        args.timeout,
+        not args.fixed_timeout,
+        args.protocol,
+        args.checksum,
+        congestion=args.congestion,
+        queueloss=args.queueloss,
+        record=args.record,
+        replay=args.replay,
+        unit=args.unit,
+        arrivals=parse_arrivals(args.arrivals, args.__dict__["lambda"]),
+        source=source,
+        mss=args.mss,
+    )
+    result = asyncio.run(runtime.run(args.deadline))
+    runtime.tracer.close()
+    runtime.close()
+    print(result.tojson(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""The application traffic handed to layer 5: when messages arrive and what
+is in them.
+
+An arrival process gives the time from one message to the next, drawn from
+the arrival stream of the simulation. A source is an iterator of payloads
+that is only advanced when a message arrives, so a workload can stream from
+a generator or a large file without holding it in memory; a run stops
+generating messages when its source runs out. The classes below can be
+pickled with a checkpoint, a plain generator can't.
+
+    --arrivals uniform        uniform on [0, 2*lambda], the classic emulator
+    --arrivals poisson        exponential with mean lambda
+    --arrivals onoff:50,20    Poisson while on, silent while off, with
+                              exponential on and off periods of mean 50 and 20,
+                              still a mean of lambda over both
+"""
+
+# size of the classic messages, a letter repeated
+MSGLEN = 20
+# first byte of the payload of a fragment with an MSS: more of the message
+# follows, or this is its last fragment
+MORE = b"\x01"
+LAST = b"\x00"
+
+
+class UniformArrivals:
+    """Intervals uniform on [0, 2*mean]"""
+
+    def __init__(self, mean):
+        self.mean = mean
+
+    def interval(self, rng):
+        return self.mean * rng.random() * 2.0
+
+
+class PoissonArrivals:
+    """Exponential intervals of the given mean"""
+
+    def __init__(self, mean):
+        self.mean = mean
+
+    def interval(self, rng):
+        return rng.expovariate(1.0 / self.mean)
+
+
+class OnOffArrivals:
+    """Poisson arrivals during on periods, nothing during off periods,
+    both of exponential length. The arrivals come faster while on, so the
+    mean interval over both is the given one"""
+
+    def __init__(self, mean, on=50.0, off=50.0):
+        self.mean = mean
+        self.on = on
+        self.off = off
+        self.left = None  # of the current on period
+
+    def interval(self, rng):
+        if self.left is None:
+            self.left = rng.expovariate(1.0 / self.on)
+        wait = 0.0
+        # on for on of every on + off time units on average
+        gap = rng.expovariate((self.on + self.off) / (self.mean * self.on))
+        # the exponential is memoryless, so what is left of the gap at the
+        # end of an on period carries over to the next one
+        while gap > self.left:
+            gap -= self.left
+            wait += self.left + rng.expovariate(1.0 / self.off)
+            self.left = rng.expovariate(1.0 / self.on)
+        self.left -= gap
+        return wait + gap
+
+
+ARRIVALS = {
+    "uniform": UniformArrivals,
+    "poisson": PoissonArrivals,
+    "onoff": OnOffArrivals,
+}
+
+
+def parse_arrivals(spec, mean):
+    """Build an arrival process of the given mean interval from a spec such
+    as uniform, poisson or onoff:50,20"""
+    name, _, args = spec.partition(":")
+    if name not in ARRIVALS:
+        raise ValueError(f"unknown arrival process {name!r}")
+    params = [float(i) for i in args.split(",") if i]
+    return ARRIVALS[name](mean, *params)
+
+
+class Letters:
+    """The classic payloads: message n is the letter n mod 26 repeated. Its
+    size is fixed, or uniform on [size, high] drawn from rng"""
+
+    def __init__(self, size=MSGLEN, high=None, rng=None):
+        self.size = size
+        self.high = high
+        self.rng = rng
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        size = self.size
+        if self.high is not None:
+            size += int((self.high - self.size + 1) * self.rng.random())
+        message = bytes([ord("A") + (self.count % 26)]) * size
+        self.count += 1
+        return message
+
+
+class FileChunks:
+    """The contents of a file, size bytes at a time, read as they are
+    needed"""
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self.offset = 0
+        self.file = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.file is None:
+            self.file = open(self.path, "rb")
+            self.file.seek(self.offset)
+        chunk = self.file.read(self.size)
+        if not chunk:
+            self.file.close()
+            self.file = None
+            raise StopIteration
+        self.offset += len(chunk)
+        return chunk
+
+    def __getstate__(self):
+        # a restored source opens the file again where it left off
+        state = dict(self.__dict__)
+        state["file"] = None
+        return state
+
+
+def parse_size(text):
+    """A message size, or a range of them, as LOW,HIGH"""
+    sizes = [int(i) for i in text.split(",")]
+    if len(sizes) == 1:
+        return sizes[0], None
+    low, high = sizes
+    return low, high
+
+
+def fragment(message, mss):
+    """Split a message into payloads of at most mss bytes. The first byte of
+    each one says whether more fragments of the message follow"""
+    step = mss - 1
+    last = len(message) - step
+    return [
+        (MORE if start < last else LAST) + message[start : start + step]
+        for start in range(0, len(message), step)
+    ]